@@ -4,6 +4,7 @@ Force-Position coupling mode implementation
 
 from typing import Optional, Dict, Any
 from .base import ICouplingMode
+from .pipeline import CouplingPipeline, DEFAULT_PIPELINE_STATS_INTERVAL, DEFAULT_PIPELINE_TIMEOUT_SEC
 from ..modules.force_application import ForceApplicationModule
 from ..modules.position_publish import PositionPublishModule
 
@@ -14,6 +15,8 @@ class ForcePositionMode(ICouplingMode):
     This mode implements the traditional force-position coupling:
     - MuJoCo sends forces to SPH
     - SPH sends rigid body positions to MuJoCo
+
+    Supports ``pipelined: true`` like MultiPointForceMode (forces lag by one step).
     """
     
     def __init__(self):
@@ -22,6 +25,7 @@ class ForcePositionMode(ICouplingMode):
         self.env = None
         self.orcalink_client = None
         self.loop = None
+        self.pipeline: Optional[CouplingPipeline] = None
     
     def initialize(self, config: Dict[str, Any], env, orcalink_client, loop) -> bool:
         """Initialize the mode"""
@@ -33,6 +37,13 @@ class ForcePositionMode(ICouplingMode):
         self.force_application_module = ForceApplicationModule(env, orcalink_client, self.loop)
         self.position_publish_module = PositionPublishModule(
             env, orcalink_client, self.loop, config.get('rigid_bodies', []))
+
+        if config.get('pipelined', False):
+            self.pipeline = CouplingPipeline(
+                self.loop,
+                timeout_sec=float(config.get('pipeline_timeout_sec', DEFAULT_PIPELINE_TIMEOUT_SEC)),
+                stats_interval=int(config.get('pipeline_stats_interval', DEFAULT_PIPELINE_STATS_INTERVAL)),
+            )
         
         return True
     
@@ -44,6 +55,9 @@ class ForcePositionMode(ICouplingMode):
     
     def step(self) -> bool:
         """Execute one step"""
+        if self.pipeline is not None:
+            return self._step_pipelined()
+
         # 1. Subscribe to forces and apply to MuJoCo
         if self.force_application_module:
             self.force_application_module.subscribe_and_apply_forces()
@@ -59,8 +73,34 @@ class ForcePositionMode(ICouplingMode):
         
         return True
     
+    def _step_pipelined(self) -> bool:
+        """Pipelined step, see MultiPointForceMode._step_pipelined"""
+        ready, forces = self.pipeline.collect()
+        if not ready:
+            return False
+        if self.force_application_module:
+            self.force_application_module.apply_forces(forces)
+
+        paused = False
+        if self.orcalink_client and hasattr(self.orcalink_client, 'should_pause_this_cycle'):
+            paused = self.orcalink_client.should_pause_this_cycle()
+
+        positions = None
+        if not paused and self.position_publish_module:
+            positions = self.position_publish_module.collect_body_positions()
+        self.pipeline.submit(self._exchange(positions))
+        return not paused
+
+    async def _exchange(self, positions):
+        if positions:
+            await self.orcalink_client.publish_positions(positions)
+        return await self.orcalink_client.subscribe_forces()
+
     def shutdown(self):
         """Shutdown the mode"""
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
         self.force_application_module = None
         self.position_publish_module = None
 
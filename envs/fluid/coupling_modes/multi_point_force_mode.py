@@ -5,6 +5,7 @@ Multi-Point Force coupling mode implementation
 import logging
 from typing import Optional, Dict, Any
 from .base import ICouplingMode
+from .pipeline import CouplingPipeline, DEFAULT_PIPELINE_STATS_INTERVAL, DEFAULT_PIPELINE_TIMEOUT_SEC
 from ..modules.force_application import ForceApplicationModule
 from ..modules.position_publish import PositionPublishModule
 
@@ -19,6 +20,9 @@ class MultiPointForceMode(ICouplingMode):
     - MuJoCo sends SITE point positions to SPH
     - SPH decomposes fluid forces to tetrahedron anchor points
     - SPH sends decomposed forces to MuJoCo SITE points
+
+    With ``pipelined: true`` in the mode config the exchange runs on a background loop
+    (see CouplingPipeline): MuJoCo step N overlaps SPH step N, forces lag by one step.
     """
     
     def __init__(self):
@@ -30,6 +34,7 @@ class MultiPointForceMode(ICouplingMode):
         self.orcalink_client = None
         self.loop = None
         self.config = {}
+        self.pipeline: Optional[CouplingPipeline] = None
         print("[PRINT-DEBUG] MultiPointForceMode.__init__() - END", file=sys.stderr, flush=True)
     
     def initialize(self, config: Dict[str, Any], env, orcalink_client, loop) -> bool:
@@ -58,6 +63,14 @@ class MultiPointForceMode(ICouplingMode):
         print("[PRINT-DEBUG] MultiPointForceMode.initialize() - PositionPublishModule created", file=sys.stderr, flush=True)
         logger.debug("[DEBUG] MultiPointForceMode.initialize() - PositionPublishModule created")
         
+        if config.get('pipelined', False):
+            self.pipeline = CouplingPipeline(
+                self.loop,
+                timeout_sec=float(config.get('pipeline_timeout_sec', DEFAULT_PIPELINE_TIMEOUT_SEC)),
+                stats_interval=int(config.get('pipeline_stats_interval', DEFAULT_PIPELINE_STATS_INTERVAL)),
+            )
+            logger.info("MultiPointForceMode: pipelined coupling enabled (forces lag by one step)")
+
         logger.debug("[DEBUG] MultiPointForceMode.initialize() - Returning True")
         print("[PRINT-DEBUG] MultiPointForceMode.initialize() - Returning True", file=sys.stderr, flush=True)
         return True
@@ -70,6 +83,8 @@ class MultiPointForceMode(ICouplingMode):
     def step(self) -> bool:
         """Execute one step"""
         logger.debug("[DEBUG] MultiPointForceMode.step() - Start")
+        if self.pipeline is not None:
+            return self._step_pipelined()
         
         # 1. Subscribe to multi-point forces and apply to SITE points
         if self.force_application_module:
@@ -93,8 +108,41 @@ class MultiPointForceMode(ICouplingMode):
         logger.debug("[DEBUG] MultiPointForceMode.step() - Returning True")
         return True
     
+    def _step_pipelined(self) -> bool:
+        """Pipelined step: apply the forces of the previous exchange, then submit this step's exchange.
+
+        Flow control keeps the serial semantics: forces are still received while paused,
+        only the position publish (and the MuJoCo step) is skipped.
+        """
+        # 1. 上一步提交的交换（publish + subscribe）的结果，滞后一步施加
+        ready, forces = self.pipeline.collect()
+        if not ready:
+            return False  # 上一次交换未完成，暂停 MuJoCo，保持最多一步的滞后
+        if self.force_application_module:
+            self.force_application_module.apply_site_forces(forces)
+
+        # 2. Check flow control（此时没有在途交换，与 OrcaLink 后台循环不会并发访问客户端状态）
+        paused = False
+        if self.orcalink_client and hasattr(self.orcalink_client, 'should_pause_this_cycle'):
+            paused = self.orcalink_client.should_pause_this_cycle()
+
+        # 3. 提交本步交换：采集 SITE 位置（主线程），发布与订阅在后台循环上执行
+        positions = None
+        if not paused and self.position_publish_module:
+            positions = self.position_publish_module.collect_site_positions()
+        self.pipeline.submit(self._exchange(positions))
+        return not paused
+
+    async def _exchange(self, positions):
+        if positions:
+            await self.orcalink_client.publish_positions(positions)
+        return await self.orcalink_client.subscribe_forces()
+
     def shutdown(self):
         """Shutdown the mode"""
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
         self.force_application_module = None
         self.position_publish_module = None
 
@@ -0,0 +1,158 @@
+"""
+One-step-overlap exchange pipeline for the force coupling modes
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PIPELINE_TIMEOUT_SEC = 5.0
+DEFAULT_PIPELINE_STATS_INTERVAL = 500
+
+
+class CouplingPipeline:
+    """Pipelined SPH/MuJoCo exchange
+
+    The OrcaLink event loop runs on a background thread (run_forever). Each coupling step
+    submits one exchange coroutine (publish the positions of this step, then subscribe forces)
+    and applies the forces returned by the exchange submitted on the previous step, so
+    MuJoCo step N runs while SPH computes step N with the positions of step N-1.
+
+    At most one exchange is in flight, the OrcaLink calls stay in submission order and the
+    applied forces lag by exactly one coupling step. Latency is accounted per exchange:
+    lag in steps, submit -> done wall time, and how long the main thread blocked waiting.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 timeout_sec: float = DEFAULT_PIPELINE_TIMEOUT_SEC,
+                 stats_interval: int = DEFAULT_PIPELINE_STATS_INTERVAL):
+        """
+        Args:
+            loop: OrcaLinkBridge 的持久事件循环（OrcaLinkClient 的 gRPC 通道绑定在其上）
+            timeout_sec: 等待上一次交换完成的最长时间，超时则本步暂停 MuJoCo
+            stats_interval: 每完成多少次交换输出一次 [COUPLING_PIPELINE_STATS]
+        """
+        self._loop = loop
+        self._timeout_sec = timeout_sec
+        self._stats_interval = stats_interval
+
+        self._step_index = 0
+        # (future, submit_step, submit_time)，done_time 由 loop 线程的回调写入
+        self._inflight: Optional[Tuple[Any, int, float]] = None
+        self._done_times = {}
+
+        self._exchanges = 0
+        self._lag_steps_sum = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._wait_sum = 0.0
+        self._timeouts = 0
+        self._errors = 0
+
+        self._thread = threading.Thread(target=self._run_loop, name="OrcaLinkPipeline", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def has_inflight(self) -> bool:
+        return self._inflight is not None
+
+    def collect(self) -> Tuple[bool, Any]:
+        """
+        Wait for the exchange submitted on the previous step.
+
+        Returns:
+            (ready, result): ready=False 表示上一次交换在 timeout 内未完成（仍保持在途，下一步继续等待），
+            此时不得提交新的交换；无在途交换时返回 (True, None)
+        """
+        self._step_index += 1
+        if self._inflight is None:
+            return True, None
+
+        future, submit_step, submit_time = self._inflight
+        wait_start = time.monotonic()
+        try:
+            result = future.result(timeout=self._timeout_sec)
+        except concurrent.futures.TimeoutError:
+            self._wait_sum += time.monotonic() - wait_start
+            self._timeouts += 1
+            logger.warning(
+                f"Coupling exchange not completed within {self._timeout_sec}s "
+                f"(submitted at step {submit_step}), pausing MuJoCo"
+            )
+            return False, None
+        except Exception as e:
+            result = None
+            self._errors += 1
+            logger.error(f"Coupling exchange failed: {e}", exc_info=True)
+        now = time.monotonic()
+        self._wait_sum += now - wait_start
+        self._inflight = None
+
+        latency = self._done_times.pop(id(future), now) - submit_time
+        self._exchanges += 1
+        self._lag_steps_sum += self._step_index - submit_step
+        self._latency_sum += latency
+        self._latency_max = max(self._latency_max, latency)
+        if self._stats_interval > 0 and self._exchanges % self._stats_interval == 0:
+            self.log_stats()
+        return True, result
+
+    def submit(self, coro) -> None:
+        """Hand the exchange coroutine of this step to the background loop."""
+        if self._inflight is not None:
+            raise RuntimeError("CouplingPipeline.submit() called with an exchange still in flight")
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        future_id = id(future)
+        future.add_done_callback(lambda _f: self._done_times.__setitem__(future_id, time.monotonic()))
+        self._inflight = (future, self._step_index, time.monotonic())
+
+    def get_stats(self) -> dict:
+        n = max(self._exchanges, 1)
+        return {
+            "exchanges": self._exchanges,
+            "lag_steps_avg": self._lag_steps_sum / n,
+            "latency_ms_avg": self._latency_sum / n * 1e3,
+            "latency_ms_max": self._latency_max * 1e3,
+            "wait_ms_avg": self._wait_sum / n * 1e3,
+            "timeouts": self._timeouts,
+            "errors": self._errors,
+        }
+
+    def log_stats(self) -> None:
+        stats = self.get_stats()
+        logger.info(
+            "[COUPLING_PIPELINE_STATS] "
+            f"exchanges={stats['exchanges']} "
+            f"lag_steps_avg={stats['lag_steps_avg']:.2f} "
+            f"latency_ms_avg={stats['latency_ms_avg']:.3f} "
+            f"latency_ms_max={stats['latency_ms_max']:.3f} "
+            f"wait_ms_avg={stats['wait_ms_avg']:.3f} "
+            f"timeouts={stats['timeouts']} errors={stats['errors']}"
+        )
+
+    def stop(self) -> None:
+        """Drain the in-flight exchange, stop the background loop and hand it back to the caller's thread."""
+        if not self._thread.is_alive():
+            return
+        if self._inflight is not None:
+            future = self._inflight[0]
+            try:
+                future.result(timeout=self._timeout_sec)
+            except Exception as e:
+                logger.warning(f"Dropping in-flight coupling exchange on stop: {e}")
+                future.cancel()
+            self._inflight = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=self._timeout_sec)
+        if self._exchanges:
+            self.log_stats()
@@ -0,0 +1,374 @@
+"""
+Same-host shared-memory transport for the OrcaLink force / position channels
+"""
+
+import json
+import logging
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+SHM_RING_MAGIC = 0x4F4C5352  # "OLSR"
+SHM_RING_VERSION = 2  # 2: force ring 带 torque（宽度 6）
+DEFAULT_RING_SLOTS = 4
+# 名称表（JSON，utf-8）每个对象预留的字节数
+NAME_BYTES_PER_OBJECT = 128
+
+POSE_WIDTH = 7   # x y z qw qx qy qz
+FORCE_WIDTH = 6  # fx fy fz tx ty tz
+
+# 段首部，所有字段小端
+_HEADER_DTYPE = np.dtype([
+    ('magic', '<u4'),
+    ('version', '<u4'),
+    ('capacity', '<u4'),           # 槽位数
+    ('max_n', '<u4'),              # 每槽最多对象数
+    ('width', '<u4'),              # 每个对象的 float64 个数
+    ('producer_attached', '<u4'),  # 写端已连接（非 0）
+    ('consumer_attached', '<u4'),  # 读端已连接（非 0）
+    ('names_version', '<u4'),      # 名称表每次更新 +1
+    ('write_seq', '<u8'),          # 最近一次写完的序号（从 1 开始，0 表示尚无数据）
+    ('names_len', '<u4'),
+    ('owner_pid', '<u4'),          # 创建段的进程，用于判断同名段是否为残留
+])
+# 槽位头部，后接 float64 (max_n, width)
+_SLOT_DTYPE = np.dtype([
+    ('seq', '<u8'),   # 写入中置 0，写完置为序号；读端复制前后比较以发现撕裂
+    ('n', '<u4'),
+    ('reserved', '<u4'),
+    ('time', '<f8'),
+])
+
+
+class ShmRing:
+    """Single-producer / single-consumer ring of fixed-layout (n, width) float64 frames.
+
+    Segment layout: header | names table (JSON list of object ids) | capacity x (slot header + data).
+    The consumer always takes the newest complete frame (latest-wins), so a slow reader
+    never blocks the writer. Object ids are sent once through the names table, rows of
+    every frame follow that order.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        buf = shm.buf
+        self._header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=buf)
+        if int(self._header['magic']) != SHM_RING_MAGIC or int(self._header['version']) != SHM_RING_VERSION:
+            raise ValueError(f"Shared memory '{shm.name}' is not an OrcaLink ring (version {SHM_RING_VERSION})")
+
+        self.capacity = int(self._header['capacity'])
+        self.max_n = int(self._header['max_n'])
+        self.width = int(self._header['width'])
+        names_offset = _HEADER_DTYPE.itemsize
+        self._names = np.ndarray((self.max_n * NAME_BYTES_PER_OBJECT,), dtype=np.uint8, buffer=buf, offset=names_offset)
+        slot_offset = names_offset + self._names.nbytes
+        slot_bytes = _SLOT_DTYPE.itemsize + self.max_n * self.width * 8
+        self._slots = []
+        for i in range(self.capacity):
+            offset = slot_offset + i * slot_bytes
+            slot_header = np.ndarray((), dtype=_SLOT_DTYPE, buffer=buf, offset=offset)
+            data = np.ndarray((self.max_n, self.width), dtype=np.float64, buffer=buf, offset=offset + _SLOT_DTYPE.itemsize)
+            self._slots.append((slot_header, data))
+
+        self._cached_names_version = -1
+        self._cached_names: List[str] = []
+
+    @staticmethod
+    def segment_size(capacity: int, max_n: int, width: int) -> int:
+        return (_HEADER_DTYPE.itemsize + max_n * NAME_BYTES_PER_OBJECT
+                + capacity * (_SLOT_DTYPE.itemsize + max_n * width * 8))
+
+    @classmethod
+    def create(cls, name: str, max_n: int, width: int, capacity: int = DEFAULT_RING_SLOTS) -> "ShmRing":
+        """
+        Create and own the segment *name*.
+
+        An existing segment of that name is only replaced if it is an OrcaLink ring whose
+        creating process is gone; otherwise FileExistsError is raised (another live session).
+        """
+        size = cls.segment_size(capacity, max_n, width)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            if not _is_stale_ring(name):
+                raise FileExistsError(f"Shared memory '{name}' is in use by another process")
+            logger.warning(f"Removing stale shared memory ring '{name}' left by an exited session")
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=shm.buf)
+        header[()] = 0
+        header['magic'] = SHM_RING_MAGIC
+        header['version'] = SHM_RING_VERSION
+        header['capacity'] = capacity
+        header['max_n'] = max_n
+        header['width'] = width
+        header['owner_pid'] = os.getpid()
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "ShmRing":
+        return cls(_open_existing(name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def write_seq(self) -> int:
+        return int(self._header['write_seq'])
+
+    def mark_attached(self, producer: bool) -> None:
+        self._header['producer_attached' if producer else 'consumer_attached'] = 1
+
+    def is_attached(self, producer: bool) -> bool:
+        return bool(self._header['producer_attached' if producer else 'consumer_attached'])
+
+    def set_names(self, names: List[str]) -> None:
+        """Producer: publish the object ids of the following frames."""
+        payload = json.dumps(list(names)).encode("utf-8")
+        if len(payload) > self._names.nbytes:
+            raise ValueError(f"Object id table of {len(names)} names exceeds {self._names.nbytes} bytes")
+        self._names[:len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+        self._header['names_len'] = len(payload)
+        self._header['names_version'] = int(self._header['names_version']) + 1
+        self._cached_names_version = int(self._header['names_version'])
+        self._cached_names = list(names)
+
+    def names(self) -> List[str]:
+        """Consumer: current object ids, decoded again only when the table changed."""
+        version = int(self._header['names_version'])
+        if version != self._cached_names_version:
+            length = int(self._header['names_len'])
+            self._cached_names = json.loads(self._names[:length].tobytes().decode("utf-8")) if length else []
+            self._cached_names_version = version
+        return self._cached_names
+
+    def write(self, frame: np.ndarray, frame_time: float = 0.0) -> int:
+        """Producer: copy an (n, width) frame into the next slot, returns its sequence number."""
+        n = len(frame)
+        if n > self.max_n:
+            raise ValueError(f"Frame of {n} objects exceeds ring capacity {self.max_n}")
+        seq = self.write_seq + 1
+        slot_header, data = self._slots[seq % self.capacity]
+        slot_header['seq'] = 0
+        data[:n] = frame
+        slot_header['n'] = n
+        slot_header['time'] = frame_time
+        slot_header['seq'] = seq
+        self._header['write_seq'] = seq
+        return seq
+
+    def read_latest(self, last_seq: int, out: np.ndarray) -> Optional[Tuple[int, int, float]]:
+        """
+        Consumer: copy the newest complete frame newer than last_seq into out (max_n, width).
+
+        Returns (seq, n, time), or None if there is no new frame or the slot was overwritten while copying.
+        """
+        seq = self.write_seq
+        if seq == 0 or seq == last_seq:
+            return None
+        slot_header, data = self._slots[seq % self.capacity]
+        if int(slot_header['seq']) != seq:
+            return None
+        n = int(slot_header['n'])
+        frame_time = float(slot_header['time'])
+        out[:n] = data[:n]
+        if int(slot_header['seq']) != seq:
+            return None  # 复制期间被写端覆盖（撕裂），本次视为无新数据
+        return seq, n, frame_time
+
+    def close(self) -> None:
+        self._header = None
+        self._names = None
+        self._slots = []
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _open_existing(name: str) -> shared_memory.SharedMemory:
+    """Open a segment created elsewhere without letting this process's resource tracker unlink it at exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python >= 3.13
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def _is_stale_ring(name: str) -> bool:
+    """True only if *name* is an OrcaLink ring whose creating process no longer exists."""
+    try:
+        shm = _open_existing(name)
+    except (FileNotFoundError, OSError):
+        return False
+    try:
+        if shm.size < _HEADER_DTYPE.itemsize:
+            return False
+        header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=shm.buf)
+        valid = int(header['magic']) == SHM_RING_MAGIC
+        owner_pid = int(header['owner_pid'])
+        del header
+    finally:
+        shm.close()
+    if not valid or owner_pid == 0 or owner_pid == os.getpid():
+        return False
+    try:
+        os.kill(owner_pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+class _ShmPosition:
+    __slots__ = ('object_id', 'position', 'rotation')
+
+    def __init__(self, object_id: str, position: np.ndarray, rotation: np.ndarray):
+        self.object_id = object_id
+        self.position = position
+        self.rotation = rotation
+
+
+class _ShmForce:
+    __slots__ = ('object_id', 'force', 'torque')
+
+    def __init__(self, object_id: str, force: np.ndarray, torque: np.ndarray):
+        self.object_id = object_id
+        self.force = force
+        self.torque = torque
+
+
+class SharedMemoryOrcaLinkClient:
+    """OrcaLinkClient facade that moves the coupling data onto shared-memory rings.
+
+    Same coroutine API as OrcaLinkClient for the calls the coupling modes make
+    (publish_positions / subscribe_forces / subscribe_positions), so ForcePositionMode,
+    SpringConstraintMode and MultiPointForceMode run unchanged on top of it. Everything else
+    (session, flow control, shutdown) is forwarded to the wrapped gRPC client.
+
+    Three rings named ``{shm_name}_pose_out`` (MuJoCo -> SPH, (N, 7)), ``{shm_name}_force_in``
+    (SPH -> MuJoCo, (N, 6) force + torque) and ``{shm_name}_pose_in`` (SPH -> MuJoCo, (N, 7)) are created here;
+    the SPH process attaches and sets its attached flag. Until the peer has attached a ring,
+    the corresponding call falls back to gRPC (cross-host runs, or an SPH build without shm support).
+    """
+
+    def __init__(self, client, shm_name: str, max_objects: int, slots: int = DEFAULT_RING_SLOTS):
+        """
+        Args:
+            client: 已连接的 OrcaLinkClient（gRPC），会话与流控仍走它
+            shm_name: 共享内存段名前缀，SPH 侧按同一名称 attach
+            max_objects: 每帧最多对象数（site / body 数）
+            slots: 每个 ring 的槽位数
+        """
+        self._client = client
+        max_objects = max(1, int(max_objects))
+        rings = []
+        try:
+            for suffix, width in (("pose_out", POSE_WIDTH), ("force_in", FORCE_WIDTH), ("pose_in", POSE_WIDTH)):
+                rings.append(ShmRing.create(f"{shm_name}_{suffix}", max_objects, width, slots))
+        except Exception:
+            for ring in rings:
+                ring.close()
+            raise
+        self._pose_out, self._force_in, self._pose_in = rings
+        self._pose_out.mark_attached(producer=True)
+        self._force_in.mark_attached(producer=False)
+        self._pose_in.mark_attached(producer=False)
+
+        self._pose_out_buf = np.zeros((max_objects, POSE_WIDTH), dtype=np.float64)
+        self._pose_out_names: List[str] = []
+        self._force_in_buf = np.zeros((max_objects, FORCE_WIDTH), dtype=np.float64)
+        self._pose_in_buf = np.zeros((max_objects, POSE_WIDTH), dtype=np.float64)
+        self._force_seq = 0
+        self._pose_seq = 0
+        # 复用的消息对象，force / position 是接收缓冲区对应行的视图
+        self._force_messages: List[_ShmForce] = []
+        self._force_message_names: List[str] = []
+        self._pose_messages: List[_ShmPosition] = []
+        self._pose_message_names: List[str] = []
+        self._shm_active = set()
+
+        logger.info(f"OrcaLink shared-memory transport: rings '{shm_name}_*' ({max_objects} objects, {slots} slots)")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def _peer_attached(self, ring: ShmRing, peer_is_producer: bool, channel: str) -> bool:
+        attached = ring.is_attached(producer=peer_is_producer)
+        if attached and channel not in self._shm_active:
+            self._shm_active.add(channel)
+            logger.info(f"OrcaLink shared-memory transport: peer attached to '{ring.name}', {channel} bypasses gRPC")
+        return attached
+
+    async def publish_positions(self, positions):
+        if not self._peer_attached(self._pose_out, peer_is_producer=False, channel="publish_positions"):
+            return await self._client.publish_positions(positions)
+        n = len(positions)
+        names = [p.object_id for p in positions]
+        if names != self._pose_out_names:
+            self._pose_out.set_names(names)
+            self._pose_out_names = names
+        frame = self._pose_out_buf[:n]
+        frame[:, :3] = [p.position for p in positions]
+        frame[:, 3:] = [p.rotation for p in positions]
+        self._pose_out.write(frame, time.time())
+        return True
+
+    async def subscribe_forces(self, *args, **kwargs):
+        if not self._peer_attached(self._force_in, peer_is_producer=True, channel="subscribe_forces"):
+            return await self._client.subscribe_forces(*args, **kwargs)
+        result = self._force_in.read_latest(self._force_seq, self._force_in_buf)
+        if result is None:
+            return []
+        self._force_seq, n, _ = result
+        names = self._force_in.names()[:n]
+        if names != self._force_message_names:
+            self._force_messages = [
+                _ShmForce(name, self._force_in_buf[i, :3], self._force_in_buf[i, 3:])
+                for i, name in enumerate(names)
+            ]
+            self._force_message_names = names
+        return self._force_messages[:n]
+
+    async def subscribe_positions(self, *args, **kwargs):
+        if not self._peer_attached(self._pose_in, peer_is_producer=True, channel="subscribe_positions"):
+            return await self._client.subscribe_positions(*args, **kwargs)
+        result = self._pose_in.read_latest(self._pose_seq, self._pose_in_buf)
+        if result is None:
+            return []
+        self._pose_seq, n, _ = result
+        names = self._pose_in.names()[:n]
+        if names != self._pose_message_names:
+            self._pose_messages = [
+                _ShmPosition(name, self._pose_in_buf[i, :3], self._pose_in_buf[i, 3:])
+                for i, name in enumerate(names)
+            ]
+            self._pose_message_names = names
+        return self._pose_messages[:n]
+
+    def close(self) -> None:
+        """Release and unlink the rings (the wrapped gRPC client is shut down by OrcaLinkBridge)."""
+        for ring in (self._pose_out, self._force_in, self._pose_in):
+            try:
+                ring.close()
+            except Exception as e:
+                logger.warning(f"Error closing shared memory ring: {e}")
@@ -4,7 +4,7 @@ from __future__ import annotations
 import logging
 import sys
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from uuid import uuid4
 
 import gymnasium as gym
@@ -12,6 +12,8 @@ import numpy as np
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_QPOS_CHUNK_ROWS = 256
+
 
 def particle_h5_has_mujoco_frames(h5_path: Path) -> bool:
     import h5py
@@ -27,35 +29,70 @@ def _decode_h5_joint_name(x: object) -> str:
     return str(x)
 
 
-def _unpack_joint_name_packed_row(
-    row: np.ndarray,
+class _QposChunkReader:
+    """
+    Lazy reader of mujoco_frames/qpos: loads the ``chunk_rows`` rows around the playback cursor
+    in one HDF5 read, so startup does not load the whole dataset.
+    """
+
+    def __init__(self, qpos_ds, chunk_rows: int = DEFAULT_QPOS_CHUNK_ROWS) -> None:
+        self._ds = qpos_ds
+        self._chunk_rows = max(1, int(chunk_rows))
+        self._block: Optional[np.ndarray] = None
+        self._start = 0
+        self._stop = 0
+
+    def row(self, i: int) -> np.ndarray:
+        if self._block is None or not (self._start <= i < self._stop):
+            self._start = i - i % self._chunk_rows
+            self._stop = min(self._start + self._chunk_rows, int(self._ds.shape[0]))
+            self._block = np.asarray(self._ds[self._start:self._stop], dtype=np.float64)
+        return self._block[i - self._start]
+
+
+def _build_packed_qpos_scatter_index(
+    env,
     joint_names: List[str],
     joint_qpos_sizes: np.ndarray,
-) -> Dict[str, np.ndarray]:
-    out: Dict[str, np.ndarray] = {}
-    off = 0
-    for name, sz in zip(joint_names, joint_qpos_sizes.ravel()):
-        sz_i = int(sz)
-        out[name] = np.asarray(row[off : off + sz_i], dtype=np.float64).copy()
-        off += sz_i
-    if off != row.size:
-        raise ValueError(f"unpack joint qpos: used {off} elements, row has {row.size}")
-    return out
-
-
-def _filter_joint_qpos_for_env(env, joint_qpos: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
-    """Drop joints not in the current model (e.g. auxiliary / random-name); avoid invalid set_joint_qpos."""
-    jd = env.unwrapped.model.get_joint_dict()
-    if not jd:
-        return joint_qpos
-    known = set(jd.keys())
-    return {k: v for k, v in joint_qpos.items() if k in known}
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    (packed columns, data.qpos indices, skipped joint count): ``qpos[dst] = row[cols]`` applies
+    one joint_name_packed row. Joints absent from the current model (e.g. auxiliary) are dropped.
+    """
+    uw = env.unwrapped
+    sizes = np.asarray(joint_qpos_sizes, dtype=np.intp).reshape(-1)
+    col_starts = np.cumsum(sizes) - sizes
+    jd = uw.model.get_joint_dict()
+    keep = [j for j, name in enumerate(joint_names) if not jd or name in jd]
+    n_skip = len(joint_names) - len(keep)
+    if not keep:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), n_skip
+
+    keep_names = [joint_names[j] for j in keep]
+    keep_sizes = sizes[keep]
+    model_sizes = np.asarray(uw.query_joint_lengths(keep_names)[0], dtype=np.intp).reshape(-1)
+    if not np.array_equal(model_sizes, keep_sizes):
+        bad = [n for n, a, b in zip(keep_names, keep_sizes, model_sizes) if a != b]
+        raise ValueError(f"coupled playback: joint qpos size mismatch vs current model: {bad}")
+    qpos_offsets = np.asarray(uw.query_joint_offsets(keep_names)[0], dtype=np.intp).reshape(-1)
+
+    # 每个保留关节展开为 [start, start + size)
+    within = np.arange(int(keep_sizes.sum()), dtype=np.intp) - np.repeat(
+        np.cumsum(keep_sizes) - keep_sizes, keep_sizes
+    )
+    cols = np.repeat(col_starts[keep], keep_sizes) + within
+    dst = np.repeat(qpos_offsets, keep_sizes) + within
+    return cols, dst, n_skip
 
 
 def run_coupled_particle_mujoco_playback(config: Dict) -> None:
     from orcasph_client.particle_replay import run_playback
 
-    from .fluid_session import _fluid_render_viewport_to_engine, _resolve_particle_render_server
+    from .fluid_session import (
+        _close_fluid_render_dispatcher,
+        _fluid_render_viewport_to_engine,
+        _resolve_particle_render_server,
+    )
 
     pr_run = config.get("particle_render_run") or {}
     h5_path = Path(pr_run["playback_h5"]).resolve()
@@ -66,16 +103,20 @@ def run_coupled_particle_mujoco_playback(config: Dict) -> None:
         )
         sys.exit(1)
     fps = float(pr_run.get("playback_fps") or 0.0)
+    # 默认 OrcaSim 跟不上时合并帧（只发最新一帧）；False 则每帧等待 UpdateLocalEnv 返回
+    render_coalesce = bool(pr_run.get("playback_render_coalesce", True))
 
     import h5py
 
-    with h5py.File(h5_path, "r") as f:
+    # 文件在回放期间保持打开，qpos 按游标分块读取
+    f = h5py.File(h5_path, "r")
+    try:
         n_particle = len(f["frames"]["sim_time"])
         nq_meta = int(f.attrs.get("mujoco_nq", 0))
         schema = int(f.attrs.get("mujoco_schema_version", 0) or 0)
         layout = str(f.attrs.get("qpos_layout", "") or "")
         mf = f["mujoco_frames"]
-        qpos_all = np.asarray(mf["qpos"][:], dtype=np.float64)
+        qpos_ds = mf["qpos"]
         joint_names: Optional[List[str]] = None
         joint_sizes: Optional[np.ndarray] = None
         if "joint_names" in mf and "joint_qpos_sizes" in mf:
@@ -96,14 +137,18 @@ def run_coupled_particle_mujoco_playback(config: Dict) -> None:
         use_joint_packed = joint_names is not None and joint_sizes is not None
         if use_joint_packed:
             expected_w = int(joint_sizes.sum())
-            if qpos_all.ndim == 2 and qpos_all.shape[1] != expected_w:
+            if qpos_ds.ndim == 2 and qpos_ds.shape[1] != expected_w:
                 raise ValueError(
-                    f"mujoco_frames/qpos width {qpos_all.shape[1]} != "
+                    f"mujoco_frames/qpos width {qpos_ds.shape[1]} != "
                     f"sum(joint_qpos_sizes) {expected_w}"
                 )
+    except Exception:
+        f.close()
+        raise
 
-    nq = int(qpos_all.shape[1])
-    n_qrows = int(qpos_all.shape[0])
+    nq = int(qpos_ds.shape[1])
+    n_qrows = int(qpos_ds.shape[0])
+    qpos_reader = _QposChunkReader(qpos_ds, int(pr_run.get("playback_qpos_chunk_rows") or DEFAULT_QPOS_CHUNK_ROWS))
 
     orcagym_cfg = config["orcagym"]
     suffix = str(uuid4())[:8]
@@ -121,44 +166,47 @@ def run_coupled_particle_mujoco_playback(config: Dict) -> None:
         },
         max_episode_steps=sys.maxsize,
     )
-    env = gym.make(env_id, disable_env_checker=True)
-    env.reset()
+    try:
+        env = gym.make(env_id, disable_env_checker=True)
+        env.reset()
+    except Exception:
+        f.close()
+        raise
 
     model_nq = int(env.unwrapped.model.nq)
 
-    if use_joint_packed and joint_names is not None and joint_sizes is not None:
-        jd = env.unwrapped.model.get_joint_dict()
-        if jd:
-            known = set(jd.keys())
-            n_skip = sum(1 for n in joint_names if n not in known)
+    try:
+        scatter_cols = scatter_dst = None
+        if use_joint_packed and joint_names is not None and joint_sizes is not None:
+            scatter_cols, scatter_dst, n_skip = _build_packed_qpos_scatter_index(env, joint_names, joint_sizes)
             if n_skip:
                 logger.info(
                     "coupled playback: %d joint name(s) in HDF5 are absent from the "
                     "current model (e.g. auxiliary); ignored for playback.",
                     n_skip,
                 )
-        logger.info(
-            "coupled playback: joint_name_packed (%d joints in file, row width %d)",
-            len(joint_names),
-            nq,
-        )
-    else:
-        if nq_meta and nq_meta != model_nq:
-            raise ValueError(f"HDF5 mujoco_nq={nq_meta} != model.nq={model_nq}")
-        if nq != model_nq:
-            raise ValueError(f"mujoco_frames/qpos width {nq} != model.nq={model_nq}")
-        logger.info(
-            "coupled playback: legacy mjcf_order qpos (deprecated); prefer re-recording with joint_name_packed"
-        )
+            logger.info(
+                "coupled playback: joint_name_packed (%d joints in file, row width %d)",
+                len(joint_names),
+                nq,
+            )
+        else:
+            if nq_meta and nq_meta != model_nq:
+                raise ValueError(f"HDF5 mujoco_nq={nq_meta} != model.nq={model_nq}")
+            if nq != model_nq:
+                raise ValueError(f"mujoco_frames/qpos width {nq} != model.nq={model_nq}")
+            logger.info(
+                "coupled playback: legacy mjcf_order qpos (deprecated); prefer re-recording with joint_name_packed"
+            )
 
-    if n_qrows != n_particle:
-        logger.warning(
-            "mujoco_frames/qpos rows %d != particle frames %d (extra qpos rows ignored)",
-            n_qrows,
-            n_particle,
-        )
+        if n_qrows != n_particle:
+            logger.warning(
+                "mujoco_frames/qpos rows %d != particle frames %d (extra qpos rows ignored)",
+                n_qrows,
+                n_particle,
+            )
 
-    try:
+        mj_qpos = env.unwrapped.gym._mjData.qpos
 
         def per_frame_callback(
             loop_idx: int,
@@ -168,20 +216,18 @@ def run_coupled_particle_mujoco_playback(config: Dict) -> None:
         ) -> None:
             if loop_idx >= n_qrows:
                 return
-            row = qpos_all[loop_idx]
-            if use_joint_packed and joint_names is not None and joint_sizes is not None:
-                joint_qpos = _unpack_joint_name_packed_row(row, joint_names, joint_sizes)
-                joint_qpos = _filter_joint_qpos_for_env(env, joint_qpos)
-                if joint_qpos:
-                    env.unwrapped.set_joint_qpos(joint_qpos)
+            row = qpos_reader.row(loop_idx)
+            if scatter_cols is not None:
+                # 预计算的 packed 列 -> data.qpos 下标，一次向量化赋值
+                mj_qpos[scatter_dst] = row[scatter_cols]
             else:
                 env.unwrapped.data.qpos[:] = row
             env.unwrapped.mj_forward()
-            # joint_name_packed: set_joint_qpos only writes _mjData; gym.render() sends gym.data.qpos (UpdateLocalEnv).
-            if use_joint_packed and joint_names is not None and joint_sizes is not None:
+            # joint_name_packed: the scatter only writes _mjData; gym.render() sends gym.data.qpos (UpdateLocalEnv).
+            if scatter_cols is not None:
                 env.unwrapped.update_data()
             # legacy mjcf_order: data.qpos was assigned directly; do not update_data() or _mjData would overwrite it.
-            _fluid_render_viewport_to_engine(env)
+            _fluid_render_viewport_to_engine(env, wait=not render_coalesce)
 
         run_playback(
             str(h5_path),
@@ -193,7 +239,10 @@ def run_coupled_particle_mujoco_playback(config: Dict) -> None:
             per_frame_callback=per_frame_callback,
         )
     finally:
+        # 先送完最后一帧并停掉 render 线程，它可能仍在驱动 env 的事件循环
+        _close_fluid_render_dispatcher()
         try:
             env.close()
         except Exception as e:
             logger.warning("coupled playback env.close(): %s", e)
+        f.close()
@@ -5,9 +5,12 @@ import logging
 import os
 import subprocess
 import sys
+import threading
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+import numpy as np
+
 from ..paths import FLUID_PACKAGE_DIR, ORCA_PLAYGROUND_ROOT
 
 logger = logging.getLogger(__name__)
@@ -64,6 +67,166 @@ def _fluid_send_end_simulation_from_config(config: Dict) -> None:
         send_end_simulation(pr_server, reason="simulation_finished")
 
 
+class _FluidRenderDispatcher:
+    """
+    Long-lived gym.render worker owned by the fluid session: one daemon thread and one asyncio loop.
+
+    Callers snapshot (qpos, time, contacts) on their own thread and hand it over with submit();
+    there is a single pending slot, so when OrcaSim is slower than the producer the older pending
+    frame is replaced (latest-frame-wins) and counted as dropped.
+    Requests run on the env's own loop when it is idle (stub created on it), otherwise on the dispatcher's loop,
+    so no event loop / ThreadPoolExecutor is created per frame.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # (seq, gym_core, env_loop, qpos, time, contacts)
+        self._pending: Optional[tuple] = None
+        self._next_seq = 0
+        self._done_seq = 0
+        self._done_error: Optional[BaseException] = None
+        self._closed = False
+        self._submitted = 0
+        self._served = 0
+        self._dropped = 0
+        self._failed = 0
+        self._loop = None
+        self._thread = threading.Thread(target=self._worker, name="FluidRenderDispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, env) -> int:
+        """Snapshot the current MuJoCo state of env and queue it for rendering, returns the request seq (0 if skipped)."""
+        unwrapped = env.unwrapped
+        gym_core = getattr(unwrapped, "gym", None)
+        if gym_core is None or not hasattr(gym_core, "render"):
+            return 0
+        mj_data = getattr(gym_core, "_mjData", None)
+        if hasattr(gym_core, "update_local_env") and mj_data is not None:
+            # 与 gym.render() 发送的内容一致：gym.data.qpos + _mjData.time + 接触快照，在调用线程上复制
+            build_contacts = getattr(gym_core, "_build_contact_data", None)
+            contacts = build_contacts() if build_contacts is not None else None
+            qpos = np.array(gym_core.data.qpos, dtype=np.float64, copy=True)
+            sim_time = float(mj_data.time)
+        else:
+            qpos, sim_time, contacts = None, None, None
+
+        with self._cond:
+            if self._closed:
+                return 0
+            self._next_seq += 1
+            if self._pending is not None:
+                self._dropped += 1
+            self._pending = (self._next_seq, gym_core, getattr(unwrapped, "loop", None), qpos, sim_time, contacts)
+            self._submitted += 1
+            self._cond.notify_all()
+            return self._next_seq
+
+    def render_sync(self, env, timeout: float = 5.0) -> None:
+        """submit() and wait until this frame (or a newer one) has been sent; raises the render error of this frame."""
+        seq = self.submit(env)
+        if seq == 0:
+            return
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._done_seq >= seq or self._closed, timeout=timeout):
+                raise TimeoutError(f"gym.render() not served within {timeout}s")
+            if self._done_seq == seq and self._done_error is not None:
+                raise self._done_error
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """Wait until the pending frame (if any) has been served."""
+        with self._cond:
+            seq = self._next_seq
+            return self._cond.wait_for(lambda: self._done_seq >= seq or self._closed, timeout=timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "submitted": self._submitted,
+                "served": self._served,
+                "dropped": self._dropped,
+                "failed": self._failed,
+            }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Serve the pending frame, stop the worker and log the served / dropped counts."""
+        with self._cond:
+            if self._closed:
+                return
+        self.drain(timeout=timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+        stats = self.get_stats()
+        if stats["submitted"]:
+            logger.info(
+                "gym.render dispatcher: submitted=%d served=%d dropped=%d failed=%d",
+                stats["submitted"], stats["served"], stats["dropped"], stats["failed"],
+            )
+
+    def _worker(self) -> None:
+        import asyncio
+
+        self._loop = asyncio.new_event_loop()
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                    if self._pending is None:
+                        break
+                    request, self._pending = self._pending, None
+                seq, gym_core, env_loop, qpos, sim_time, contacts = request
+                if qpos is not None:
+                    coro = gym_core.update_local_env(qpos, sim_time, contacts=contacts)
+                else:
+                    coro = gym_core.render()
+                # env 自己的循环空闲时在本线程驱动它（gRPC stub 绑定在该循环上），否则用常驻循环
+                loop = env_loop if env_loop is not None and not env_loop.is_closed() and not env_loop.is_running() else self._loop
+                error = None
+                try:
+                    loop.run_until_complete(coro)
+                except Exception as e:
+                    error = e
+                with self._cond:
+                    if error is None:
+                        self._served += 1
+                    else:
+                        self._failed += 1
+                        # 每次会话只在首次失败时告警，避免逐帧刷屏
+                        if self._failed == 1:
+                            logger.warning("gym.render() (dispatcher) failed: %s", error)
+                    self._done_seq = seq
+                    self._done_error = error
+                    self._cond.notify_all()
+        finally:
+            self._loop.close()
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+
+
+_fluid_render_dispatcher: Optional[_FluidRenderDispatcher] = None
+_fluid_render_dispatcher_lock = threading.Lock()
+
+
+def _get_fluid_render_dispatcher() -> _FluidRenderDispatcher:
+    """Session-wide render dispatcher, started on first use."""
+    global _fluid_render_dispatcher
+    with _fluid_render_dispatcher_lock:
+        if _fluid_render_dispatcher is None:
+            _fluid_render_dispatcher = _FluidRenderDispatcher()
+        return _fluid_render_dispatcher
+
+
+def _close_fluid_render_dispatcher() -> None:
+    """Drain and stop the render dispatcher (no-op if it was never started)."""
+    global _fluid_render_dispatcher
+    with _fluid_render_dispatcher_lock:
+        dispatcher, _fluid_render_dispatcher = _fluid_render_dispatcher, None
+    if dispatcher is not None:
+        dispatcher.close()
+
+
 def _fluid_sync_initial_viewport_to_engine(env) -> None:
     """reset_simulation + 强制 gym.render，把初始 qpos 推到 OrcaSim。
 
@@ -72,12 +235,9 @@ def _fluid_sync_initial_viewport_to_engine(env) -> None:
     直接再次调用 loop.run_until_complete() 会触发 RuntimeError: This event loop
     is already running。此处改为：
       1. 若循环当前没有在运行（正常情况），直接 run_until_complete。
-      2. 若循环被标记为 running（极少发生，通常是嵌套调用），在独立线程里跑以绕过限制。
-      3. 若循环已关闭，新建一个临时循环完成同步。
+      2. 若循环被标记为 running（极少发生，通常是嵌套调用）或已关闭，
+         交给常驻的 render dispatcher 线程并等待完成。
     """
-    import asyncio
-    import concurrent.futures
-
     unwrapped = env.unwrapped
     if not hasattr(unwrapped, "reset_simulation"):
         return
@@ -90,62 +250,29 @@ def _fluid_sync_initial_viewport_to_engine(env) -> None:
     if gym_core is None or not hasattr(gym_core, "render"):
         return
 
-    async def _do_render():
-        await gym_core.render()
-
-    def _run_in_thread():
-        """在新线程里跑一个全新的事件循环执行 render（绕过已运行/已关闭的原循环）。"""
-        new_loop = asyncio.new_event_loop()
-        try:
-            new_loop.run_until_complete(_do_render())
-        finally:
-            new_loop.close()
-
     try:
-        if loop is None or loop.is_closed():
-            # 原循环已关闭，新建临时循环
-            _run_in_thread()
-        elif loop.is_running():
-            # 循环正在运行（极少情况），转线程执行
-            logger.debug("事件循环仍在运行，使用线程执行 gym.render()")
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as ex:
-                ex.submit(_run_in_thread).result(timeout=5)
+        if loop is None or loop.is_closed() or loop.is_running():
+            logger.debug("事件循环不可用，使用 render dispatcher 执行 gym.render()")
+            _get_fluid_render_dispatcher().render_sync(env, timeout=5)
         else:
-            loop.run_until_complete(_do_render())
+            loop.run_until_complete(gym_core.render())
         logger.info("✅ 已将初始 qpos 同步到 OrcaSim（UpdateLocalEnv）")
     except Exception as e:
         logger.warning(f"gym.render() 同步失败: {e}")
 
 
-def _fluid_render_viewport_to_engine(env) -> None:
-    """Push current MuJoCo state to OrcaSim via gym.render (no reset_simulation). Used for kinematic playback."""
-    import asyncio
-    import concurrent.futures
-
-    unwrapped = env.unwrapped
-    gym_core = getattr(unwrapped, "gym", None)
-    loop = getattr(unwrapped, "loop", None)
-    if gym_core is None or not hasattr(gym_core, "render"):
-        return
-
-    async def _do_render():
-        await gym_core.render()
-
-    def _run_in_thread():
-        new_loop = asyncio.new_event_loop()
-        try:
-            new_loop.run_until_complete(_do_render())
-        finally:
-            new_loop.close()
+def _fluid_render_viewport_to_engine(env, wait: bool = False) -> None:
+    """Push current MuJoCo state to OrcaSim via gym.render (no reset_simulation). Used for kinematic playback.
 
+    The state is snapshotted on the caller's thread and sent by the session render dispatcher;
+    with wait=False frames are coalesced (latest-frame-wins) when OrcaSim is slower than the caller.
+    """
     try:
-        if loop is None or loop.is_closed():
-            _run_in_thread()
-        elif loop.is_running():
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as ex:
-                ex.submit(_run_in_thread).result(timeout=5)
+        dispatcher = _get_fluid_render_dispatcher()
+        if wait:
+            dispatcher.render_sync(env, timeout=5)
         else:
-            loop.run_until_complete(_do_render())
+            dispatcher.submit(env)
     except Exception as e:
         logger.warning("gym.render() (kinematic playback) failed: %s", e)
 
@@ -300,6 +427,7 @@ def _atexit_fluid_visual_reset() -> None:
                 _fluid_sync_initial_viewport_to_engine(env)
             except Exception as e:
                 logger.warning(f"atexit 同步 OrcaSim 视口失败: {e}")
+            _close_fluid_render_dispatcher()
             try:
                 env.close()
             except Exception:
@@ -311,6 +439,8 @@ def _atexit_fluid_visual_reset() -> None:
         st["session_active"] = False
 
 
+# atexit 后注册先执行：dispatcher 先注册，保证在视口重置之后才停掉
+atexit.register(_close_fluid_render_dispatcher)
 atexit.register(_atexit_fluid_visual_reset)
 
 
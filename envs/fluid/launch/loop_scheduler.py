@@ -0,0 +1,186 @@
+"""流体主循环的固定频率调度与分阶段计时（[MUJOCO_TIME_STATS]）。"""
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+
+MUJOCO_STAT_MARKER = "[MUJOCO_TIME_STATS]"
+
+SCHEDULER_POLICIES = ("catch_up", "skip")
+DEFAULT_MAX_CATCH_UP_STEPS = 5
+DEFAULT_STATS_INTERVAL_SEC = 5.0
+
+
+class FixedRateScheduler:
+    """
+    Drift-free fixed-rate pacing on the monotonic clock.
+
+    Deadlines are t0 + k * period, so an iteration that overruns does not shift the later ones.
+    When behind schedule:
+    - catch_up: run the next iterations back to back until the deadline is met again,
+      at most max_catch_up_steps periods behind (older ticks are dropped and counted as skipped)
+    - skip: drop every missed tick and wait for the next deadline on the grid
+    """
+
+    def __init__(self, period: float, policy: str = "catch_up",
+                 max_catch_up_steps: int = DEFAULT_MAX_CATCH_UP_STEPS):
+        if policy not in SCHEDULER_POLICIES:
+            raise ValueError(f"Unsupported scheduler policy: {policy}, supported: {SCHEDULER_POLICIES}")
+        self.period = float(period)
+        self.policy = policy
+        self.max_catch_up_steps = max(0, int(max_catch_up_steps))
+        self._deadline: Optional[float] = None
+        self.overruns = 0
+        self.skipped_ticks = 0
+
+    def start(self) -> None:
+        self._deadline = time.monotonic() + self.period
+
+    def wait_next(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """
+        Wait until the next deadline. Returns True if stop_event was set while waiting.
+        """
+        if self._deadline is None:
+            self.start()
+        now = time.monotonic()
+        lateness = now - self._deadline
+        if lateness < 0:
+            remaining = -lateness
+            self._deadline += self.period
+            if stop_event is not None:
+                return stop_event.wait(timeout=remaining)
+            time.sleep(remaining)
+            return False
+
+        self.overruns += 1
+        missed = int(math.floor(lateness / self.period))
+        if self.policy == "skip":
+            # 丢弃错过的 tick（含当前 deadline），等到网格上的下一个 deadline
+            self.skipped_ticks += missed + 1
+            self._deadline += (missed + 1) * self.period
+            remaining = self._deadline - now
+            self._deadline += self.period
+            if stop_event is not None:
+                return stop_event.wait(timeout=remaining)
+            time.sleep(remaining)
+            return False
+
+        # catch_up：不睡眠，下一轮紧接着执行；落后太多时只保留 max_catch_up_steps 个周期
+        if missed > self.max_catch_up_steps:
+            dropped = missed - self.max_catch_up_steps
+            self.skipped_ticks += dropped
+            self._deadline += dropped * self.period
+        self._deadline += self.period
+        return stop_event is not None and stop_event.is_set()
+
+
+class PhaseTimer:
+    """
+    Lap-style per-phase time accumulators for one loop iteration.
+
+    start() at the top of the iteration, lap(name) after each phase adds the time since the
+    previous mark to that phase; the sums are reported as per-iteration averages.
+    """
+
+    def __init__(self, phases: List[str]):
+        self._phases = list(phases)
+        self._sums: Dict[str, float] = {name: 0.0 for name in self._phases}
+        self._iterations = 0
+        self._mark = 0.0
+
+    def start(self) -> None:
+        self._mark = time.perf_counter()
+        self._iterations += 1
+
+    def lap(self, name: str) -> None:
+        now = time.perf_counter()
+        if name not in self._sums:
+            self._phases.append(name)
+            self._sums[name] = 0.0
+        self._sums[name] += now - self._mark
+        self._mark = now
+
+    @property
+    def iterations(self) -> int:
+        return self._iterations
+
+    def averages_ms(self) -> Dict[str, float]:
+        n = max(self._iterations, 1)
+        return {name: self._sums[name] / n * 1e3 for name in self._phases}
+
+    def reset(self) -> None:
+        for name in self._sums:
+            self._sums[name] = 0.0
+        self._iterations = 0
+
+
+class MainLoopStats:
+    """
+    Periodic [MUJOCO_TIME_STATS] lines for the fluid main loop, same k=v style as OrcaSPH's
+    [TIME_STATS] so envs/fluid_stats can parse them::
+
+        [MUJOCO_TIME_STATS] steps=250 period_ms=20.000 loop_ms=7.512 sph_sync=3.100 physics=2.900 ...
+
+    Phase values are per-iteration averages (ms) over the interval; loop_ms is their sum without idle.
+    Lines go to the logger and, when given, to stats_log_f (the OrcaSPH log tailed by the stats viewers).
+    """
+
+    def __init__(self, scheduler: FixedRateScheduler, timer: PhaseTimer,
+                 interval_sec: float = DEFAULT_STATS_INTERVAL_SEC,
+                 stats_log_f: Optional[TextIO] = None,
+                 idle_phase: str = "idle"):
+        self._scheduler = scheduler
+        self._timer = timer
+        self._interval_sec = interval_sec
+        self._stats_log_f = stats_log_f
+        self._idle_phase = idle_phase
+        self._last_emit = time.monotonic()
+        self._last_overruns = 0
+        self._last_skipped = 0
+
+    def maybe_emit(self) -> None:
+        if self._interval_sec <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_emit < self._interval_sec:
+            return
+        self.emit(now)
+
+    def emit(self, now: Optional[float] = None) -> None:
+        if self._timer.iterations == 0:
+            return
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._last_emit
+        steps = self._timer.iterations
+        averages = self._timer.averages_ms()
+        loop_ms = sum(v for k, v in averages.items() if k != self._idle_phase)
+        overruns = self._scheduler.overruns - self._last_overruns
+        skipped = self._scheduler.skipped_ticks - self._last_skipped
+
+        fields = [
+            f"steps={steps}",
+            f"fps={steps / elapsed if elapsed > 0 else 0.0:.2f}",
+            f"period_ms={self._scheduler.period * 1e3:.3f}",
+            f"loop_ms={loop_ms:.3f}",
+        ]
+        fields += [f"{name}={value:.3f}" for name, value in averages.items()]
+        fields += [f"overruns={overruns}", f"skipped_ticks={skipped}", f"policy={self._scheduler.policy}"]
+        line = f"{MUJOCO_STAT_MARKER} " + " ".join(fields)
+
+        logger.info(line)
+        if self._stats_log_f is not None:
+            try:
+                self._stats_log_f.write(line + "\n")
+                self._stats_log_f.flush()
+            except OSError as e:
+                logger.warning("main loop stats log write: %s", e)
+                self._stats_log_f = None
+
+        self._timer.reset()
+        self._last_emit = now
+        self._last_overruns = self._scheduler.overruns
+        self._last_skipped = self._scheduler.skipped_ticks
@@ -62,7 +62,9 @@ class ProcessManager:
 
         if log_file:
             log_file.parent.mkdir(parents=True, exist_ok=True)
-            log_handle = open(log_file, "w", buffering=1)
+            # O_APPEND：主进程会向同一日志追加统计行（[MUJOCO_TIME_STATS] 等），
+            # "w" 打开时子进程按自己的偏移写入，会覆盖这些行
+            log_handle = open(log_file, "a", buffering=1)
             process = subprocess.Popen(
                 cmd,
                 stdout=log_handle,
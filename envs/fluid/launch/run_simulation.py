@@ -17,6 +17,7 @@ import gymnasium as gym
 
 from ..orcalink_bridge import OrcaLinkBridge
 from ..trajectory import TrajectoryRecorder, TrajectoryPlayer
+from ..trajectory.trajectory_h5 import DEFAULT_FLUSH_FRAMES
 from ..paths import FLUID_PACKAGE_DIR, ORCA_PLAYGROUND_ROOT
 from ..utils.scene_generator import SceneGenerator
 from ..utils.merge_particle_mujoco_h5 import merge_particle_mujoco_sidecar_into_particle_h5
@@ -24,6 +25,13 @@ from ..utils.mujoco_qpos_sidecar_recorder import (
     maybe_open_sidecar_for_record_config,
     mujoco_qpos_sidecar_tmp_path,
 )
+from .loop_scheduler import (
+    DEFAULT_MAX_CATCH_UP_STEPS,
+    DEFAULT_STATS_INTERVAL_SEC,
+    FixedRateScheduler,
+    MainLoopStats,
+    PhaseTimer,
+)
 from .fluid_session import (
     _fluid_atexit_state,
     _fluid_send_end_simulation_from_config,
@@ -33,7 +41,7 @@ from .fluid_session import (
     resolve_record_stats_orcasph_log_path,
 )
 from .process_utils import ProcessManager, is_tcp_port_accepting_connections
-from .sph_config import generate_orcasph_config, setup_python_logging
+from .sph_config import generate_orcasph_config, resolve_shm_transport_name, setup_python_logging
 
 logger = logging.getLogger(__name__)
 
@@ -56,7 +64,7 @@ class FluidSimulationContext:
     sph_wrapper: Any = None
     traj_rec: Any = None
     traj_player: Any = None
-    traj_stats_log_f: Any = None
+    stats_log_f: Any = None
     mujoco_qpos_sidecar: Any = None
     scene_output_path: Optional[Path] = None
     particle_render_override: Any = None
@@ -175,6 +183,8 @@ def _preflight_session(
             )
             sys.exit(1)
 
+    resolve_shm_transport_name(config, session_timestamp)
+
     return session_timestamp, orcagym_tmp_dir
 
 
@@ -457,34 +467,43 @@ def _setup_main_loop_recorders(ctx: FluidSimulationContext) -> None:
             ctx.session_timestamp,
             REALTIME_STEP,
             sph_mocap_names,
+            flush_frames=int(traj_cfg.get("flush_frames", DEFAULT_FLUSH_FRAMES)),
+            writer_thread=bool(traj_cfg.get("writer_thread", True)),
         )
         logger.info("MuJoCo trajectory recording enabled: %s", out_p.resolve())
     pb = traj_cfg.get("playback_path")
     if pb:
-        ctx.traj_player = TrajectoryPlayer(Path(pb), env.unwrapped)
+        ctx.traj_player = TrajectoryPlayer(
+            Path(pb),
+            env.unwrapped,
+            prefetch_frames=int(traj_cfg.get("prefetch_frames", DEFAULT_FLUSH_FRAMES)),
+            prefetch_thread=bool(traj_cfg.get("prefetch_thread", True)),
+        )
         logger.info(
             "MuJoCo trajectory playback: %s (%s frames)",
             Path(pb).resolve(),
             ctx.traj_player.num_frames,
         )
 
-    traj_stats_path = resolve_record_stats_orcasph_log_path(
+    # 录制模式下 [TRAJECTORY_RECORD_STATS] / [MUJOCO_TIME_STATS] 追加到 OrcaSPH 日志，供统计窗口 tail
+    stats_log_path = resolve_record_stats_orcasph_log_path(
         config, ctx.session_timestamp, ctx.orcagym_tmp_dir
     )
-    if ctx.traj_player is not None and traj_stats_path is not None:
+    if stats_log_path is not None:
         try:
-            traj_stats_path.parent.mkdir(parents=True, exist_ok=True)
-            ctx.traj_stats_log_f = open(
-                traj_stats_path, "a", encoding="utf-8", buffering=1
-            )
-            ctx.traj_stats_log_f.write(
-                "[TRAJECTORY_RECORD_STATS] "
-                f"frame_index=0 num_frames={ctx.traj_player.num_frames}\n"
+            stats_log_path.parent.mkdir(parents=True, exist_ok=True)
+            ctx.stats_log_f = open(
+                stats_log_path, "a", encoding="utf-8", buffering=1
             )
-            ctx.traj_stats_log_f.flush()
+            if ctx.traj_player is not None:
+                ctx.stats_log_f.write(
+                    "[TRAJECTORY_RECORD_STATS] "
+                    f"frame_index=0 num_frames={ctx.traj_player.num_frames}\n"
+                )
+                ctx.stats_log_f.flush()
         except OSError as e:
-            logger.warning("trajectory stats log open (%s): %s", traj_stats_path, e)
-            ctx.traj_stats_log_f = None
+            logger.warning("stats log open (%s): %s", stats_log_path, e)
+            ctx.stats_log_f = None
 
     ctx.mujoco_qpos_sidecar = maybe_open_sidecar_for_record_config(config, env)
     if ctx.mujoco_qpos_sidecar is not None:
@@ -495,16 +514,36 @@ def _setup_main_loop_recorders(ctx: FluidSimulationContext) -> None:
 
 
 def _run_cooperative_main_loop(ctx: FluidSimulationContext) -> None:
-    """协作式主循环（SIGTERM 由 handler 同步退出；此处响应 SIGHUP / 轨迹耗尽）。"""
+    """协作式主循环（SIGTERM 由 handler 同步退出；此处响应 SIGHUP / 轨迹耗尽）。
+
+    以 REALTIME_STEP 为周期在单调时钟上定频调度（simulation.loop_scheduler: policy / max_catch_up_steps /
+    stats_interval_sec），并按阶段（sph_sync / physics / recorders / render / idle）累计耗时，
+    周期性输出 [MUJOCO_TIME_STATS]。
+    """
     config = ctx.config
     env = ctx.env
     shutdown_event = ctx.shutdown_event
 
+    sched_cfg = config.get("simulation", {}).get("loop_scheduler") or {}
+    scheduler = FixedRateScheduler(
+        REALTIME_STEP,
+        policy=sched_cfg.get("policy", "catch_up"),
+        max_catch_up_steps=int(sched_cfg.get("max_catch_up_steps", DEFAULT_MAX_CATCH_UP_STEPS)),
+    )
+    timer = PhaseTimer(["sph_sync", "physics", "recorders", "render", "idle"])
+    loop_stats = MainLoopStats(
+        scheduler,
+        timer,
+        interval_sec=float(sched_cfg.get("stats_interval_sec", DEFAULT_STATS_INTERVAL_SEC)),
+        stats_log_f=ctx.stats_log_f,
+    )
+
     logger.debug("[DEBUG] Entering main loop (cooperative shutdown on SIGTERM/SIGHUP)...")
     step_count = 0
+    scheduler.start()
 
     while not shutdown_event.is_set():
-        start_time = datetime.now()
+        timer.start()
 
         if ctx.traj_player is not None and ctx.traj_player.exhausted:
             logger.info(
@@ -527,6 +566,7 @@ def _run_cooperative_main_loop(ctx: FluidSimulationContext) -> None:
             except Exception as e:
                 logger.error(f"SPH 同步失败: {e}")
                 config["orcasph"]["enabled"] = False
+        timer.lap("sph_sync")
 
         if step_count == 0:
             logger.debug(f"[DEBUG] Before MuJoCo step, should_step={should_step}")
@@ -537,42 +577,48 @@ def _run_cooperative_main_loop(ctx: FluidSimulationContext) -> None:
                 ctx.traj_player.push_pending_to_env()
                 env.step(None)
                 ctx.traj_player.advance_cursor()
-                if ctx.traj_stats_log_f is not None:
+                timer.lap("physics")
+                if ctx.stats_log_f is not None:
                     try:
-                        ctx.traj_stats_log_f.write(
+                        ctx.stats_log_f.write(
                             "[TRAJECTORY_RECORD_STATS] "
                             f"frame_index={ctx.traj_player.frame_index} "
                             f"num_frames={ctx.traj_player.num_frames}\n"
                         )
-                        ctx.traj_stats_log_f.flush()
+                        ctx.stats_log_f.flush()
                     except OSError as e:
                         logger.warning("trajectory stats log write: %s", e)
             else:
                 env.step(None)
+                timer.lap("physics")
             # §3.3：仅在执行 env.step 之后追加行（与 traj_rec 同控制帧）
             if ctx.mujoco_qpos_sidecar is not None:
                 ctx.mujoco_qpos_sidecar.append_row(env, step_count)
             if ctx.traj_rec is not None:
                 ctx.traj_rec.append_frame()
+            timer.lap("recorders")
             env.render()
         else:
             env.render()
+        timer.lap("render")
 
         if step_count == 0:
             logger.debug("[DEBUG] After render")
 
-        elapsed = (datetime.now() - start_time).total_seconds()
-        if elapsed < REALTIME_STEP:
-            remaining = REALTIME_STEP - elapsed
-            if shutdown_event.wait(timeout=remaining):
-                break
+        # 单调时钟定频：deadline = t0 + k * REALTIME_STEP，超时不累积漂移
+        stopped = scheduler.wait_next(shutdown_event)
+        timer.lap("idle")
+        if stopped:
+            break
 
         step_count += 1
         if step_count == 1:
             logger.debug("[DEBUG] Completed first iteration successfully")
         if step_count % 100 == 0:
             logger.info(f"仿真步数: {step_count}")
+        loop_stats.maybe_emit()
 
+    loop_stats.emit()
     if shutdown_event.is_set():
         logger.info("\n⏹️  收到停止信号（SIGTERM/SIGHUP），协作退出主循环")
 
@@ -609,8 +655,8 @@ def _finalize_simulation_session(ctx: FluidSimulationContext) -> None:
     except Exception as e:
         logger.warning("trajectory player close: %s", e)
     try:
-        if ctx.traj_stats_log_f is not None:
-            ctx.traj_stats_log_f.close()
+        if ctx.stats_log_f is not None:
+            ctx.stats_log_f.close()
     except Exception as e:
         logger.warning("trajectory stats log close: %s", e)
 
@@ -1,6 +1,7 @@
 """SPH 侧 JSON 配置生成与 Python 日志引导。"""
 import json
 import logging
+import os
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -71,6 +72,21 @@ def _apply_particle_render_run_mode(orcasph_config: dict, fluid_config: dict) ->
         return
 
 
+def resolve_shm_transport_name(fluid_config: dict, session_timestamp: str) -> Optional[str]:
+    """
+    For orcalink.bridge.transport == "shm", give the rings a per-session name unless one is configured,
+    so two simulations on the same host never share segments. Returns the name (None for gRPC).
+    """
+    bridge_cfg = fluid_config.get("orcalink", {}).get("bridge", {})
+    if bridge_cfg.get("transport", "grpc") != "shm":
+        return None
+    shm_cfg = bridge_cfg.setdefault("shm", {})
+    if not shm_cfg.get("name"):
+        shm_cfg["name"] = f"orcalink_{session_timestamp}_{os.getpid()}"
+    logger.info(f"[OrcaLink] shared-memory transport rings: {shm_cfg['name']}_*")
+    return shm_cfg["name"]
+
+
 def generate_orcasph_config(
     fluid_config: Dict,
     output_path: Path,
@@ -152,6 +168,14 @@ def generate_orcasph_config(
     )
     orcasph_config["orcalink_client"]["enabled"] = orcalink_cfg.get("enabled", True)
 
+    # 同机共享内存传输：SPH 侧按同一段名 attach（见 resolve_shm_transport_name）
+    bridge_cfg = orcalink_cfg.get("bridge", {})
+    if bridge_cfg.get("transport", "grpc") == "shm":
+        orcasph_config["orcalink_bridge"]["transport"] = "shm"
+        orcasph_config["orcalink_bridge"]["shm"] = {
+            k: v for k, v in bridge_cfg.get("shm", {}).items() if k != "comment"
+        }
+
     # 写入文件
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
@@ -4,7 +4,7 @@ Module for applying forces to MuJoCo
 
 import numpy as np
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -26,9 +26,15 @@ class ForceApplicationModule:
         self.client = orcalink_client
         self.loop = loop
         
-        # 脉冲力方案：只需记录上一帧施加过力的 site 名称
-        # 用于在下一帧开始时清零这些 site 对应的 body 的外力
+        # 脉冲力方案：只需记录上一帧施加过力的 body id（逐 site 回退路径记录 site 名称）
+        # 用于在下一帧开始时清零这些 body 的外力
+        self._previous_body_ids = np.zeros(0, dtype=np.int64)
         self._previous_site_names = set()
+        # site 名称 -> site id（-1 表示模型中不存在），按名称缓存，只解析一次
+        self._site_id_cache: Dict[str, int] = {}
+        # 上一帧的 site 名称列表及其解析结果，SPH 每帧按相同顺序发送时直接复用
+        self._site_names_key: Optional[List[str]] = None
+        self._site_index: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
         
         print("[PRINT-DEBUG] ForceApplicationModule.__init__() - END", file=sys.stderr, flush=True)
         logger.debug("[DEBUG] ForceApplicationModule.__init__() - Completed")
@@ -42,15 +48,18 @@ class ForceApplicationModule:
             forces = self.loop.run_until_complete(
                 self.client.subscribe_forces()
             )
-            
-            if not forces:
-                return
-            
-            for force_data in forces:
-                # Apply force to rigid body
-                self._apply_force_to_body(force_data)
+            self.apply_forces(forces)
         except Exception as e:
             logger.error(f"Error applying forces: {e}", exc_info=True)
+
+    def apply_forces(self, forces):
+        """Apply already received rigid body-level forces (ForcePositionMode, also used by the pipelined exchange)"""
+        if not forces:
+            return
+
+        for force_data in forces:
+            # Apply force to rigid body
+            self._apply_force_to_body(force_data)
     
     def subscribe_and_apply_site_forces(self):
         """Subscribe to multi-point forces and apply to SITE (MultiPointForceMode)
@@ -75,56 +84,117 @@ class ForceApplicationModule:
             forces = self.loop.run_until_complete(
                 self.client.subscribe_forces()
             )
-            
-            # Step 2: 如果没有新数据，保持上一帧的力不变（SPH 侧未发送更新）
-            if not forces:
-                logger.debug("[DEBUG] subscribe_and_apply_site_forces - No forces received, keeping previous forces")
-                return
-            
-            # Step 3: 有新数据，统计并输出日志
-            site_names = [f.object_id for f in forces]
-            logger.debug(f"[DEBUG] subscribe_and_apply_site_forces - Received {len(forces)} SITE forces: {site_names}")
-            
-            # Step 4: 清零上一帧施加过力的 site 对应的 body
-            if self._previous_site_names:
-                if hasattr(self.env, 'mj_clear_xfrc_applied_for_site'):
-                    for site_name in self._previous_site_names:
-                        self.env.mj_clear_xfrc_applied_for_site(site_name)
-                    logger.debug(f"[DEBUG] Cleared xfrc_applied for {len(self._previous_site_names)} sites")
-                else:
-                    logger.warning("Environment does not support mj_clear_xfrc_applied_for_site")
-            
-            # Step 5: 清空旧记录，准备记录本帧的 site
-            self._previous_site_names.clear()
-            
-            # Step 6: 应用所有新力（在已清零的基础上累加，等价于直接设置）
-            for force_data in forces:
-                site_name = force_data.object_id  # SITE point ID
-                
-                # 直接使用接收到的力（已经是MuJoCo Z-up坐标系）
-                # 坐标转换已经在C++的GrpcDataMapper中完成
-                force_mujoco = np.array(force_data.force, dtype=np.float64)
-                torque_mujoco = np.zeros(3, dtype=np.float64)
-                
-                # 记录 site 名称（下次更新时需要清零）
-                self._previous_site_names.add(site_name)
-                
-                # 性能优化：如果是0值力，跳过 mj_applyFT 调用（已经清零了）
-                force_norm = np.linalg.norm(force_mujoco)
-                torque_norm = np.linalg.norm(torque_mujoco)
-                if force_norm < 1e-9 and torque_norm < 1e-9:
-                    continue  # 0 值力，已经清零，不需要应用
-                
-                if hasattr(self.env, 'mj_apply_force_at_site'):
-                    self.env.mj_apply_force_at_site(site_name, force_mujoco, torque_mujoco)
-                else:
-                    logger.warning(f"Environment does not support mj_apply_force_at_site")
-            
-            logger.debug(f"[DEBUG] Applied {len(forces)} impulse forces to sites")
-            
+            self.apply_site_forces(forces)
         except Exception as e:
             logger.error(f"Error applying site forces: {e}", exc_info=True)
-    
+
+    def apply_site_forces(self, forces):
+        """Apply already received multi-point forces to SITE (Step 2-4 of subscribe_and_apply_site_forces)"""
+        # Step 2: 如果没有新数据，保持上一帧的力不变（SPH 侧未发送更新）
+        if not forces:
+            logger.debug("[DEBUG] apply_site_forces - No forces received, keeping previous forces")
+            return
+
+        # Step 3: 有新数据，统计并输出日志
+        logger.debug(f"[DEBUG] apply_site_forces - Received {len(forces)} SITE forces")
+
+        gym_core = getattr(self.env, 'gym', None)
+        if getattr(gym_core, '_mjData', None) is None:
+            # 非本地 MuJoCo 环境：逐 site 调用环境接口
+            self._apply_site_forces_per_site(forces)
+            return
+
+        # Step 4: 批量施加（清零上一帧 body + 按 body 累加 wrench + 一次写回 xfrc_applied）
+        self._apply_site_forces_batched(gym_core, forces)
+        logger.debug(f"[DEBUG] Applied {len(forces)} impulse forces to sites")
+
+    def _resolve_site_index(self, mj_model, site_names: List[str]):
+        """
+        site 名称列表 -> (row, site_id, body_id, unique_body_id, body_slot)
+
+        row 为 forces 中可解析 site 的行号，body_slot 为每行在 unique_body_id 中的位置（供 np.add.at 使用）。
+        名称列表与上一帧相同时直接返回缓存。
+        """
+        if site_names == self._site_names_key:
+            return self._site_index
+
+        site_ids = np.empty(len(site_names), dtype=np.int64)
+        for i, site_name in enumerate(site_names):
+            site_id = self._site_id_cache.get(site_name)
+            if site_id is None:
+                import mujoco
+                site_id = mujoco.mj_name2id(mj_model, mujoco.mjtObj.mjOBJ_SITE, site_name)
+                if site_id < 0:
+                    logger.warning(f"SITE '{site_name}' not found in MuJoCo model, its forces are ignored")
+                self._site_id_cache[site_name] = site_id
+            site_ids[i] = site_id
+
+        rows = np.flatnonzero(site_ids >= 0)
+        site_ids = site_ids[rows]
+        body_ids = np.asarray(mj_model.site_bodyid, dtype=np.int64)[site_ids]
+        unique_body_ids, body_slots = np.unique(body_ids, return_inverse=True)
+
+        self._site_names_key = site_names
+        self._site_index = (rows, site_ids, body_ids, unique_body_ids, body_slots)
+        return self._site_index
+
+    def _apply_site_forces_batched(self, gym_core, forces):
+        """
+        与逐 site 的 mj_apply_force_at_site 等价：force 不变，torque = r × F（r = site_xpos - body_xpos），
+        按 body 累加后一次写入 xfrc_applied。
+        """
+        mj_model = gym_core._mjModel
+        mj_data = gym_core._mjData
+
+        site_names = [f.object_id for f in forces]
+        rows, site_ids, body_ids, unique_body_ids, body_slots = self._resolve_site_index(mj_model, site_names)
+
+        # 直接使用接收到的力（已经是MuJoCo Z-up坐标系）
+        # 坐标转换已经在C++的GrpcDataMapper中完成
+        force = np.array([f.force for f in forces], dtype=np.float64).reshape(-1, 3)[rows]
+
+        r = mj_data.site_xpos[site_ids] - mj_data.xpos[body_ids]
+        site_wrench = np.empty((len(rows), 6), dtype=np.float64)
+        site_wrench[:, :3] = force
+        site_wrench[:, 3:] = np.cross(r, force)
+        body_wrench = np.zeros((len(unique_body_ids), 6), dtype=np.float64)
+        np.add.at(body_wrench, body_slots, site_wrench)
+
+        xfrc_applied = mj_data.xfrc_applied
+        # 清零上一帧施加过力的 body，再在已清零的基础上累加（等价于直接设置）
+        if len(self._previous_body_ids):
+            xfrc_applied[self._previous_body_ids] = 0
+        xfrc_applied[unique_body_ids] += body_wrench
+        self._previous_body_ids = unique_body_ids
+
+    def _apply_site_forces_per_site(self, forces):
+        """Fallback for environments without direct access to MjData, one env call per site."""
+        # 清零上一帧施加过力的 site 对应的 body
+        if self._previous_site_names:
+            if hasattr(self.env, 'mj_clear_xfrc_applied_for_site'):
+                for site_name in self._previous_site_names:
+                    self.env.mj_clear_xfrc_applied_for_site(site_name)
+            else:
+                logger.warning("Environment does not support mj_clear_xfrc_applied_for_site")
+        self._previous_site_names = set()
+
+        for force_data in forces:
+            site_name = force_data.object_id  # SITE point ID
+            force_mujoco = np.array(force_data.force, dtype=np.float64)
+            torque_mujoco = np.zeros(3, dtype=np.float64)
+
+            # 记录 site 名称（下次更新时需要清零）
+            self._previous_site_names.add(site_name)
+
+            # 0 值力，已经清零，不需要应用
+            if np.linalg.norm(force_mujoco) < 1e-9:
+                continue
+
+            if hasattr(self.env, 'mj_apply_force_at_site'):
+                self.env.mj_apply_force_at_site(site_name, force_mujoco, torque_mujoco)
+            else:
+                logger.warning(f"Environment does not support mj_apply_force_at_site")
+
     def _apply_force_to_body(self, force_data):
         """Apply force to a rigid body using OrcaGym API"""
         try:
@@ -27,6 +27,23 @@ class PositionPublishModule:
         self.client = orcalink_client
         self.loop = loop
         self.rigid_bodies = rigid_bodies_config
+
+        # 名称列表与 object_id 映射只在初始化时构建一次
+        body_to_object_id = {}  # 映射 body_name -> object_id (用于 OrcaLink)
+        site_to_object_id = {}  # 映射 site_name -> object_id (用于 OrcaLink)
+        for body_config in rigid_bodies_config:
+            body_name = body_config.get('mujoco_body', '')
+            if body_name:
+                body_to_object_id[body_name] = body_config.get('object_id', body_name)
+            for cp in body_config.get('connection_points', []):
+                site_name = cp.get('site_name', '')
+                # 使用 point_id 作为 object_id，如果没有则使用 site_name
+                if site_name:
+                    site_to_object_id[site_name] = cp.get('point_id', cp.get('object_id', site_name))
+        self._body_targets = self._build_targets(list(body_to_object_id), list(body_to_object_id.values()), is_site=False)
+        self._site_targets = self._build_targets(list(site_to_object_id), list(site_to_object_id.values()), is_site=True)
+        # 上次 mj_forward 时的 [time, qpos, mocap_pos, mocap_quat]
+        self._forward_state_key = None
         print(f"[PRINT-DEBUG] PositionPublishModule.__init__() - END (rigid_bodies count: {len(rigid_bodies_config)})", file=sys.stderr, flush=True)
         logger.debug(f"PositionPublishModule.__init__() - Initialized with {len(rigid_bodies_config)} rigid bodies")
     
@@ -36,7 +53,7 @@ class PositionPublishModule:
             return
         
         try:
-            positions = self._collect_body_positions()
+            positions = self.collect_body_positions()
             if positions:
                 self.loop.run_until_complete(
                     self.client.publish_positions(positions)
@@ -55,7 +72,7 @@ class PositionPublishModule:
             return
         
         try:
-            positions = self._collect_site_positions()
+            positions = self.collect_site_positions()
             logger.debug(f"publish_site_positions - Collected {len(positions)} positions")
             
             if positions:
@@ -69,132 +86,181 @@ class PositionPublishModule:
         except Exception as e:
             logger.error(f"Error publishing site positions: {e}", exc_info=True)
     
-    def _collect_body_positions(self) -> List:
-        """Collect rigid body positions from MuJoCo using OrcaGym API"""
-        positions = []
-        
+    def collect_body_positions(self) -> List:
+        """Collect rigid body positions from MuJoCo (one indexed read of xpos / xquat)"""
         try:
-            # 1. 收集所有需要查询的 body 名称
-            body_names = []
-            body_to_object_id = {}  # 映射 body_name -> object_id (用于 OrcaLink)
-            
-            for body_config in self.rigid_bodies:
-                body_name = body_config.get('mujoco_body', '')
-                object_id = body_config.get('object_id', body_name)
-                if body_name:
-                    body_names.append(body_name)
-                    body_to_object_id[body_name] = object_id
-            
-            if not body_names:
-                logger.debug("_collect_body_positions - No body names to query")
-                return positions
-            
-            logger.debug(f"_collect_body_positions - Querying {len(body_names)} bodies")
-            
-            # 2. 更新 MuJoCo 数据
-            self.env.mj_forward()
-            
-            # 3. 批量查询 body 位置、旋转矩阵和四元数（使用 OrcaGym API）
-            # 返回值是三个扁平数组的元组: (xpos, xmat, xquat)
-            xpos_flat, xmat_flat, xquat_flat = self.env.get_body_xpos_xmat_xquat(body_names)
-            
-            # 4. 解析扁平数组
-            num_bodies = len(body_names)
-            xpos_list = xpos_flat.reshape(num_bodies, 3)
-            xquat_list = xquat_flat.reshape(num_bodies, 4)
-            
-            # 5. 转换为 OrcaLink 格式
-            for i, body_name in enumerate(body_names):
-                object_id = body_to_object_id.get(body_name, body_name)
-                pos = xpos_list[i]
-                quat = xquat_list[i]
-                
-                # Convert to position data structure
-                try:
-                    from data_structures import RigidBodyPosition
-                    position_data = RigidBodyPosition()
-                    position_data.object_id = object_id
-                    position_data.position = np.array(pos, dtype=np.float32)
-                    position_data.rotation = np.array(quat, dtype=np.float32)
-                except ImportError:
-                    # Fallback: create dict-like object
-                    position_data = type('RigidBodyPosition', (), {
-                        'object_id': object_id,
-                        'position': np.array(pos, dtype=np.float32),
-                        'rotation': np.array(quat, dtype=np.float32)
-                    })()
-                
-                positions.append(position_data)
-                logger.debug(f"_collect_body_positions - Collected body '{body_name}' -> object_id '{object_id}', pos={pos}")
-            
-            logger.debug(f"_collect_body_positions - Collected {len(positions)} positions")
-            return positions
-            
+            targets = self._body_targets
+            if not targets.object_ids:
+                logger.debug("collect_body_positions - No body names to query")
+                return []
+
+            # 1. 仿真状态变化后才更新 MuJoCo 运动学
+            self._forward_if_state_changed()
+
+            # 2. 一次下标读取 body 位置和四元数，写入复用缓冲区
+            mj_data = self._mj_data()
+            if mj_data is not None and targets.ids is not None:
+                targets.position[:] = mj_data.xpos[targets.ids]
+                targets.rotation[:] = mj_data.xquat[targets.ids]
+            else:
+                # 返回值是三个扁平数组的元组: (xpos, xmat, xquat)
+                xpos_flat, _, xquat_flat = self.env.get_body_xpos_xmat_xquat(targets.names)
+                targets.position[:] = xpos_flat.reshape(-1, 3)
+                targets.rotation[:] = xquat_flat.reshape(-1, 4)
+
+            logger.debug(f"collect_body_positions - Collected {len(targets.messages)} positions")
+            return targets.messages
+
         except Exception as e:
             logger.error(f"Error collecting body positions: {e}", exc_info=True)
             return []
-    
-    def _collect_site_positions(self) -> List:
-        """Collect SITE positions from MuJoCo using OrcaGym API"""
-        logger.debug(f"_collect_site_positions - START")
-        logger.debug(f"_collect_site_positions - rigid_bodies count: {len(self.rigid_bodies)}")
-        positions = []
-        
+
+    def collect_site_positions(self) -> List:
+        """Collect SITE positions from MuJoCo (one indexed read of site_xpos / site_xmat)"""
         try:
-            # 1. 收集所有需要查询的 SITE 名称
-            site_names = []
-            site_to_object_id = {}  # 映射 site_name -> object_id (用于 OrcaLink)
-            
-            for body_config in self.rigid_bodies:
-                connection_points = body_config.get('connection_points', [])
-                for cp in connection_points:
-                    site_name = cp.get('site_name', '')
-                    # 使用 point_id 作为 object_id，如果没有则使用 site_name
-                    object_id = cp.get('point_id', cp.get('object_id', site_name))
-                    if site_name:
-                        site_names.append(site_name)
-                        site_to_object_id[site_name] = object_id
-            
-            if not site_names:
-                logger.debug("_collect_site_positions - No site names to query")
-                return positions
-            
-            logger.debug(f"_collect_site_positions - Querying {len(site_names)} sites")
-            
-            # 2. 更新 MuJoCo 数据
-            self.env.mj_forward()
-            
-            # 3. 批量查询 SITE 位置和四元数（使用 OrcaGym API）
-            site_dict = self.env.query_site_pos_and_quat(site_names)
-            
-            # 4. 转换为 OrcaLink 格式
-            for site_name, site_data in site_dict.items():
-                object_id = site_to_object_id.get(site_name, site_name)
-                pos = site_data['xpos']
-                quat = site_data['xquat']
-                
-                # 转换为 position data structure
-                try:
-                    from data_structures import RigidBodyPosition
-                    position_data = RigidBodyPosition()
-                    position_data.object_id = object_id
-                    position_data.position = np.array(pos, dtype=np.float32)
-                    position_data.rotation = np.array(quat, dtype=np.float32)
-                except ImportError:
-                    # Fallback: create dict-like object
-                    position_data = type('RigidBodyPosition', (), {
-                        'object_id': object_id,
-                        'position': np.array(pos, dtype=np.float32),
-                        'rotation': np.array(quat, dtype=np.float32)
-                    })()
-                
-                positions.append(position_data)
-                logger.debug(f"_collect_site_positions - Collected site '{site_name}' -> object_id '{object_id}', pos={pos}")
-            
-            logger.debug(f"_collect_site_positions - Collected {len(positions)} positions")
-            return positions
-            
+            targets = self._site_targets
+            if not targets.object_ids:
+                logger.debug("collect_site_positions - No site names to query")
+                return []
+
+            # 1. 仿真状态变化后才更新 MuJoCo 运动学
+            self._forward_if_state_changed()
+
+            # 2. 一次下标读取 SITE 位置和旋转矩阵（MjData 没有 site_xquat，由 xmat 批量换算）
+            mj_data = self._mj_data()
+            if mj_data is not None and targets.ids is not None:
+                targets.position[:] = mj_data.site_xpos[targets.ids]
+                targets.rotation[:] = _mat2quat_batch(mj_data.site_xmat[targets.ids].reshape(-1, 3, 3))
+            else:
+                site_dict = self.env.query_site_pos_and_quat(targets.names)
+                for i, site_name in enumerate(targets.names):
+                    targets.position[i] = site_dict[site_name]['xpos']
+                    targets.rotation[i] = site_dict[site_name]['xquat']
+
+            logger.debug(f"collect_site_positions - Collected {len(targets.messages)} positions")
+            return targets.messages
+
         except Exception as e:
             logger.error(f"Error collecting site positions: {e}", exc_info=True)
             return []
 
+    def _mj_data(self):
+        gym_core = getattr(self.env, 'gym', None)
+        return getattr(gym_core, '_mjData', None)
+
+    def _forward_if_state_changed(self) -> None:
+        """
+        mj_step 之后 xpos / site_xpos 仍是步前的运动学，需要 mj_forward；
+        若自上次 forward 以来 time / qpos / mocap 都没变（例如流控暂停了 MuJoCo 步进），跳过这次 forward。
+        """
+        mj_data = self._mj_data()
+        if mj_data is None:
+            self.env.mj_forward()
+            return
+
+        key = self._forward_state_key
+        if (key is not None
+                and key[0] == mj_data.time
+                and np.array_equal(key[1], mj_data.qpos)
+                and np.array_equal(key[2], mj_data.mocap_pos)
+                and np.array_equal(key[3], mj_data.mocap_quat)):
+            return
+
+        self.env.mj_forward()
+        if key is None:
+            key = [0.0, mj_data.qpos.copy(), mj_data.mocap_pos.copy(), mj_data.mocap_quat.copy()]
+            self._forward_state_key = key
+        else:
+            key[1][:] = mj_data.qpos
+            key[2][:] = mj_data.mocap_pos
+            key[3][:] = mj_data.mocap_quat
+        key[0] = mj_data.time
+
+    def _build_targets(self, names: List[str], object_ids: List[str], is_site: bool) -> "_PublishTargets":
+        """按名称解析 MuJoCo id，预分配 float32 缓冲区，并创建复用的 position 消息。"""
+        ids = None
+        gym_core = getattr(self.env, 'gym', None)
+        mj_model = getattr(gym_core, '_mjModel', None)
+        if mj_model is not None and names:
+            import mujoco
+            obj_type = mujoco.mjtObj.mjOBJ_SITE if is_site else mujoco.mjtObj.mjOBJ_BODY
+            ids = np.array([mujoco.mj_name2id(mj_model, obj_type, name) for name in names], dtype=np.int64)
+            found = ids >= 0
+            if not found.all():
+                missing = [name for name, ok in zip(names, found) if not ok]
+                logger.error(f"{'SITE' if is_site else 'Body'} names not found in MuJoCo model, not published: {missing}")
+                names = [name for name, ok in zip(names, found) if ok]
+                object_ids = [object_id for object_id, ok in zip(object_ids, found) if ok]
+                ids = ids[found]
+        return _PublishTargets(names, object_ids, ids)
+
+
+def _mat2quat_batch(mat: np.ndarray) -> np.ndarray:
+    """
+    orca_gym.utils.rotations.mat2quat 的批量版本（同一算法，一次 eigh 处理全部矩阵），返回 (N, 4) [w, x, y, z]。
+    """
+    Qxx, Qyx, Qzx = mat[:, 0, 0], mat[:, 0, 1], mat[:, 0, 2]
+    Qxy, Qyy, Qzy = mat[:, 1, 0], mat[:, 1, 1], mat[:, 1, 2]
+    Qxz, Qyz, Qzz = mat[:, 2, 0], mat[:, 2, 1], mat[:, 2, 2]
+    # Fill only lower half of symmetric matrix
+    K = np.zeros((len(mat), 4, 4), dtype=np.float64)
+    K[:, 0, 0] = Qxx - Qyy - Qzz
+    K[:, 1, 0] = Qyx + Qxy
+    K[:, 1, 1] = Qyy - Qxx - Qzz
+    K[:, 2, 0] = Qzx + Qxz
+    K[:, 2, 1] = Qzy + Qyz
+    K[:, 2, 2] = Qzz - Qxx - Qyy
+    K[:, 3, 0] = Qyz - Qzy
+    K[:, 3, 1] = Qzx - Qxz
+    K[:, 3, 2] = Qxy - Qyx
+    K[:, 3, 3] = Qxx + Qyy + Qzz
+    K /= 3.0
+    vals, vecs = np.linalg.eigh(K)
+    # 最大特征值对应的特征向量，重排为 w, x, y, z；取 w >= 0 的一支
+    q = vecs[np.arange(len(mat)), :, np.argmax(vals, axis=1)][:, [3, 0, 1, 2]]
+    q[q[:, 0] < 0] *= -1
+    return q
+
+
+class _PositionMessage:
+    """Fallback position message when data_structures.RigidBodyPosition is not importable."""
+    __slots__ = ('object_id', 'position', 'rotation')
+
+    def __init__(self, object_id: str, position: np.ndarray, rotation: np.ndarray):
+        self.object_id = object_id
+        self.position = position
+        self.rotation = rotation
+
+
+class _PublishTargets:
+    """
+    一组待发布对象：名称、object_id、MuJoCo id，以及打包的 float32 缓冲区 position (N, 3) / rotation (N, 4)。
+
+    每个对象的 position 消息只创建一次，其 position / rotation 是缓冲区对应行的视图，
+    每次发布只需就地刷新缓冲区。
+    """
+
+    def __init__(self, names: List[str], object_ids: List[str], ids: Optional[np.ndarray]):
+        self.names = names
+        self.object_ids = object_ids
+        self.ids = ids
+        self.position = np.zeros((len(names), 3), dtype=np.float32)
+        self.rotation = np.zeros((len(names), 4), dtype=np.float32)
+        self.rotation[:, 0] = 1.0
+
+        try:
+            from data_structures import RigidBodyPosition
+            message_cls = RigidBodyPosition
+        except ImportError:
+            message_cls = None
+
+        self.messages = []
+        for i, object_id in enumerate(object_ids):
+            if message_cls is not None:
+                message = message_cls()
+                message.object_id = object_id
+                message.position = self.position[i]
+                message.rotation = self.rotation[i]
+            else:
+                message = _PositionMessage(object_id, self.position[i], self.rotation[i])
+            self.messages.append(message)
@@ -6,6 +6,7 @@ SPH-MuJoCo 多点软连接包装器
 """
 
 import json
+import os
 import numpy as np
 import logging
 import uuid
@@ -57,6 +58,7 @@ class OrcaLinkBridge:
         self.env = env
         self.rigid_bodies: Dict[str, RigidBodyConfig] = {}
         self.orcalink_client = None
+        self.shm_transport = None  # 同机共享内存传输（transport="shm" 时创建）
         self.loop = None  # 持久事件循环（延迟创建）
         
         # 连接状态管理
@@ -327,7 +329,8 @@ class OrcaLinkBridge:
                 logger.debug(f"[DEBUG] _init_orcalink - Mode config: {mode_config}")
                 
                 print(f"[PRINT-DEBUG] _init_orcalink - About to call initialize()", file=sys.stderr, flush=True)
-                init_result = self.current_mode.initialize(mode_config, self.env, self.orcalink_client, self.loop)
+                mode_client = self._create_transport_client()
+                init_result = self.current_mode.initialize(mode_config, self.env, mode_client, self.loop)
                 print(f"[PRINT-DEBUG] _init_orcalink - initialize() returned: {init_result}", file=sys.stderr, flush=True)
                 logger.debug(f"[DEBUG] _init_orcalink - Mode initialize() returned: {init_result}")
                 
@@ -547,6 +550,38 @@ class OrcaLinkBridge:
             logger.error(f"OrcaLinkBridge.step error: {e}", exc_info=True)
             return False
     
+    def _create_transport_client(self):
+        """
+        Client handed to the coupling mode: the gRPC OrcaLinkClient, or for transport="shm"
+        a SharedMemoryOrcaLinkClient that carries the force / position data over shared memory
+        and keeps gRPC for the session (and as fallback until OrcaSPH attaches the rings).
+        """
+        bridge_cfg = self.config.get('orcalink_bridge', {})
+        transport = bridge_cfg.get('transport', 'grpc')
+        if transport == 'grpc':
+            return self.orcalink_client
+        if transport != 'shm':
+            logger.warning(f"Unknown OrcaLink transport '{transport}', using gRPC")
+            return self.orcalink_client
+
+        from .coupling_modes.shm_transport import SharedMemoryOrcaLinkClient, DEFAULT_RING_SLOTS
+        shm_cfg = bridge_cfg.get('shm', {})
+        # 每帧对象数上限：所有 site 与 body 各占一行
+        max_objects = sum(len(rb.connection_points) + 1 for rb in self.rigid_bodies.values())
+        max_objects = max(max_objects, shm_cfg.get('max_objects', 0))
+        try:
+            self.shm_transport = SharedMemoryOrcaLinkClient(
+                self.orcalink_client,
+                # 正常由 resolve_shm_transport_name 按会话生成；直接构造 bridge 时退回按进程命名
+                shm_name=shm_cfg.get('name') or f"orcalink_{os.getpid()}",
+                max_objects=max_objects,
+                slots=shm_cfg.get('slots', DEFAULT_RING_SLOTS),
+            )
+        except (OSError, ValueError) as e:
+            logger.warning(f"Shared-memory transport unavailable ({e}), using gRPC")
+            return self.orcalink_client
+        return self.shm_transport
+
     def _create_mode(self, mode_name: str, config: dict):
         """Factory method to create coupling mode instance"""
         import sys
@@ -623,6 +658,13 @@ class OrcaLinkBridge:
     def close(self):
         """清理资源"""
         try:
+            # 流水线模式下后台线程仍在驱动 self.loop，先停掉模式再在本线程关闭客户端
+            if self.current_mode:
+                self.current_mode.shutdown()
+                self.current_mode = None
+            if self.shm_transport:
+                self.shm_transport.close()
+                self.shm_transport = None
             if self.orcalink_client and self.loop:
                 self.loop.run_until_complete(self.orcalink_client.shutdown())
                 self.loop.close()
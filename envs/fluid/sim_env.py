@@ -1,4 +1,3 @@
-import copy
 import logging
 import numpy as np
 from typing import Any, Optional, Tuple
@@ -52,9 +51,8 @@ class SimEnv(OrcaGymLocalEnv):
 
         self._pending_human: Optional[HumanTrajectoryStepConfig] = None
         self._human_trajectory_step_count: int = 0
-        self._last_eq_replay_key: Optional[Tuple[Tuple[str, str, int, int, Tuple[float, ...]], ...]] = (
-            None
-        )
+        # 是否已完整应用过一帧人类 equality；之后只按 eq_changed 更新变化行
+        self._eq_replay_applied: bool = False
 
         print("[PRINT-DEBUG] SimEnv.__init__() - Setting obs/action spaces", file=sys.stderr, flush=True)
         self._set_obs_space()
@@ -79,6 +77,13 @@ class SimEnv(OrcaGymLocalEnv):
     def set_pending_human_trajectory_step(self, config: HumanTrajectoryStepConfig) -> None:
         """在 step 前写入一帧人类轨迹；step 内消费后清除。覆盖此前未消费的 pending。"""
         self._validate_human_trajectory_step_config(config)
+        prev = self._pending_human
+        if prev is not None and config.eq_changed is not None:
+            # 被覆盖的帧未应用：它的变化行也要在本帧更新
+            if prev.eq_changed is None:
+                config.eq_changed = None
+            else:
+                config.eq_changed = np.asarray(config.eq_changed, dtype=bool) | np.asarray(prev.eq_changed, dtype=bool)
         self._pending_human = config
 
     def clear_pending_human_trajectory_step(self) -> None:
@@ -109,6 +114,8 @@ class SimEnv(OrcaGymLocalEnv):
             raise ValueError(f"eq_data width {cfg.eq_data.shape[1]} != model {ew}")
         if cfg.eq_data.shape[0] != E:
             raise ValueError(f"eq_data rows {cfg.eq_data.shape[0]} != E={E}")
+        if cfg.eq_changed is not None and np.shape(cfg.eq_changed)[0] != E:
+            raise ValueError("eq_changed length mismatch vs eq_indices")
 
     def render_callback(self, mode="human") -> None:
         if mode == "human":
@@ -164,24 +171,6 @@ class SimEnv(OrcaGymLocalEnv):
                 f"unknown equality endpoint body name {body_name!r}"
             ) from e
 
-    def _equality_replay_key(
-        self, cfg: HumanTrajectoryStepConfig
-    ) -> Tuple[Tuple[str, str, int, int, Tuple[float, ...]], ...]:
-        """与轨迹文件一致的逻辑状态，用于跳过未变更帧的 modify/update。"""
-        if not cfg.eq_indices:
-            return ()
-        rows: list[Tuple[str, str, int, int, Tuple[float, ...]]] = []
-        for j in range(len(cfg.eq_indices)):
-            n1 = cfg.eq_obj1_name[j]
-            n2 = cfg.eq_obj2_name[j]
-            ea = int(cfg.eq_active[j])
-            et = int(cfg.eq_type[j])
-            data_t = tuple(
-                float(x) for x in np.asarray(cfg.eq_data[j], dtype=np.float64).ravel()
-            )
-            rows.append((n1, n2, ea, et, data_t))
-        return tuple(rows)
-
     def _apply_human_trajectory_mocap_eq(self, cfg: HumanTrajectoryStepConfig) -> None:
         """
         仅应用本帧人类 mocap 与 equality，并 mj_forward。
@@ -226,21 +215,31 @@ class SimEnv(OrcaGymLocalEnv):
     def _apply_equality_human_row(
         self, cfg: HumanTrajectoryStepConfig, step_index: int
     ) -> None:
+        """
+        只更新相对上一帧变化的 equality 行（cfg.eq_changed）；
+        首帧、reset 之后或掩码未知时更新全部行。
+        """
         mj = self.gym._mjModel
         d = self.gym._mjData
         eqt_row = cfg.eq_type
         eqd_row = cfg.eq_data
         ea_row = cfg.eq_active
 
-        key = self._equality_replay_key(cfg)
-        if self._last_eq_replay_key is not None and key == self._last_eq_replay_key:
-            return
+        if self._eq_replay_applied and cfg.eq_changed is not None:
+            changed_rows = np.flatnonzero(cfg.eq_changed).tolist()
+            if not changed_rows:
+                return
+        else:
+            changed_rows = list(range(len(cfg.eq_indices)))
 
-        for j, gi in enumerate(cfg.eq_indices):
+        targets: list[Tuple[int, int, int]] = []
+        for j in changed_rows:
+            gi = cfg.eq_indices[j]
             name1 = cfg.eq_obj1_name[j]
             name2 = cfg.eq_obj2_name[j]
             f1 = self._resolve_body_id_from_name(name1)
             f2 = self._resolve_body_id_from_name(name2)
+            targets.append((j, f1, f2))
             c1 = int(mj.eq_obj1id[gi])
             c2 = int(mj.eq_obj2id[gi])
             TRAJ_LOG.debug(
@@ -275,25 +274,24 @@ class SimEnv(OrcaGymLocalEnv):
                 )
                 self.gym.modify_equality_objects(c1, c2, f1, f2)
 
-        eq_list = self.model.get_eq_list()
-        if eq_list is None:
-            _logger.warning("model.get_eq_list() is None; skipping equality replay for this frame")
-            return
-        eq_list = copy.deepcopy(eq_list)
-        for j, gi in enumerate(cfg.eq_indices):
-            if gi >= len(eq_list):
-                continue
-            eq_list[gi]["obj1_id"] = int(mj.eq_obj1id[gi])
-            eq_list[gi]["obj2_id"] = int(mj.eq_obj2id[gi])
-            eq_list[gi]["eq_type"] = int(eqt_row[j])
-            eq_list[gi]["eq_data"] = np.array(eqd_row[j], dtype=np.float64, copy=True)
+        # 只下发变化行，不再深拷贝整个 model.get_eq_list()
+        eq_list = []
+        for j in changed_rows:
+            gi = cfg.eq_indices[j]
+            eq_list.append(
+                {
+                    "obj1_id": int(mj.eq_obj1id[gi]),
+                    "obj2_id": int(mj.eq_obj2id[gi]),
+                    "eq_type": int(eqt_row[j]),
+                    "eq_data": np.array(eqd_row[j], dtype=np.float64, copy=True),
+                }
+            )
         self.update_equality_constraints(eq_list)
 
-        for j, gi in enumerate(cfg.eq_indices):
+        for j, f1, f2 in targets:
+            gi = cfg.eq_indices[j]
             m1 = int(mj.eq_obj1id[gi])
             m2 = int(mj.eq_obj2id[gi])
-            f1 = self._resolve_body_id_from_name(cfg.eq_obj1_name[j])
-            f2 = self._resolve_body_id_from_name(cfg.eq_obj2_name[j])
             if m1 != f1 or m2 != f2:
                 TRAJ_LOG.warning(
                     "[SimEnv.trajectory] step=%s eq[%s] after update_equality_constraints "
@@ -307,10 +305,10 @@ class SimEnv(OrcaGymLocalEnv):
                 )
 
         if hasattr(d, "eq_active"):
-            for j, gi in enumerate(cfg.eq_indices):
-                d.eq_active[gi] = bool(ea_row[j])
+            for j in changed_rows:
+                d.eq_active[cfg.eq_indices[j]] = bool(ea_row[j])
 
-        self._last_eq_replay_key = key
+        self._eq_replay_applied = True
 
     def _get_obs(self) -> dict:
         obs = {
@@ -324,7 +322,7 @@ class SimEnv(OrcaGymLocalEnv):
         self.ctrl = np.zeros(self.nu, dtype=np.float32)
         self._pending_human = None
         self._human_trajectory_step_count = 0
-        self._last_eq_replay_key = None
+        self._eq_replay_applied = False
 
         obs = self._get_obs().copy()
         return obs, {}
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 
@@ -21,3 +21,5 @@ class HumanTrajectoryStepConfig:
     eq_obj2_name: List[str]  # (E,)
     eq_type: np.ndarray  # (E,) int32
     eq_data: np.ndarray  # (E, W) float64
+    # (E,) bool，相对上一帧有变化的 equality 行；None 表示未知，按全部变化处理
+    eq_changed: Optional[np.ndarray] = None
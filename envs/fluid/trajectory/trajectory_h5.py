@@ -8,7 +8,10 @@ from __future__ import annotations
 
 import json
 import logging
+import queue
 import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
@@ -20,9 +23,13 @@ from .trajectory_frame import HumanTrajectoryStepConfig
 
 logger = logging.getLogger(__name__)
 
+# 5: 增加 eq_changed（每帧相对上一帧变化的 equality 行掩码），回放时只更新变化行
+# 4: equality 端点存为 eq_obj1_id / eq_obj2_id（body id）+ body_names_json 名称表；按 flush_frames 整块追加
 # 3: nu==0 时不写入 ctrl；帧数以 mocap_pos 时间维为准；chunk 零维用 h5py_chunks_if_valid
 # 2: equality 端点仅 eq_obj1_name / eq_obj2_name（已废弃，请重录）
-SCHEMA_VERSION = 3
+SCHEMA_VERSION = 5
+SUPPORTED_SCHEMA_VERSIONS = (3, 4, 5)
+DEFAULT_FLUSH_FRAMES = 256
 _SPH_MOCAP_PATTERN = re.compile(r"_SPH_MOCAP_")
 
 
@@ -109,7 +116,15 @@ def _eq_data_width(mj_model: Any) -> int:
 
 
 class TrajectoryRecorder:
-    """Live：append_frame 写入 HDF5（h5py）。"""
+    """
+    Live：append_frame 写入 HDF5（h5py）。
+
+    mocap id / equality 索引表在构造时解析一次；每帧只做数组 gather 写入预分配的块缓冲，
+    攒满 ``flush_frames`` 帧后对每个 dataset 一次 resize + 整块写入（与 chunk 大小一致）。
+    ``writer_thread=True`` 时整块写入（含 gzip 压缩）在后台线程完成，主循环只交换缓冲块。
+    equality 端点存为 body id（eq_obj1_id / eq_obj2_id），名称表 body_names_json 只写一次；
+    eq_changed 记录每帧相对上一帧变化的 equality 行（首帧全部为 1）。
+    """
 
     def __init__(
         self,
@@ -118,6 +133,8 @@ class TrajectoryRecorder:
         session_timestamp: str,
         control_dt: float,
         sph_names: FrozenSet[str],
+        flush_frames: int = DEFAULT_FLUSH_FRAMES,
+        writer_thread: bool = True,
     ):
         self._path = Path(path)
         self._env = env
@@ -132,18 +149,50 @@ class TrajectoryRecorder:
         self._K = len(self._mocap_names)
         self._E = len(self._eq_indices)
 
+        mj = env.gym._mjModel
+        mocap_ids: List[int] = []
+        for name in self._mocap_names:
+            mid = int(mj.body_mocapid[env.model.body_name2id(name)])
+            if mid < 0:
+                raise RuntimeError(f"Body {name!r} is not a mocap body")
+            mocap_ids.append(mid)
+        self._mocap_ids = np.array(mocap_ids, dtype=np.intp)
+        self._eq_index_arr = np.array(self._eq_indices, dtype=np.intp)
+        self._body_names = [
+            mujoco.mj_id2name(mj, mujoco.mjtObj.mjOBJ_BODY, i) or "" for i in range(int(mj.nbody))
+        ]
+
+        self._flush_frames = max(1, int(flush_frames))
+        self._prev_eq_row: Optional[Tuple[np.ndarray, ...]] = None
+        self._block = self._alloc_block()
+        self._block_rows = 0
+        self._free_blocks: "queue.SimpleQueue[Dict[str, np.ndarray]]" = queue.SimpleQueue()
+        self._use_writer_thread = writer_thread
+        self._write_queue: Optional["queue.Queue[Optional[Tuple[Dict[str, np.ndarray], int]]]"] = None
+        self._writer: Optional[threading.Thread] = None
+        self._writer_error: Optional[BaseException] = None
+
         self._file = None
-        self._d_ctrl = None
-        self._d_mpos = None
-        self._d_mquat = None
-        self._d_eq_a = None
-        self._d_n1 = None
-        self._d_n2 = None
-        self._d_eqt = None
-        self._d_eqd = None
+        self._datasets: Dict[str, Any] = {}
         self._T = 0
         self._closed = False
 
+    def _alloc_block(self) -> Dict[str, np.ndarray]:
+        n = self._flush_frames
+        block = {
+            "mocap_pos": np.zeros((n, self._K, 3), dtype=np.float32),
+            "mocap_quat": np.zeros((n, self._K, 4), dtype=np.float32),
+            "eq_active": np.zeros((n, self._E), dtype=np.uint8),
+            "eq_obj1_id": np.zeros((n, self._E), dtype=np.int32),
+            "eq_obj2_id": np.zeros((n, self._E), dtype=np.int32),
+            "eq_type": np.zeros((n, self._E), dtype=np.int32),
+            "eq_data": np.zeros((n, self._E, self._eq_w), dtype=np.float64),
+            "eq_changed": np.zeros((n, self._E), dtype=np.uint8),
+        }
+        if self._nu > 0:
+            block["ctrl"] = np.zeros((n, self._nu), dtype=np.float32)
+        return block
+
     def _ensure_open(self) -> None:
         if self._file is not None:
             return
@@ -162,174 +211,167 @@ class TrajectoryRecorder:
         g.attrs["eq_data_width"] = self._eq_w
         g.attrs["mocap_body_names_json"] = json.dumps(self._mocap_names, ensure_ascii=False)
         g.attrs["recorded_eq_indices_json"] = json.dumps(self._eq_indices)
+        g.attrs["body_names_json"] = json.dumps(self._body_names, ensure_ascii=False)
         g.attrs["sph_coupling_mocap_names_json"] = json.dumps(
             sorted(self._sph_names), ensure_ascii=False
         )
 
-        chunk = min(256, max(1, self._T + 1))
-
-        def _chunks_1d(width: int) -> tuple:
-            return (chunk, width)
-
-        def _chunks_mocap(last: int) -> tuple:
-            if self._K > 0:
-                return (chunk, self._K, last)
-            return (chunk, 0, last)
-
-        if self._nu > 0:
-            self._d_ctrl = g.create_dataset(
-                "ctrl",
-                shape=(0, self._nu),
-                maxshape=(None, self._nu),
-                dtype=np.float32,
-                chunks=h5py_chunks_if_valid(_chunks_1d(self._nu)),
+        # chunk 与块缓冲等长：每次 flush 恰好写满整 chunk，只压缩一次
+        chunk = self._flush_frames
+        for name, rows in self._block.items():
+            self._datasets[name] = g.create_dataset(
+                name,
+                shape=(0,) + rows.shape[1:],
+                maxshape=(None,) + rows.shape[1:],
+                dtype=rows.dtype,
+                chunks=h5py_chunks_if_valid((chunk,) + rows.shape[1:]),
                 compression="gzip",
                 compression_opts=4,
             )
-        else:
-            self._d_ctrl = None
-
-        self._d_mpos = g.create_dataset(
-            "mocap_pos",
-            shape=(0, self._K, 3),
-            maxshape=(None, self._K, 3),
-            dtype=np.float32,
-            chunks=h5py_chunks_if_valid(_chunks_mocap(3)),
-            compression="gzip",
-            compression_opts=4,
-        )
-        self._d_mquat = g.create_dataset(
-            "mocap_quat",
-            shape=(0, self._K, 4),
-            maxshape=(None, self._K, 4),
-            dtype=np.float32,
-            chunks=h5py_chunks_if_valid(_chunks_mocap(4)),
-            compression="gzip",
-            compression_opts=4,
-        )
-        self._d_eq_a = g.create_dataset(
-            "eq_active",
-            shape=(0, self._E),
-            maxshape=(None, self._E),
-            dtype=np.uint8,
-            chunks=h5py_chunks_if_valid(_chunks_1d(self._E)),
-            compression="gzip",
-            compression_opts=4,
-        )
-        self._str_dt = h5py.string_dtype(encoding="utf-8")
-        self._d_n1 = g.create_dataset(
-            "eq_obj1_name",
-            shape=(0, self._E),
-            maxshape=(None, self._E),
-            dtype=self._str_dt,
-            chunks=h5py_chunks_if_valid(_chunks_1d(self._E)),
-            compression="gzip",
-            compression_opts=4,
-        )
-        self._d_n2 = g.create_dataset(
-            "eq_obj2_name",
-            shape=(0, self._E),
-            maxshape=(None, self._E),
-            dtype=self._str_dt,
-            chunks=h5py_chunks_if_valid(_chunks_1d(self._E)),
-            compression="gzip",
-            compression_opts=4,
-        )
-        self._d_eqt = g.create_dataset(
-            "eq_type",
-            shape=(0, self._E),
-            maxshape=(None, self._E),
-            dtype=np.int32,
-            chunks=h5py_chunks_if_valid(_chunks_1d(self._E)),
-            compression="gzip",
-            compression_opts=4,
-        )
-        self._d_eqd = g.create_dataset(
-            "eq_data",
-            shape=(0, self._E, self._eq_w),
-            maxshape=(None, self._E, self._eq_w),
-            dtype=np.float64,
-            chunks=h5py_chunks_if_valid((chunk, self._E, self._eq_w)),
-            compression="gzip",
-            compression_opts=4,
-        )
+
+        if self._use_writer_thread:
+            self._write_queue = queue.Queue()
+            self._writer = threading.Thread(
+                target=self._writer_loop, name="TrajectoryRecorderWriter", daemon=True
+            )
+            self._writer.start()
         logger.info(
-            "TrajectoryRecorder opened %s (K=%s mocap, E=%s eq, nu=%s)",
+            "TrajectoryRecorder opened %s (K=%s mocap, E=%s eq, nu=%s, flush_frames=%s, writer_thread=%s)",
             self._path,
             self._K,
             self._E,
             self._nu,
+            self._flush_frames,
+            self._use_writer_thread,
         )
 
     def append_frame(self) -> None:
         """在 env.step 成功之后调用。"""
         self._ensure_open()
+        if self._writer_error is not None:
+            raise RuntimeError(f"Trajectory writer failed: {self._writer_error}") from self._writer_error
         env = self._env
         mj = env.gym._mjModel
         d = env.gym._mjData
 
-        ctrl = np.array(d.ctrl[: self._nu], dtype=np.float32, copy=True)
+        block = self._block
+        r = self._block_rows
+        if self._nu > 0:
+            block["ctrl"][r] = d.ctrl[: self._nu]
+        block["mocap_pos"][r] = d.mocap_pos[self._mocap_ids]
+        block["mocap_quat"][r] = d.mocap_quat[self._mocap_ids]
+
+        eq = self._eq_index_arr
+        eq_active = d.eq_active if hasattr(d, "eq_active") else mj.eq_active0
+        block["eq_active"][r] = np.asarray(eq_active)[eq] != 0
+        block["eq_obj1_id"][r] = mj.eq_obj1id[eq]
+        block["eq_obj2_id"][r] = mj.eq_obj2id[eq]
+        block["eq_type"][r] = mj.eq_type[eq]
+        block["eq_data"][r] = mj.eq_data[eq]
+
+        eq_row = tuple(
+            block[name][r] for name in ("eq_active", "eq_obj1_id", "eq_obj2_id", "eq_type", "eq_data")
+        )
+        if self._prev_eq_row is None:
+            block["eq_changed"][r] = 1
+        else:
+            block["eq_changed"][r] = _eq_rows_changed(self._prev_eq_row, eq_row)
+        self._prev_eq_row = tuple(row.copy() for row in eq_row)
 
-        mpos = np.zeros((self._K, 3), dtype=np.float32)
-        mquat = np.zeros((self._K, 4), dtype=np.float32)
-        for j, name in enumerate(self._mocap_names):
-            bid = env.model.body_name2id(name)
-            mid = int(mj.body_mocapid[bid])
-            if mid < 0:
-                raise RuntimeError(f"Body {name!r} is not a mocap body")
-            mpos[j] = d.mocap_pos[mid]
-            mquat[j] = d.mocap_quat[mid]
-
-        eq_a = np.zeros((self._E,), dtype=np.uint8)
-        n1 = np.empty((self._E,), dtype=object)
-        n2 = np.empty((self._E,), dtype=object)
-        eqt = np.zeros((self._E,), dtype=np.int32)
-        eqd = np.zeros((self._E, self._eq_w), dtype=np.float64)
-        for j, gi in enumerate(self._eq_indices):
-            if hasattr(d, "eq_active"):
-                eq_a[j] = 1 if bool(d.eq_active[gi]) else 0
-            else:
-                eq_a[j] = 1 if bool(mj.eq_active0[gi]) else 0
-            b1 = int(mj.eq_obj1id[gi])
-            b2 = int(mj.eq_obj2id[gi])
-            n1[j] = mujoco.mj_id2name(mj, mujoco.mjtObj.mjOBJ_BODY, b1) or ""
-            n2[j] = mujoco.mj_id2name(mj, mujoco.mjtObj.mjOBJ_BODY, b2) or ""
-            eqt[j] = int(mj.eq_type[gi])
-            eqd[j] = np.array(mj.eq_data[gi], dtype=np.float64, copy=True)
+        self._block_rows = r + 1
+        if self._block_rows == self._flush_frames:
+            self._flush()
 
+    def _flush(self) -> None:
+        if self._block_rows == 0:
+            return
+        block, rows = self._block, self._block_rows
+        if self._write_queue is not None:
+            try:
+                self._block = self._free_blocks.get_nowait()
+            except queue.Empty:
+                self._block = self._alloc_block()
+            self._write_queue.put((block, rows))
+        else:
+            try:
+                self._write_block(block, rows)
+            except Exception as e:
+                self._writer_error = e
+                raise
+        self._block_rows = 0
+
+    def _write_block(self, block: Dict[str, np.ndarray], rows: int) -> None:
         t = self._T
-        new_t = t + 1
-        rows: List[Tuple[Any, Any]] = [
-            (self._d_mpos, mpos[None, ...]),
-            (self._d_mquat, mquat[None, ...]),
-            (self._d_eq_a, eq_a[None, :]),
-            (self._d_n1, n1[None, :]),
-            (self._d_n2, n2[None, :]),
-            (self._d_eqt, eqt[None, :]),
-            (self._d_eqd, eqd[None, ...]),
-        ]
-        if self._d_ctrl is not None:
-            rows.insert(0, (self._d_ctrl, ctrl[None, :]))
-        for ds, row in rows:
-            ds.resize((new_t,) + ds.shape[1:])
-            ds[t] = row[0]
+        new_t = t + rows
+        try:
+            for name, ds in self._datasets.items():
+                ds.resize((new_t,) + ds.shape[1:])
+                ds[t:new_t] = block[name][:rows]
+        except Exception:
+            # 写到一半失败：各 dataset 截回已完整写入的 T 帧，与 num_frames 一致
+            for ds in self._datasets.values():
+                try:
+                    ds.resize((t,) + ds.shape[1:])
+                except Exception:
+                    pass
+            raise
         self._T = new_t
 
+    def _writer_loop(self) -> None:
+        while True:
+            item = self._write_queue.get()
+            if item is None:
+                break
+            block, rows = item
+            if self._writer_error is None:
+                try:
+                    self._write_block(block, rows)
+                except Exception as e:
+                    logger.error("TrajectoryRecorder write failed: %s", e)
+                    self._writer_error = e
+            self._free_blocks.put(block)
+
     def close(self) -> None:
         if self._closed:
             return
         self._closed = True
         if self._file is not None:
-            self._file.attrs["num_frames"] = self._T
-            self._file.close()
-            self._file = None
+            try:
+                if self._writer_error is None:
+                    self._flush()
+            finally:
+                if self._writer is not None:
+                    self._write_queue.put(None)
+                    self._writer.join()
+                    self._writer = None
+                # 只记录实际写入文件的帧数，写线程出错后的帧已丢弃
+                self._file.attrs["num_frames"] = self._T
+                self._file.close()
+                self._file = None
+            if self._writer_error is not None:
+                logger.error(
+                    "TrajectoryRecorder closed %s after a write failure (%s frames kept)", self._path, self._T
+                )
+                raise RuntimeError(f"Trajectory writer failed: {self._writer_error}") from self._writer_error
             logger.info("TrajectoryRecorder closed %s (%s frames)", self._path, self._T)
 
 
 class TrajectoryPlayer:
-    """Record 模式：按帧读取轨迹并应用到 env（仅人类子集）。"""
+    """
+    Record 模式：按帧读取轨迹并应用到 env（仅人类子集）。
+
+    预读：一次读取 ``prefetch_frames`` 帧的所有 dataset 到连续 NumPy 块（``prefetch_thread=True``
+    时在后台线程提前读取下一块），equality 端点名称只解码一次进驻留名称表，
+    每帧只是对块做切片。
+    """
 
-    def __init__(self, path: Path, env: Any):
+    def __init__(
+        self,
+        path: Path,
+        env: Any,
+        prefetch_frames: int = DEFAULT_FLUSH_FRAMES,
+        prefetch_thread: bool = True,
+    ):
         try:
             import h5py
         except ImportError as e:
@@ -341,10 +383,10 @@ class TrajectoryPlayer:
         g = self._h5
 
         sv = int(g.attrs.get("schema_version", 0))
-        if sv != SCHEMA_VERSION:
+        if sv not in SUPPORTED_SCHEMA_VERSIONS:
             raise ValueError(
-                f"Trajectory file schema_version={sv} expected {SCHEMA_VERSION}; "
-                "re-record with current OrcaPlayground (human trajectory schema 3)."
+                f"Trajectory file schema_version={sv} expected one of {SUPPORTED_SCHEMA_VERSIONS}; "
+                f"re-record with current OrcaPlayground (human trajectory schema {SCHEMA_VERSION})."
             )
 
         self._nu = int(g.attrs["nu"])
@@ -373,17 +415,62 @@ class TrajectoryPlayer:
         else:
             self._ctrl = None
         self._eq_a = g["eq_active"]
-        if "eq_obj1_name" not in g or "eq_obj2_name" not in g:
-            raise ValueError(
-                "Trajectory HDF5 missing eq_obj1_name/eq_obj2_name (schema 3 required)."
-            )
-        self._n1 = g["eq_obj1_name"]
-        self._n2 = g["eq_obj2_name"]
+        self._eq_changed = g["eq_changed"] if "eq_changed" in g else None
+        # 驻留名称表：schema 4 即 body_names_json；schema 3 在读块时把字符串映射为表内 id
+        self._name_table: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        if sv >= 4:
+            # schema 4：端点为 body id，名称从 body_names_json 查表
+            if "eq_obj1_id" not in g or "eq_obj2_id" not in g or "body_names_json" not in g.attrs:
+                raise ValueError(
+                    "Trajectory HDF5 missing eq_obj1_id/eq_obj2_id/body_names_json (schema 4)."
+                )
+            self._name_table = json.loads(str(g.attrs["body_names_json"]))
+            self._names_are_ids = True
+            self._n1 = g["eq_obj1_id"]
+            self._n2 = g["eq_obj2_id"]
+        else:
+            if "eq_obj1_name" not in g or "eq_obj2_name" not in g:
+                raise ValueError(
+                    "Trajectory HDF5 missing eq_obj1_name/eq_obj2_name (schema 3 required)."
+                )
+            self._names_are_ids = False
+            self._n1 = g["eq_obj1_name"]
+            self._n2 = g["eq_obj2_name"]
         self._eqt = g["eq_type"]
         self._eqd = g["eq_data"]
 
         self._validate_against_env()
 
+        self._datasets: Dict[str, Any] = {
+            "mocap_pos": self._mpos,
+            "mocap_quat": self._mquat,
+        }
+        if self._ctrl is not None:
+            self._datasets["ctrl"] = self._ctrl
+        if len(self._eq_indices) > 0:
+            self._datasets.update({
+                "eq_active": self._eq_a,
+                "eq_obj1": self._n1,
+                "eq_obj2": self._n2,
+                "eq_type": self._eqt,
+                "eq_data": self._eqd,
+            })
+            if self._eq_changed is not None:
+                self._datasets["eq_changed"] = self._eq_changed
+        self._prefetch_frames = max(1, int(prefetch_frames))
+        self._block: Optional[Dict[str, np.ndarray]] = None
+        self._block_start = 0
+        self._block_stop = 0
+        self._prefetch_executor: Optional[ThreadPoolExecutor] = None
+        self._prefetch_future: Optional[Future] = None
+        self._prefetch_start = -1
+        self._last_pushed_frame = -1
+        if prefetch_thread:
+            self._prefetch_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="TrajectoryPlayerPrefetch"
+            )
+
     def _validate_against_env(self) -> None:
         env = self._env
         if self._ctrl is not None and int(self._ctrl.shape[0]) != self._T:
@@ -432,51 +519,128 @@ class TrajectoryPlayer:
         """在成功应用一帧后调用，使下一帧读取下一行。"""
         self._t += 1
 
+    def _intern_names(self, raw: np.ndarray) -> np.ndarray:
+        """schema 3：每块只对不同的字符串解码一次，返回驻留名称表中的 id。"""
+        uniq, inverse = np.unique(raw.reshape(-1), return_inverse=True)
+        ids = np.empty(len(uniq), dtype=np.int32)
+        for k, x in enumerate(uniq):
+            name = _decode_h5_str(x)
+            if name not in self._name_ids:
+                self._name_ids[name] = len(self._name_table)
+                self._name_table.append(name)
+            ids[k] = self._name_ids[name]
+        return ids[inverse].reshape(raw.shape)
+
+    def _read_block(self, start: int) -> Dict[str, np.ndarray]:
+        stop = min(start + self._prefetch_frames, self._T)
+        block = {name: ds[start:stop] for name, ds in self._datasets.items()}
+        if not self._names_are_ids and "eq_obj1" in block:
+            block["eq_obj1"] = self._intern_names(block["eq_obj1"])
+            block["eq_obj2"] = self._intern_names(block["eq_obj2"])
+        if "eq_active" in block and "eq_changed" not in block:
+            # schema < 5：由相邻行推出变化掩码，块首行按全部变化处理
+            rows = tuple(block[name] for name in ("eq_active", "eq_obj1", "eq_obj2", "eq_type", "eq_data"))
+            changed = np.ones(block["eq_active"].shape, dtype=np.uint8)
+            changed[1:] = _eq_rows_changed(
+                tuple(value[:-1] for value in rows),
+                tuple(value[1:] for value in rows),
+            )
+            block["eq_changed"] = changed
+        return block
+
+    def _block_for_frame(self, i: int) -> Dict[str, np.ndarray]:
+        if self._block is not None and self._block_start <= i < self._block_stop:
+            return self._block
+
+        start = i - i % self._prefetch_frames
+        if self._prefetch_future is not None and self._prefetch_start == start:
+            block = self._prefetch_future.result()
+        else:
+            if self._prefetch_future is not None:
+                # 非顺序访问：丢弃预读结果
+                self._prefetch_future.result()
+            block = self._read_block(start)
+        self._prefetch_future = None
+        self._block = block
+        self._block_start = start
+        self._block_stop = min(start + self._prefetch_frames, self._T)
+
+        if self._prefetch_executor is not None and self._block_stop < self._T:
+            self._prefetch_start = self._block_stop
+            self._prefetch_future = self._prefetch_executor.submit(self._read_block, self._block_stop)
+        return block
+
     def push_pending_to_env(self) -> None:
         """
         在 OrcaLinkBridge.step() 之后、env.step 之前调用：把当前游标帧写入 SimEnv
         pending，由 SimEnv.step 内消费（mocap / equality / ctrl）。
         """
         i = self._frame_index_clamped()
-        E = len(self._eq_indices)
-        if E > 0:
-            eq_active = np.asarray(self._eq_a[i], dtype=np.uint8).reshape(-1)
-            eq_obj1_name = [_decode_h5_str(x) for x in np.asarray(self._n1[i]).reshape(-1)]
-            eq_obj2_name = [_decode_h5_str(x) for x in np.asarray(self._n2[i]).reshape(-1)]
-            eq_type = np.asarray(self._eqt[i], dtype=np.int32).reshape(-1)
-            eq_data = np.asarray(self._eqd[i], dtype=np.float64)
+        block = self._block_for_frame(i)
+        r = i - self._block_start
+        if len(self._eq_indices) > 0:
+            eq_active = block["eq_active"][r]
+            eq_obj1_name = [self._name_table[b] for b in block["eq_obj1"][r].tolist()]
+            eq_obj2_name = [self._name_table[b] for b in block["eq_obj2"][r].tolist()]
+            eq_type = block["eq_type"][r]
+            eq_data = block["eq_data"][r]
+            if i == self._last_pushed_frame + 1:
+                eq_changed = block["eq_changed"][r] != 0
+            else:
+                # 非顺序回放（首帧 / 游标跳转 / 末帧钳位）时相对上一帧的掩码无效
+                eq_changed = None
         else:
             eq_active = np.zeros((0,), dtype=np.uint8)
             eq_obj1_name = []
             eq_obj2_name = []
             eq_type = np.zeros((0,), dtype=np.int32)
             eq_data = np.zeros((0, self._eq_w), dtype=np.float64)
+            eq_changed = None
+        self._last_pushed_frame = i
 
         if self._ctrl is not None:
-            ctrl_row = np.asarray(self._ctrl[i], dtype=np.float32).reshape(self._nu)
+            ctrl_row = block["ctrl"][r]
         else:
             ctrl_row = np.zeros((0,), dtype=np.float32)
 
+        # 行是预读块的只读切片，SimEnv 只读取不修改
         cfg = HumanTrajectoryStepConfig(
             ctrl=ctrl_row,
-            mocap_names=list(self._mocap_names),
-            mocap_pos=np.array(self._mpos[i], copy=True),
-            mocap_quat=np.array(self._mquat[i], copy=True),
-            eq_indices=list(self._eq_indices),
+            mocap_names=self._mocap_names,
+            mocap_pos=block["mocap_pos"][r],
+            mocap_quat=block["mocap_quat"][r],
+            eq_indices=self._eq_indices,
             eq_active=eq_active,
             eq_obj1_name=eq_obj1_name,
             eq_obj2_name=eq_obj2_name,
             eq_type=eq_type,
             eq_data=eq_data,
+            eq_changed=eq_changed,
         )
         self._env.set_pending_human_trajectory_step(cfg)
 
     def close(self) -> None:
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=True)
+            self._prefetch_executor = None
+            self._prefetch_future = None
         if self._h5 is not None:
             self._h5.close()
             self._h5 = None
 
 
+def _eq_rows_changed(prev: Tuple[np.ndarray, ...], cur: Tuple[np.ndarray, ...]) -> np.ndarray:
+    """
+    逐 equality 行比较 (eq_active, obj1, obj2, eq_type, eq_data) 两组数组，
+    前四项形状 (..., E)，eq_data 为 (..., E, W)；返回 (..., E) uint8。
+    """
+    changed = np.zeros(np.shape(cur[0]), dtype=bool)
+    for p, c in zip(prev[:4], cur[:4]):
+        changed |= p != c
+    changed |= np.any(prev[4] != cur[4], axis=-1)
+    return changed.astype(np.uint8)
+
+
 def _decode_h5_str(x: Any) -> str:
     if isinstance(x, bytes):
         return x.decode("utf-8")
@@ -7,8 +7,13 @@ from typing import List, Optional, Tuple
 
 import numpy as np
 
+from .hdf5_chunk_utils import h5py_chunks_if_valid
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_MERGE_CHUNK_ROWS = 4096
+_MAX_CHUNK_BYTES = 1 << 20
+
 
 def _read_sidecar_layout(sf) -> Tuple[bool, int, Optional[List[str]], Optional[np.ndarray]]:
     """Returns (is_v2, width, joint_names or None, joint_qpos_sizes or None)."""
@@ -47,15 +52,51 @@ def _decode_h5_str(x: object) -> str:
     return str(x)
 
 
+def _forward_fill_sidecar_rows(
+    frame_index: np.ndarray,
+    keys: np.ndarray,
+    first_rows: np.ndarray,
+    carry: int,
+) -> Tuple[np.ndarray, int]:
+    """
+    Sidecar row for each particle row of one chunk (-1: nothing matched yet).
+    keys / first_rows: sorted unique sph_record_frame_index and its first sidecar row;
+    carry: the row in effect before the chunk.
+    """
+    pos = np.searchsorted(keys, frame_index)
+    pos_c = np.minimum(pos, len(keys) - 1)
+    hit = (pos < len(keys)) & (keys[pos_c] == frame_index)
+    # 前向填充：每行取本块内最近一次命中，块首之前的沿用 carry
+    last_hit = np.maximum.accumulate(np.where(hit, np.arange(len(frame_index)), -1))
+    rows = np.where(last_hit >= 0, first_rows[pos_c[np.maximum(last_hit, 0)]], carry)
+    new_carry = int(rows[-1]) if len(rows) else carry
+    return rows, new_carry
+
+
+def _read_rows(ds, rows: np.ndarray) -> np.ndarray:
+    """ds[rows] for arbitrary (unsorted, repeated) rows; one contiguous read when the span is compact."""
+    uniq, inverse = np.unique(rows, return_inverse=True)
+    lo, hi = int(uniq[0]), int(uniq[-1]) + 1
+    if hi - lo <= 4 * len(uniq) + 1024:
+        block = np.asarray(ds[lo:hi], dtype=np.float64)
+        return block[uniq - lo][inverse]
+    return np.asarray(ds[uniq], dtype=np.float64)[inverse]
+
+
 def merge_particle_mujoco_sidecar_into_particle_h5(
     particle_h5_path: str,
     sidecar_tmp_path: str,
     *,
     session_timestamp: Optional[str] = None,
+    chunk_rows: int = DEFAULT_MERGE_CHUNK_ROWS,
 ) -> None:
     """
     Read temporary sidecar (samples/*) and particle file (frames/frame_index),
     build mujoco_frames/qpos aligned to particle rows; forward-fill missing keys.
+
+    Streaming: the first sidecar row of each SPH frame index comes from np.unique, particle rows are
+    mapped with np.searchsorted, and qpos is read and written ``chunk_rows`` rows at a time
+    (gzip, row-chunked), so only the two index columns are held in memory.
     """
     import h5py
 
@@ -68,81 +109,81 @@ def merge_particle_mujoco_sidecar_into_particle_h5(
         logger.warning("merge: sidecar HDF5 missing, skip: %s", s_path)
         return
 
+    chunk_rows = max(1, int(chunk_rows))
     with h5py.File(s_path, "r") as sf:
         if "samples" not in sf:
             logger.warning("merge: sidecar has no samples group, skip")
             return
         is_v2, width_meta, joint_names, joint_sizes = _read_sidecar_layout(sf)
         sg = sf["samples"]
-        q_side = np.asarray(sg["qpos"][:], dtype=np.float64)
-        sph_idx = np.asarray(sg["sph_record_frame_index"][:], dtype=np.uint64)
-        if q_side.ndim == 2 and q_side.shape[1] > 0:
-            nq = int(q_side.shape[1])
+        q_ds = sg["qpos"]
+        if q_ds.ndim == 2 and q_ds.shape[1] > 0:
+            nq = int(q_ds.shape[1])
         else:
             nq = width_meta
-
-    if q_side.size == 0:
-        logger.warning("merge: sidecar empty, skip")
-        return
-
-    if is_v2 and joint_names is not None and joint_sizes is not None:
-        if nq != int(joint_sizes.sum()):
-            logger.warning(
-                "merge: qpos row width %d != sum(joint_qpos_sizes) %d",
-                nq,
-                int(joint_sizes.sum()),
-            )
-
-    with h5py.File(p_path, "r") as pf:
-        fi = np.asarray(pf["frames"]["frame_index"][:], dtype=np.uint64)
-        n = int(fi.shape[0])
-
-    first_for_k: dict[int, np.ndarray] = {}
-    for t in range(q_side.shape[0]):
-        k = int(sph_idx[t])
-        if k not in first_for_k:
-            first_for_k[k] = q_side[t].copy()
-
-    out = np.zeros((n, nq), dtype=np.float64)
-    prev = np.zeros(nq, dtype=np.float64)
-    filled = False
-    for i in range(n):
-        k = int(fi[i])
-        row = first_for_k.get(k)
-        if row is not None:
-            prev = row.astype(np.float64, copy=False)
-            filled = True
-        out[i, :] = prev
-    if not filled:
-        logger.warning("merge: no matching sph_record_frame_index for any particle row; qpos left zero")
-
-    with h5py.File(p_path, "r+") as pf:
-        if "mujoco_frames" in pf:
-            del pf["mujoco_frames"]
-        st = h5py.string_dtype(encoding="utf-8")
+        if q_ds.shape[0] == 0 or q_ds.ndim != 2 or q_ds.shape[1] == 0:
+            logger.warning("merge: sidecar empty, skip")
+            return
 
         if is_v2 and joint_names is not None and joint_sizes is not None:
-            pf.attrs["mujoco_schema_version"] = 2
-            pf.attrs["mujoco_nq"] = nq
-            pf.attrs["qpos_layout"] = "joint_name_packed"
-            if session_timestamp:
-                pf.attrs["mujoco_session_timestamp"] = session_timestamp
-            g = pf.create_group("mujoco_frames")
-            g.create_dataset("qpos", data=out, dtype="float64")
-            g.create_dataset("joint_names", data=joint_names, dtype=st)
-            g.create_dataset("joint_qpos_sizes", data=joint_sizes, dtype="int32")
-        else:
-            pf.attrs["mujoco_schema_version"] = 1
+            if nq != int(joint_sizes.sum()):
+                logger.warning(
+                    "merge: qpos row width %d != sum(joint_qpos_sizes) %d",
+                    nq,
+                    int(joint_sizes.sum()),
+                )
+
+        sph_idx = np.asarray(sg["sph_record_frame_index"][:], dtype=np.uint64)
+        keys, first_rows = np.unique(sph_idx, return_index=True)
+        del sph_idx
+
+        with h5py.File(p_path, "r+") as pf:
+            fi_ds = pf["frames"]["frame_index"]
+            n = int(fi_ds.shape[0])
+
+            if "mujoco_frames" in pf:
+                del pf["mujoco_frames"]
+            st = h5py.string_dtype(encoding="utf-8")
+            if is_v2 and joint_names is not None and joint_sizes is not None:
+                pf.attrs["mujoco_schema_version"] = 2
+                pf.attrs["qpos_layout"] = "joint_name_packed"
+            else:
+                pf.attrs["mujoco_schema_version"] = 1
+                pf.attrs["qpos_layout"] = "mjcf_order"
             pf.attrs["mujoco_nq"] = nq
-            pf.attrs["qpos_layout"] = "mjcf_order"
             if session_timestamp:
                 pf.attrs["mujoco_session_timestamp"] = session_timestamp
             g = pf.create_group("mujoco_frames")
-            g.create_dataset("qpos", data=out, dtype="float64")
+            h5_chunk_rows = max(1, min(chunk_rows, n, _MAX_CHUNK_BYTES // (8 * nq)))
+            out = g.create_dataset(
+                "qpos",
+                shape=(n, nq),
+                dtype="float64",
+                chunks=h5py_chunks_if_valid((h5_chunk_rows, nq)),
+                compression="gzip",
+                compression_opts=4,
+            )
+            if is_v2 and joint_names is not None and joint_sizes is not None:
+                g.create_dataset("joint_names", data=joint_names, dtype=st)
+                g.create_dataset("joint_qpos_sizes", data=joint_sizes, dtype="int32")
+
+            carry = -1
+            for start in range(0, n, chunk_rows):
+                stop = min(start + chunk_rows, n)
+                fi = np.asarray(fi_ds[start:stop], dtype=np.uint64)
+                rows, carry = _forward_fill_sidecar_rows(fi, keys, first_rows, carry)
+                block = np.zeros((stop - start, nq), dtype=np.float64)
+                filled = rows >= 0
+                if np.any(filled):
+                    block[filled] = _read_rows(q_ds, rows[filled])
+                out[start:stop] = block
+
+    if carry < 0:
+        logger.warning("merge: no matching sph_record_frame_index for any particle row; qpos left zero")
 
     logger.info(
         "merge: wrote mujoco_frames/qpos shape=%s layout=%s into %s",
-        out.shape,
+        (n, nq),
         "joint_name_packed" if is_v2 and joint_names is not None else "mjcf_order",
         p_path.resolve(),
     )
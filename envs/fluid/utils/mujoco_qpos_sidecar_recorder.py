@@ -18,6 +18,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_FLUSH_ROWS = 256
+_MAX_CHUNK_BYTES = 1 << 20
+
 
 def sph_frame_cursor_path_for_particle_h5(record_output_path: str) -> str:
     """Same path convention as sph_config / ParticleRenderBridge (8-byte LE uint64)."""
@@ -56,6 +59,39 @@ def read_cursor_uint64(cursor_path: str) -> int:
     return struct.unpack("<Q", data[:8])[0]
 
 
+class SphFrameCursorReader:
+    """
+    Persistent-fd reader of the SPH cursor file: same flock LOCK_SH protocol as read_cursor_uint64,
+    without an open/close per read. The file is opened lazily (0 until it exists).
+    """
+
+    def __init__(self, cursor_path: str) -> None:
+        self._cursor_path = cursor_path
+        self._fd: Optional[int] = None
+
+    def read(self) -> int:
+        if fcntl is None:
+            return read_cursor_uint64(self._cursor_path)
+        if self._fd is None:
+            try:
+                self._fd = os.open(self._cursor_path, os.O_RDONLY)
+            except FileNotFoundError:
+                return 0
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+        try:
+            data = os.pread(self._fd, 8, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        if len(data) < 8:
+            return 0
+        return struct.unpack("<Q", data[:8])[0]
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
 def build_joint_qpos_pack_layout(env: Any) -> Tuple[List[str], np.ndarray, int, int]:
     """
     Sorted joint names, qpos segment lengths (int32), packed width Q, model nq (diagnostic).
@@ -78,8 +114,34 @@ def build_joint_qpos_pack_layout(env: Any) -> Tuple[List[str], np.ndarray, int,
     return joint_names, sizes, packed, model_nq
 
 
+def build_joint_qpos_gather_index(
+    env: Any, joint_names: List[str], joint_qpos_sizes: np.ndarray
+) -> np.ndarray:
+    """
+    Indices into data.qpos (intp, packed width) so that ``qpos[index]`` is the joint-name-packed row
+    of build_joint_qpos_pack_layout.
+    """
+    uw = env.unwrapped
+    qpos_offsets, _, _ = uw.query_joint_offsets(joint_names)
+    offsets = np.asarray(qpos_offsets, dtype=np.intp).reshape(-1)
+    sizes = np.asarray(joint_qpos_sizes, dtype=np.intp).reshape(-1)
+    if offsets.size != sizes.size:
+        raise ValueError("joint qpos offsets and sizes length mismatch")
+    if sizes.size == 0:
+        return np.zeros(0, dtype=np.intp)
+    # 每个关节展开为 offset + [0, size)
+    starts = np.repeat(offsets - np.cumsum(sizes) + sizes, sizes)
+    return starts + np.arange(int(sizes.sum()), dtype=np.intp)
+
+
 class MujocoQposSidecarRecorder:
-    """Append-only temporary HDF5: joint-name-packed qpos + sph_record_frame_index + mujoco_step_index."""
+    """
+    Append-only temporary HDF5: joint-name-packed qpos + sph_record_frame_index + mujoco_step_index.
+
+    Rows are staged in a preallocated block and written every ``flush_rows`` rows
+    (one resize + slice write per dataset, row-chunked datasets). With ``qpos_gather_index``
+    a packed row is a single fancy-index of data.qpos instead of a per-joint query.
+    """
 
     def __init__(
         self,
@@ -89,6 +151,8 @@ class MujocoQposSidecarRecorder:
         joint_qpos_sizes: np.ndarray,
         packed_q_width: int,
         model_nq: int,
+        qpos_gather_index: Optional[np.ndarray] = None,
+        flush_rows: int = DEFAULT_FLUSH_ROWS,
     ) -> None:
         self._path = Path(tmp_h5_path)
         self._cursor_path = cursor_path
@@ -100,6 +164,17 @@ class MujocoQposSidecarRecorder:
         if int(self._joint_qpos_sizes.sum()) != self._packed_q_width:
             raise ValueError("packed_q_width does not match sum of joint_qpos_sizes")
         self._model_nq = int(model_nq)
+        if qpos_gather_index is not None:
+            qpos_gather_index = np.asarray(qpos_gather_index, dtype=np.intp).reshape(-1)
+            if qpos_gather_index.size != self._packed_q_width:
+                raise ValueError("qpos_gather_index size does not match packed_q_width")
+        self._qpos_gather_index = qpos_gather_index
+        self._cursor = SphFrameCursorReader(cursor_path)
+        self._flush_rows = max(1, int(flush_rows))
+        self._buf_qpos = np.zeros((self._flush_rows, self._packed_q_width), dtype=np.float64)
+        self._buf_sph = np.zeros(self._flush_rows, dtype=np.uint64)
+        self._buf_step = np.zeros(self._flush_rows, dtype=np.uint64)
+        self._buf_n = 0
         self._fp: Any = None
 
     @property
@@ -138,8 +213,9 @@ class MujocoQposSidecarRecorder:
 
         g = self._fp.create_group("samples")
         if self._packed_q_width > 0:
-            ch = max(1, min(self._packed_q_width, 256))
-            q_chunks = h5py_chunks_if_valid((1, ch))
+            # 按行分块：每个 chunk 为若干整行，单个 chunk 不超过约 1 MiB
+            rows = max(1, min(self._flush_rows, _MAX_CHUNK_BYTES // (8 * self._packed_q_width)))
+            q_chunks = h5py_chunks_if_valid((rows, self._packed_q_width))
         else:
             q_chunks = None
         g.create_dataset(
@@ -154,21 +230,33 @@ class MujocoQposSidecarRecorder:
             shape=(0,),
             maxshape=(None,),
             dtype="uint64",
-            chunks=(256,),
+            chunks=(self._flush_rows,),
         )
         g.create_dataset(
             "mujoco_step_index",
             shape=(0,),
             maxshape=(None,),
             dtype="uint64",
-            chunks=(256,),
+            chunks=(self._flush_rows,),
         )
 
     def append_row(self, env: Any, mujoco_step_index: int) -> None:
-        """Read cursor (short flock), then append one row. Call after env.step, outside cursor lock."""
+        """Read cursor (short flock), then buffer one row. Call after env.step, outside cursor lock."""
         if self._fp is None:
             raise RuntimeError("MujocoQposSidecarRecorder not open")
-        sph_idx = read_cursor_uint64(self._cursor_path)
+        sph_idx = self._cursor.read()
+        r = self._buf_n
+        if self._qpos_gather_index is not None:
+            np.take(env.unwrapped.gym._mjData.qpos, self._qpos_gather_index, out=self._buf_qpos[r])
+        else:
+            self._buf_qpos[r] = self._query_packed_qpos(env)
+        self._buf_sph[r] = sph_idx
+        self._buf_step[r] = mujoco_step_index
+        self._buf_n = r + 1
+        if self._buf_n == self._flush_rows:
+            self.flush()
+
+    def _query_packed_qpos(self, env: Any) -> np.ndarray:
         uw = env.unwrapped
         qmap = uw.query_joint_qpos(self._joint_names)
         parts = []
@@ -178,29 +266,35 @@ class MujocoQposSidecarRecorder:
                 raise ValueError(
                     f"joint {name!r}: qpos length {arr.size} != expected {int(expected)}"
                 )
-            parts.append(arr.copy())
+            parts.append(arr)
         q = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float64)
         if q.size != self._packed_q_width:
             raise ValueError(f"packed row size {q.size} != packed_q_width {self._packed_q_width}")
+        return q
 
+    def flush(self) -> None:
+        """Write the buffered rows (one resize + slice write per dataset)."""
+        n = self._buf_n
+        if self._fp is None or n == 0:
+            return
         g = self._fp["samples"]
-        for name, val in (
-            ("qpos", q),
-            ("sph_record_frame_index", np.uint64(sph_idx)),
-            ("mujoco_step_index", np.uint64(mujoco_step_index)),
+        for name, buf in (
+            ("qpos", self._buf_qpos),
+            ("sph_record_frame_index", self._buf_sph),
+            ("mujoco_step_index", self._buf_step),
         ):
             d = g[name]
-            n = d.shape[0]
-            d.resize((n + 1,) + d.shape[1:])
-            if name == "qpos":
-                d[n, :] = val
-            else:
-                d[n] = val
+            t = d.shape[0]
+            d.resize((t + n,) + d.shape[1:])
+            d[t:t + n] = buf[:n]
+        self._buf_n = 0
 
     def close(self) -> None:
         if self._fp is not None:
+            self.flush()
             self._fp.close()
             self._fp = None
+        self._cursor.close()
 
 
 def maybe_open_sidecar_for_record_config(
@@ -214,6 +308,7 @@ def maybe_open_sidecar_for_record_config(
     if not out:
         return None
     joint_names, sizes, packed, model_nq = build_joint_qpos_pack_layout(env)
+    gather_index = build_joint_qpos_gather_index(env, joint_names, sizes)
     tmp = mujoco_qpos_sidecar_tmp_path(out)
     cur = sph_frame_cursor_path_for_particle_h5(out)
     rec = MujocoQposSidecarRecorder(
@@ -223,6 +318,7 @@ def maybe_open_sidecar_for_record_config(
         sizes,
         packed,
         model_nq,
+        qpos_gather_index=gather_index,
     )
     rec.open()
     return rec
@@ -0,0 +1,79 @@
+"""
+Incremental, line-safe tailing of growing OrcaSPH / fluid log files.
+
+Shared by the particle-record and performance stats parsers; kept free of pyplot and gymnasium.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+
+DEFAULT_BLOCK_SIZE = 1 << 20  # 1 MiB
+
+
+@dataclass
+class TailState:
+    """Incremental read state for a single log file."""
+
+    path: Path
+    offset: int = 0  # 已消费的完整行之后的字节偏移
+    inode: Optional[int] = None  # 用于识别日志轮转（同名新文件）
+    context: Dict[str, Any] = field(default_factory=dict)  # 解析器跨次读取保留的状态
+
+
+def sync_state(path: Path, state: TailState) -> bool:
+    """Point *state* at *path*, restarting from the beginning (and clearing *state.context*)
+    if the file shrank or was replaced by a new one (rotation). Returns False if it cannot be stat'ed.
+    """
+    state.path = path
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if (state.inode is not None and st.st_ino != state.inode) or st.st_size < state.offset:
+        state.offset = 0
+        state.context.clear()
+    state.inode = st.st_ino
+    return True
+
+
+def iter_new_lines(
+    path: Path,
+    state: TailState,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    final: bool = False,
+    sync: bool = True,
+) -> Iterator[str]:
+    """Lazily yield the complete lines appended since *state.offset* (without line endings).
+
+    The file is read in bounded binary blocks, so memory stays O(block_size + longest line)
+    however large the log is. *state.offset* advances past each line as it is yielded; an
+    incomplete trailing line is left for the next poll unless *final* is set (whole-file reads
+    of a log whose last line has no newline). Rotation / truncation is handled by sync_state();
+    callers that snapshot *state* before iterating call it themselves and pass sync=False.
+    """
+    if sync and not sync_state(path, state):
+        return
+
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return
+    with f:
+        f.seek(state.offset)
+        carry = b""
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            lines = (carry + block).split(b"\n")
+            carry = lines.pop()
+            for line in lines:
+                state.offset += len(line) + 1
+                yield line.rstrip(b"\r").decode("utf-8", errors="replace")
+        if final and carry:
+            state.offset += len(carry)
+            yield carry.rstrip(b"\r").decode("utf-8", errors="replace")
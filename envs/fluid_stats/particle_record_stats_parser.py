@@ -10,10 +10,11 @@ Used by the matplotlib record-stats viewer; kept free of pyplot and gymnasium.
 """
 from __future__ import annotations
 
-from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from .log_tailer import TailState, iter_new_lines
+
 
 STAT_MARKER = "[PARTICLE_RECORD_STATS]"
 TRAJECTORY_STAT_MARKER = "[TRAJECTORY_RECORD_STATS]"
@@ -75,42 +76,18 @@ def parse_trajectory_stats_line(line: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-@dataclass
-class TailState:
-    """Incremental read state for a single log file."""
-
-    path: Path
-    offset: int = 0
-
-
 def read_new_records(
     path: Path,
     state: TailState,
     last_trajectory: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
-    """Read newly appended bytes since *state.offset* and return parsed particle records.
+    """Read the complete lines appended since *state.offset* and return parsed particle records.
 
     If *last_trajectory* is a mutable dict, update it with fields from the latest
     ``[TRAJECTORY_RECORD_STATS]`` line in the chunk (``frame_index``, ``num_frames``).
     """
-    state.path = path
-    if not path.exists():
-        return []
-    try:
-        size = path.stat().st_size
-    except OSError:
-        return []
-    if size < state.offset:
-        state.offset = 0
     records: List[Dict[str, Any]] = []
-    try:
-        with open(path, "r", encoding="utf-8", errors="replace") as f:
-            f.seek(state.offset)
-            chunk = f.read()
-            state.offset = f.tell()
-    except OSError:
-        return []
-    for line in chunk.splitlines():
+    for line in iter_new_lines(path, state):
         rec = parse_stats_line(line)
         if rec:
             records.append(rec)
@@ -231,11 +208,8 @@ def sliding_window_fps(
 def load_all_records_from_file(path: Path) -> List[Dict[str, Any]]:
     """Parse every stats line in *path* from the beginning (startup / tests)."""
     acc: List[Dict[str, Any]] = []
-    if not path.exists():
-        return acc
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
-        for line in f:
-            r = parse_stats_line(line)
-            if r:
-                merge_dedupe(acc, [r])
+    for line in iter_new_lines(path, TailState(path), final=True):
+        r = parse_stats_line(line)
+        if r:
+            merge_dedupe(acc, [r])
     return acc
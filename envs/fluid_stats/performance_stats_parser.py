@@ -15,20 +15,37 @@ Supports two formats:
     ...
     [TIME_STATS_TREE_META] numSteps_avg=5.0 batch_count=10 step_count=50
 
+MuJoCo main-loop lines appended by run_fluid_sim (envs/fluid/launch/loop_scheduler.py)
+are parsed as well, into a ``_tree_mujoco`` record::
+
+    [MUJOCO_TIME_STATS] steps=250 fps=50.00 period_ms=20.000 loop_ms=7.512 sph_sync=3.100 ...
+
 Used by the matplotlib performance-stats viewer; kept free of pyplot and gymnasium.
 """
 from __future__ import annotations
 
 import re
+from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .log_tailer import TailState, iter_new_lines, sync_state
+except ImportError:  # performance_stats_viewer.py 以脚本方式运行，本目录在 sys.path 上
+    from log_tailer import TailState, iter_new_lines, sync_state
 
 
 STAT_MARKER = "[TIME_STATS]"
 TREE_BATCH_MARKER = "[TIME_STATS_TREE_BATCH]"
 TREE_STEP_MARKER = "[TIME_STATS_TREE_STEP]"
 TREE_META_MARKER = "[TIME_STATS_TREE_META]"
+MUJOCO_STAT_MARKER = "[MUJOCO_TIME_STATS]"
+
+# [MUJOCO_TIME_STATS] 中不属于阶段耗时的字段
+_MUJOCO_NON_PHASE_KEYS = ("steps", "fps", "period_ms", "loop_ms", "overruns", "skipped_ticks", "policy")
 
 
 @dataclass
@@ -169,46 +186,75 @@ def parse_performance_stats_line(line: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-@dataclass
-class TailState:
-    """Incremental read state for a single log file."""
-
-    path: Path
-    offset: int = 0
+def parse_mujoco_stats_line(line: str) -> Optional[Dict[str, Any]]:
+    """Return the typed fields of a [MUJOCO_TIME_STATS] line, or None."""
+    i = line.find(MUJOCO_STAT_MARKER)
+    if i < 0:
+        return None
+    out: Dict[str, Any] = {}
+    for p in line[i + len(MUJOCO_STAT_MARKER):].split():
+        if "=" not in p:
+            continue
+        k, v = p.split("=", 1)
+        try:
+            out[k] = float(v)
+        except ValueError:
+            out[k] = v
+    return out or None
+
+
+def mujoco_stats_to_tree(stats: Dict[str, Any]) -> TimingTreeNode:
+    """MuJoCo main-loop phases as a one-level timing tree (root = whole iteration incl. idle)."""
+    phases = [
+        (k, float(v)) for k, v in stats.items()
+        if k not in _MUJOCO_NON_PHASE_KEYS and isinstance(v, float)
+    ]
+    total = sum(v for _, v in phases)
+    root = TimingTreeNode(name="mujocoMainLoop", time_ms=total, pct=100.0)
+    for name, value in phases:
+        root.children.append(
+            TimingTreeNode(name=name, time_ms=value, pct=value / total * 100.0 if total > 0 else 0.0)
+        )
+    return root
 
 
 def read_new_performance_records(
     path: Path,
     state: TailState,
+    final: bool = False,
 ) -> List[Dict[str, Any]]:
-    """Read newly appended bytes since *state.offset* and return parsed performance records."""
-    state.path = path
-    if not path.exists():
-        return []
-    try:
-        size = path.stat().st_size
-    except OSError:
-        return []
-    if size < state.offset:
-        state.offset = 0
+    """Read the lines appended since *state.offset* and return parsed performance records.
+
+    A [TIME_STATS] / tree block still open at the end of the new data is not emitted: unless
+    *final* is set, *state.offset* is rewound to the start of that block so the next poll parses
+    it whole.
+    """
     records: List[Dict[str, Any]] = []
-    try:
-        with open(path, "r", encoding="utf-8", errors="replace") as f:
-            f.seek(state.offset)
-            chunk = f.read()
-            state.offset = f.tell()
-    except OSError:
-        return []
-    
+    # 先处理轮转 / 截断，下面的回退点才指向当前文件
+    if not sync_state(path, state):
+        return records
     in_stats_block = False
     in_tree_block = None  # None, "batch", or "step"
     tree_lines: List[str] = []
     current_record = {}
-    last_dt_value: Optional[float] = None
-
-    for raw_line in chunk.splitlines():
+    last_dt_value: Optional[float] = state.context.get("last_dt_s")
+    # 最近一个没有未完成块的位置：(行首偏移, 已产出的记录数, 当时的 dt)
+    line_start = state.offset
+    committed = (line_start, 0, last_dt_value)
+
+    for raw_line in iter_new_lines(path, state, final=final, sync=False):
+        if not (in_stats_block or in_tree_block or current_record):
+            committed = (line_start, len(records), last_dt_value)
+        line_start = state.offset
         line = raw_line.strip()
 
+        # Python 侧追加的行可能插在 OrcaSPH 的多行块中间，单独成记录且不打断当前块
+        if MUJOCO_STAT_MARKER in line:
+            mujoco_stats = parse_mujoco_stats_line(line)
+            if mujoco_stats:
+                records.append({"_mujoco": mujoco_stats, "_tree_mujoco": mujoco_stats_to_tree(mujoco_stats)})
+            continue
+
         if "[EachtimeStepInH2D]" in line and "dt_s=" in line:
             try:
                 dt_part = line.split("dt_s=")[1]
@@ -330,7 +376,13 @@ def read_new_performance_records(
                     records.append(current_record)
                 in_stats_block = False
                 current_record = {}
-    
+
+    if not final and (in_stats_block or in_tree_block or current_record):
+        # 块可能还没写完，留到下次读取时完整解析
+        state.offset, kept, state.context["last_dt_s"] = committed
+        del records[kept:]
+        return records
+
     if in_tree_block and tree_lines:
         tree_node = parse_tree_stats_block(tree_lines)
         if tree_node:
@@ -343,55 +395,265 @@ def read_new_performance_records(
             if last_dt_value is not None:
                 current_record["_dt_s"] = last_dt_value
             records.append(current_record)
-    
+
     if in_stats_block and current_record:
         if last_dt_value is not None:
             current_record["_dt_s"] = last_dt_value
         records.append(current_record)
-    
+
+    state.context["last_dt_s"] = last_dt_value
     return records
 
 
+def record_fingerprint(record: Dict[str, Any]) -> int:
+    """Order-independent hash of the scalar fields of a record (timing trees are ignored)."""
+    return hash(frozenset(
+        (k, v) for k, v in record.items() if isinstance(v, (int, float, str))
+    ))
+
+
 def merge_dedupe(accumulator: List[Dict[str, Any]], new_records: List[Dict[str, Any]]) -> None:
     """Append *new_records* to *accumulator*, dropping duplicates."""
+    seen = {record_fingerprint(r) for r in accumulator}
     for r in new_records:
-        # Check if this record is already in the accumulator
-        duplicate = False
-        for existing in accumulator:
-            if existing == r:
-                duplicate = True
-                break
-        if not duplicate:
+        fingerprint = record_fingerprint(r)
+        if fingerprint not in seen:
+            seen.add(fingerprint)
             accumulator.append(r)
 
 
 def compute_average_times(records: List[Dict[str, Any]]) -> Dict[str, float]:
     """Compute average times for each component."""
-    if not records:
-        return {}
-    
-    # Get all unique keys
-    keys = set()
-    for record in records:
-        keys.update(record.keys())
-    
-    # Compute averages
-    averages = {}
-    for key in keys:
-        values = []
-        for record in records:
-            if key in record:
-                values.append(float(record[key]))
-        if values:
-            averages[key] = sum(values) / len(values)
-    
-    return averages
+    store = PerformanceRecordStore()
+    store.extend(records)
+    return store.averages()
+
+
+class PerformanceRecordStore:
+    """
+    Columnar store of flat timing records.
+
+    One float64 column per timing key (NaN where a record lacks the key), a set of record
+    fingerprints for O(1) dedupe, and running sums / counts for the all-time averages and,
+    when *window* is given, for the averages of the last *window* records. Adding a record
+    costs O(keys of the record) regardless of how many records are stored.
+
+    With *window* the columns are a fixed ring of *window* rows and only the fingerprints of
+    the records still in the window are kept, so memory stays bounded and a record is only
+    dropped as a duplicate of one of the last *window* records. Without it every record is kept.
+
+    Keys starting with ``_`` (trees, meta, dt) and non-numeric values take part in the
+    fingerprint only.
+    """
+
+    def __init__(self, window: Optional[int] = None, initial_capacity: int = 1024):
+        self._window = window if window and window > 0 else None
+        self._capacity = self._window if self._window is not None else max(1, initial_capacity)
+        self._rows = 0  # 累计写入的记录数
+        self._columns: Dict[str, np.ndarray] = {}
+        self._fingerprints: set = set()
+        self._sums: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._window_sums: Dict[str, float] = {}
+        self._window_counts: Dict[str, int] = {}
+        # 窗口内每行的 (指纹, [(key, value)])，移出窗口时扣除累加和、清空 ring 中的行并释放指纹
+        self._window_rows: Deque[Tuple[int, List[Tuple[str, float]]]] = deque()
+
+    def __len__(self) -> int:
+        """Number of records currently stored (at most *window*)."""
+        return min(self._rows, self._capacity) if self._window is not None else self._rows
+
+    @property
+    def window(self) -> Optional[int]:
+        return self._window
+
+    def keys(self) -> List[str]:
+        return list(self._columns)
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """Append one record. Returns False (and stores nothing) if it duplicates a stored record."""
+        fingerprint = record_fingerprint(record)
+        if fingerprint in self._fingerprints:
+            return False
+        self._fingerprints.add(fingerprint)
+
+        if self._window is not None:
+            row = self._rows % self._capacity
+            if len(self._window_rows) == self._window:
+                self._evict_oldest(row)
+        else:
+            if self._rows == self._capacity:
+                self._grow()
+            row = self._rows
+
+        items: List[Tuple[str, float]] = []
+        for k, v in record.items():
+            if k.startswith("_") or isinstance(v, bool) or not isinstance(v, (int, float)):
+                continue
+            column = self._columns.get(k)
+            if column is None:
+                column = np.full(self._capacity, np.nan)
+                self._columns[k] = column
+                self._sums[k] = 0.0
+                self._counts[k] = 0
+                self._window_sums[k] = 0.0
+                self._window_counts[k] = 0
+            v = float(v)
+            column[row] = v
+            self._sums[k] += v
+            self._counts[k] += 1
+            self._window_sums[k] += v
+            self._window_counts[k] += 1
+            items.append((k, v))
+        self._rows += 1
+
+        if self._window is not None:
+            self._window_rows.append((fingerprint, items))
+        return True
+
+    def extend(self, records: List[Dict[str, Any]]) -> int:
+        """Append records, skipping duplicates. Returns the number of records stored."""
+        return sum(1 for r in records if self.add(r))
+
+    def _evict_oldest(self, row: int) -> None:
+        fingerprint, items = self._window_rows.popleft()
+        self._fingerprints.discard(fingerprint)
+        for k, v in items:
+            self._window_sums[k] -= v
+            self._window_counts[k] -= 1
+            self._columns[k][row] = np.nan
+
+    def _grow(self) -> None:
+        new_capacity = self._capacity * 2
+        for k, column in self._columns.items():
+            grown = np.full(new_capacity, np.nan)
+            grown[:self._capacity] = column
+            self._columns[k] = grown
+        self._capacity = new_capacity
+
+    def column(self, key: str, last: Optional[int] = None) -> np.ndarray:
+        """Values of *key* per stored record, oldest first (NaN where missing), optionally only the last *last*."""
+        n = len(self)
+        if last:
+            n = min(n, last)
+        column = self._columns.get(key)
+        if column is None:
+            return np.full(n, np.nan)
+        if self._window is None:
+            return column[self._rows - n:self._rows]
+        return column[np.arange(self._rows - n, self._rows) % self._capacity]
+
+    def averages(self) -> Dict[str, float]:
+        """Per-key average over every record added (including those that left the window)."""
+        return {k: self._sums[k] / n for k, n in self._counts.items() if n > 0}
+
+    def window_averages(self) -> Dict[str, float]:
+        """Per-key average over the last *window* records (all records when no window is set)."""
+        if self._window is None:
+            return self.averages()
+        return {k: self._window_sums[k] / n for k, n in self._window_counts.items() if n > 0}
+
+
+TREE_AGGREGATE_MODES = ("window", "cumulative", "ema")
+
+
+class TimingTreeAggregate:
+    """
+    Running average of timing trees, folded in one tree at a time.
+
+    Values (time_ms, pct, self_ms, self_pct) are aggregated per node path (root name ... node name):
+    - cumulative: mean over every tree added
+    - window: mean over the last *window* trees (their contributions are subtracted on eviction)
+    - ema: exponentially decayed mean, ``avg += alpha * (value - avg)``
+
+    add() costs O(tree size) and build() O(number of paths), so a refresh no longer rescans the
+    stored trees; memory is bounded by the distinct paths (plus *window* flattened trees).
+    Children keep the order in which their names were first seen.
+    """
+
+    def __init__(self, mode: str = "window", window: int = 10, alpha: float = 0.1):
+        if mode not in TREE_AGGREGATE_MODES:
+            raise ValueError(f"Unsupported tree aggregate mode: {mode}, supported: {TREE_AGGREGATE_MODES}")
+        self.mode = mode
+        self.window = max(1, int(window))
+        self.alpha = float(alpha)
+        self._trees = 0
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._counts: Dict[Tuple[str, ...], int] = {}
+        self._children: Dict[Tuple[str, ...], Dict[str, None]] = {}
+        self._roots: Dict[str, None] = {}
+        self._recent: Deque[List[Tuple[Tuple[str, ...], Tuple[float, float, float, float]]]] = deque()
+
+    def __len__(self) -> int:
+        """Number of trees the current aggregate covers."""
+        return min(self._trees, self.window) if self.mode == "window" else self._trees
+
+    def add(self, tree: TimingTreeNode) -> None:
+        samples: List[Tuple[Tuple[str, ...], Tuple[float, float, float, float]]] = []
+        self._roots.setdefault(tree.name, None)
+        stack = [((tree.name,), tree)]
+        while stack:
+            path, node = stack.pop()
+            samples.append((path, (node.time_ms, node.pct, node.self_time_ms, node.self_pct)))
+            children = self._children.setdefault(path, {})
+            for child in node.children:
+                children.setdefault(child.name, None)
+            for child in reversed(node.children):
+                stack.append((path + (child.name,), child))
+
+        for path, sample in samples:
+            values = self._values.get(path)
+            if values is None:
+                self._values[path] = list(sample)
+                self._counts[path] = 1
+                continue
+            if self.mode == "ema":
+                for i in range(4):
+                    values[i] += self.alpha * (sample[i] - values[i])
+            else:
+                for i in range(4):
+                    values[i] += sample[i]
+            self._counts[path] += 1
+        self._trees += 1
+
+        if self.mode == "window":
+            self._recent.append(samples)
+            if len(self._recent) > self.window:
+                for path, sample in self._recent.popleft():
+                    values = self._values[path]
+                    for i in range(4):
+                        values[i] -= sample[i]
+                    self._counts[path] -= 1
+
+    def _average(self, path: Tuple[str, ...]) -> Optional[Tuple[float, ...]]:
+        count = self._counts.get(path, 0)
+        if count <= 0:
+            return None
+        values = self._values[path]
+        if self.mode == "ema":
+            return tuple(values)
+        return tuple(v / count for v in values)
+
+    def build(self) -> Optional[TimingTreeNode]:
+        """Averaged tree under the first root that still has samples, or None."""
+        for root_name in self._roots:
+            root = self._build_node((root_name,))
+            if root is not None:
+                return root
+        return None
+
+    def _build_node(self, path: Tuple[str, ...]) -> Optional[TimingTreeNode]:
+        avg = self._average(path)
+        if avg is None:
+            return None
+        node = TimingTreeNode(name=path[-1], time_ms=avg[0], pct=avg[1], self_time_ms=avg[2], self_pct=avg[3])
+        for child_name in self._children.get(path, ()):
+            child = self._build_node(path + (child_name,))
+            if child is not None:
+                node.children.append(child)
+        return node
 
 
 def load_all_performance_records_from_file(path: Path) -> List[Dict[str, Any]]:
     """Parse every performance stats line in *path* from the beginning."""
-    if not path.exists():
-        return []
-    
-    state = TailState(path, offset=0)
-    return read_new_performance_records(path, state)
\ No newline at end of file
+    return read_new_performance_records(path, TailState(path), final=True)
\ No newline at end of file
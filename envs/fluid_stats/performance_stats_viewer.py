@@ -6,6 +6,7 @@ Visualization modes:
 1. Nested bar chart: parent bars contain child segments, showing hierarchy
 2. Stacked area time series: SimStep sub-steps stacked over time
 3. Category bar chart: fallback for flat [TIME_STATS] data
+4. MuJoCo main-loop phases ([MUJOCO_TIME_STATS] from run_fluid_sim) next to the OrcaSPH trees
 
 Usage:
     # Real-time (live tail):
@@ -28,11 +29,12 @@ import matplotlib.patches as mpatches
 import numpy as np
 
 from performance_stats_parser import (
+    PerformanceRecordStore,
+    TREE_AGGREGATE_MODES,
     TailState,
+    TimingTreeAggregate,
     TimingTreeNode,
-    compute_average_times,
     load_all_performance_records_from_file,
-    merge_dedupe,
     read_new_performance_records,
 )
 
@@ -476,50 +478,24 @@ def _merge_trees(trees: List[TimingTreeNode]) -> Optional[TimingTreeNode]:
         return None
     if len(trees) == 1:
         return trees[0]
-
-    def _collect_values(node: TimingTreeNode, path: str, out: Dict[str, List[float]]):
-        key = f"{path}/{node.name}"
-        out.setdefault(f"{key}/time_ms", []).append(node.time_ms)
-        out.setdefault(f"{key}/pct", []).append(node.pct)
-        out.setdefault(f"{key}/self_ms", []).append(node.self_time_ms)
-        out.setdefault(f"{key}/self_pct", []).append(node.self_pct)
-        for child in node.children:
-            _collect_values(child, key, out)
-
-    def _build_avg(tree_template: TimingTreeNode, path: str, avg: Dict[str, float]) -> TimingTreeNode:
-        key = f"{path}/{tree_template.name}"
-        node = TimingTreeNode(
-            name=tree_template.name,
-            time_ms=avg.get(f"{key}/time_ms", 0.0),
-            pct=avg.get(f"{key}/pct", 0.0),
-            self_time_ms=avg.get(f"{key}/self_ms", 0.0),
-            self_pct=avg.get(f"{key}/self_pct", 0.0),
-        )
-        seen = set()
-        for child in tree_template.children:
-            if child.name not in seen:
-                seen.add(child.name)
-                node.children.append(_build_avg(child, key, avg))
-        return node
-
-    all_values: Dict[str, List[float]] = {}
+    aggregate = TimingTreeAggregate(mode="cumulative")
     for tree in trees:
-        _collect_values(tree, "", all_values)
-
-    avg: Dict[str, float] = {}
-    for k, vals in all_values.items():
-        avg[k] = sum(vals) / len(vals)
-
-    return _build_avg(trees[0], "", avg)
+        aggregate.add(tree)
+    return aggregate.build()
 
 
 def _extract_trees_and_flats(records: List[Dict[str, Any]]):
     batch_tree_records: List[TimingTreeNode] = []
     step_tree_records: List[TimingTreeNode] = []
+    mujoco_tree_records: List[TimingTreeNode] = []
     flat_records: List[Dict[str, Any]] = []
     cumulative_dt_stats: Dict[float, int] = defaultdict(int)
 
     for record in records:
+        if "_tree_mujoco" in record:
+            mujoco_tree_records.append(record["_tree_mujoco"])
+            continue
+
         cleaned = {k: v for k, v in record.items() if not k.startswith("_")}
         flat_records.append(cleaned)
 
@@ -532,7 +508,18 @@ def _extract_trees_and_flats(records: List[Dict[str, Any]]):
         if "_tree_step" in record and isinstance(record["_tree_step"], TimingTreeNode):
             step_tree_records.append(record["_tree_step"])
 
-    return batch_tree_records, step_tree_records, flat_records, cumulative_dt_stats
+    return batch_tree_records, step_tree_records, mujoco_tree_records, flat_records, cumulative_dt_stats
+
+
+def _format_mujoco_info(mujoco_records: List[Dict[str, Any]]) -> str:
+    """Loop rate / overrun summary of the latest [MUJOCO_TIME_STATS] record."""
+    if not mujoco_records:
+        return ""
+    last = mujoco_records[-1]
+    return (
+        f" | {last.get('fps', 0.0):.1f} fps, period {last.get('period_ms', 0.0):.1f}ms"
+        f", overruns {int(last.get('overruns', 0))}, skipped {int(last.get('skipped_ticks', 0))}"
+    )
 
 
 def _format_dt_info(cumulative_dt_stats: Dict[float, int]) -> str:
@@ -553,8 +540,9 @@ def run_offline(log_file: Path, output_dir: Path) -> None:
         print(f"No performance stats found in {log_file}")
         return
 
-    batch_tree_records, step_tree_records, flat_records, cumulative_dt_stats = _extract_trees_and_flats(records)
+    batch_tree_records, step_tree_records, mujoco_tree_records, flat_records, cumulative_dt_stats = _extract_trees_and_flats(records)
     dt_info = _format_dt_info(cumulative_dt_stats)
+    mujoco_info = _format_mujoco_info([r["_mujoco"] for r in records if "_mujoco" in r])
 
     meta_info = ""
     for r in records:
@@ -592,9 +580,26 @@ def run_offline(log_file: Path, output_dir: Path) -> None:
             plt.close(fig)
             print(f"Step hierarchy chart saved to {hierarchy_path}")
 
-    if flat_records:
-        averages = compute_average_times(flat_records)
+    if mujoco_tree_records:
+        merged_tree = _merge_trees(mujoco_tree_records)
+        if merged_tree:
+            fig, ax = plt.subplots(figsize=(16, 6))
+            plot_nested_bar_chart(
+                ax,
+                merged_tree,
+                title=f"MuJoCo Main Loop (avg of {len(mujoco_tree_records)} intervals){mujoco_info}",
+            )
+            fig.subplots_adjust(left=0.35, bottom=0.08, top=0.92, right=0.95)
+            hierarchy_path = output_dir / "time_stats_mujoco_hierarchy.png"
+            fig.savefig(hierarchy_path, dpi=150)
+            plt.close(fig)
+            print(f"MuJoCo main loop chart saved to {hierarchy_path}")
 
+    store = PerformanceRecordStore()
+    store.extend(flat_records)
+    averages = store.averages()
+
+    if flat_records:
         fig, ax = plt.subplots(figsize=(14, 8))
         plot_bar_chart(
             ax,
@@ -611,27 +616,39 @@ def run_offline(log_file: Path, output_dir: Path) -> None:
         print(f"Bar chart saved to {bar_path}")
 
     print(f"\nAverage times (ms):")
-    averages = compute_average_times(flat_records) if flat_records else {}
     for key, value in sorted(averages.items(), key=lambda x: x[1], reverse=True):
         print(f"  {key}: {value:.3f}")
 
 
-def run_realtime(log_file: Path, interval: float, rolling: int) -> None:
+def _aggregate_label(aggregate: TimingTreeAggregate) -> str:
+    if aggregate.mode == "ema":
+        return f"ema a={aggregate.alpha:g} of {len(aggregate)}"
+    return f"avg of {len(aggregate)}"
+
+
+def run_realtime(log_file: Path, interval: float, rolling: int,
+                 tree_average: str = "window", ema_alpha: float = 0.1) -> None:
     state = TailState(log_file)
-    all_records: List[Dict[str, Any]] = []
-    batch_tree_records: List[TimingTreeNode] = []
-    step_tree_records: List[TimingTreeNode] = []
+    # 扁平记录：按列存储、哈希去重，窗口均值增量维护
+    store = PerformanceRecordStore(window=rolling)
+    # 新到的树直接折叠进按路径累加的聚合树，刷新只需 O(树大小)
+    batch_trees = TimingTreeAggregate(tree_average, window=rolling, alpha=ema_alpha)
+    step_trees = TimingTreeAggregate(tree_average, window=rolling, alpha=ema_alpha)
+    mujoco_trees = TimingTreeAggregate(tree_average, window=rolling, alpha=ema_alpha)
+    last_mujoco_record: Optional[Dict[str, Any]] = None
     cumulative_dt_stats: Dict[float, int] = defaultdict(int)
 
     plt.ion()
-    fig = plt.figure(figsize=(18, 10))
+    fig = plt.figure(figsize=(24, 10))
     fig.canvas.manager.set_window_title("OrcaSPH Performance Stats")
 
-    ax_batch = fig.add_subplot(121)
-    ax_step = fig.add_subplot(122)
+    ax_batch = fig.add_subplot(131)
+    ax_step = fig.add_subplot(132)
+    ax_mujoco = fig.add_subplot(133)
 
     ax_batch.set_title("Batch Hierarchy (waiting...)")
     ax_step.set_title("Step Hierarchy (waiting...)")
+    ax_mujoco.set_title("MuJoCo Main Loop (waiting...)")
     fig.canvas.draw()
     fig.canvas.flush_events()
 
@@ -642,6 +659,11 @@ def run_realtime(log_file: Path, interval: float, rolling: int) -> None:
             if new_records:
                 cleaned_new_records = []
                 for record in new_records:
+                    if "_tree_mujoco" in record:
+                        mujoco_trees.add(record["_tree_mujoco"])
+                        last_mujoco_record = record["_mujoco"]
+                        continue
+
                     cleaned = {k: v for k, v in record.items() if k != "_dt_s" and k != "_tree_batch" and k != "_tree_step"}
                     cleaned_new_records.append(cleaned)
 
@@ -649,22 +671,17 @@ def run_realtime(log_file: Path, interval: float, rolling: int) -> None:
                         cumulative_dt_stats[record["_dt_s"]] += 1
 
                     if "_tree_batch" in record and isinstance(record["_tree_batch"], TimingTreeNode):
-                        batch_tree_records.append(record["_tree_batch"])
+                        batch_trees.add(record["_tree_batch"])
 
                     if "_tree_step" in record and isinstance(record["_tree_step"], TimingTreeNode):
-                        step_tree_records.append(record["_tree_step"])
+                        step_trees.add(record["_tree_step"])
 
-                merge_dedupe(all_records, cleaned_new_records)
+                store.extend(cleaned_new_records)
 
-                if len(all_records) > rolling:
-                    all_records = all_records[-rolling:]
-                if len(batch_tree_records) > rolling:
-                    batch_tree_records = batch_tree_records[-rolling:]
-                if len(step_tree_records) > rolling:
-                    step_tree_records = step_tree_records[-rolling:]
 
                 ax_batch.clear()
                 ax_step.clear()
+                ax_mujoco.clear()
 
                 dt_info = _format_dt_info(cumulative_dt_stats)
                 meta_info = ""
@@ -673,29 +690,51 @@ def run_realtime(log_file: Path, interval: float, rolling: int) -> None:
                         meta_info = f" | avg {r['_meta_numSteps_avg']:.1f} steps/batch"
                         break
 
-                if batch_tree_records:
-                    merged_tree = _merge_trees(batch_tree_records)
+                if len(batch_trees):
+                    merged_tree = batch_trees.build()
                     if merged_tree:
                         plot_nested_bar_chart(
                             ax_batch,
                             merged_tree,
-                            title=f"Batch (avg of {len(batch_tree_records)}){dt_info}{meta_info}",
+                            title=f"Batch ({_aggregate_label(batch_trees)}){dt_info}{meta_info}",
                         )
+                elif len(store):
+                    # 旧版扁平 [TIME_STATS] 日志没有树，退回分类柱状图
+                    plot_bar_chart(
+                        ax_batch,
+                        store.window_averages(),
+                        title=f"Average (last {len(store)}){dt_info}",
+                        xlabel="Components",
+                        ylabel="Time (ms)",
+                        group_by_category=True,
+                    )
                 else:
                     ax_batch.set_title(f"Batch (no data){dt_info}")
 
-                if step_tree_records:
-                    merged_tree = _merge_trees(step_tree_records)
+                if len(step_trees):
+                    merged_tree = step_trees.build()
                     if merged_tree:
                         plot_nested_bar_chart(
                             ax_step,
                             merged_tree,
-                            title=f"Step (avg of {len(step_tree_records)}){dt_info}",
+                            title=f"Step ({_aggregate_label(step_trees)}){dt_info}",
                         )
                 else:
                     ax_step.set_title(f"Step (no data){dt_info}")
 
-                fig.subplots_adjust(left=0.15, bottom=0.06, top=0.95, right=0.95, wspace=0.30)
+                mujoco_info = _format_mujoco_info([last_mujoco_record] if last_mujoco_record else [])
+                if len(mujoco_trees):
+                    merged_tree = mujoco_trees.build()
+                    if merged_tree:
+                        plot_nested_bar_chart(
+                            ax_mujoco,
+                            merged_tree,
+                            title=f"MuJoCo ({_aggregate_label(mujoco_trees)}){mujoco_info}",
+                        )
+                else:
+                    ax_mujoco.set_title("MuJoCo Main Loop (no data)")
+
+                fig.subplots_adjust(left=0.10, bottom=0.06, top=0.95, right=0.97, wspace=0.45)
                 fig.canvas.draw_idle()
 
             fig.canvas.flush_events()
@@ -717,12 +756,15 @@ def main():
     parser.add_argument("--output-dir", type=Path, default=Path("."), help="Output directory for --save PNGs (default: current dir)")
     parser.add_argument("--interval", type=float, default=1.0, help="Real-time update interval in seconds")
     parser.add_argument("--rolling", type=int, default=10, help="Maximum number of data points for rolling average")
+    parser.add_argument("--tree-average", choices=TREE_AGGREGATE_MODES, default="window",
+                        help="Real-time tree averaging: last --rolling trees, all trees, or exponential decay")
+    parser.add_argument("--ema-alpha", type=float, default=0.1, help="Decay factor for --tree-average ema")
     args = parser.parse_args()
 
     if args.save:
         run_offline(args.log_file, args.output_dir)
     else:
-        run_realtime(args.log_file, args.interval, args.rolling)
+        run_realtime(args.log_file, args.interval, args.rolling, args.tree_average, args.ema_alpha)
 
 
 if __name__ == "__main__":
@@ -14,6 +14,9 @@ LeggedEnvConfig = {
     "EPISODE_TIME_SHORT" : 5,           
     "EPISODE_TIME_LONG" : 20,
 
+    "batch_obs" : False,                 # 所有 agent 的观测一次性批量计算（可选，默认仍逐个 agent 计算）
+    "batch_reward" : False,              # 奖励项按 (agent, term) 矩阵批量计算，需要开启 batch_obs
+
 
     "phy_low" : {
         "iterations" : 10,
@@ -0,0 +1,89 @@
+import numpy as np
+from collections import defaultdict
+
+
+class LeggedContactMap:
+    """
+    Array based contact index for LeggedGymEnv.
+
+    The geom id -> body id table is built once from the model, each step's contact list
+    is turned into a body pair array and a per-body contact flag with NumPy,
+    so the base / leg / foot contact of all agents is a gather over the body ids.
+    Body names that own no geom are mapped to a null body that is never in contact.
+    """
+    def __init__(self, geom_body_names: list[str]):
+        self._body_names = list(dict.fromkeys(geom_body_names))
+        self._body_name2id = {body_name: i for i, body_name in enumerate(self._body_names)}
+        self._geom_body_id = np.array([self._body_name2id[body_name] for body_name in geom_body_names], dtype=np.int32)
+        self._null_body_id = len(self._body_names)
+
+        self._body_in_contact = np.zeros(self._null_body_id + 1, dtype=bool)
+        # 接触对，两个方向都保存，body1 -> body2
+        self._contact_body1 = np.zeros(0, dtype=np.int32)
+        self._contact_body2 = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def from_model(cls, model) -> "LeggedContactMap":
+        geom_dict = model.get_geom_dict()
+        geom_body_names = [None] * len(geom_dict)
+        for geom in geom_dict.values():
+            geom_body_names[geom["GeomId"]] = geom["BodyName"]
+        return cls(geom_body_names)
+
+    @property
+    def body_num(self) -> int:
+        return self._null_body_id
+
+    def body_ids(self, body_names: list[str]) -> np.ndarray:
+        return np.array([self._body_name2id.get(body_name, self._null_body_id) for body_name in body_names], dtype=np.int32)
+
+    def body_groups(self, body_ids: np.ndarray) -> np.ndarray:
+        """
+        Body id -> group index lookup for get_group_contact, each row of body_ids (group_num, len) is one group.
+        Bodies out of the groups get -1.
+        """
+        groups = np.full(self._null_body_id + 1, -1, dtype=np.int32)
+        for group_index, group_body_ids in enumerate(np.atleast_2d(body_ids)):
+            groups[group_body_ids] = group_index
+        groups[self._null_body_id] = -1
+        return groups
+
+    def update(self, contacts: list[dict]) -> None:
+        """
+        Rebuild the contact pairs from query_contact_simple().
+        """
+        contact_num = len(contacts)
+        geom1 = np.fromiter((contact["Geom1"] for contact in contacts), dtype=np.int32, count=contact_num)
+        geom2 = np.fromiter((contact["Geom2"] for contact in contacts), dtype=np.int32, count=contact_num)
+        body1 = self._geom_body_id[geom1]
+        body2 = self._geom_body_id[geom2]
+        self._contact_body1 = np.concatenate([body1, body2])
+        self._contact_body2 = np.concatenate([body2, body1])
+
+        self._body_in_contact[:] = False
+        self._body_in_contact[self._contact_body1] = True
+
+    def get_contact(self, body_ids: np.ndarray) -> np.ndarray:
+        """
+        Whether each body is in contact with any other body, same shape as body_ids.
+        """
+        return self._body_in_contact[body_ids]
+
+    def get_group_contact(self, body_ids: np.ndarray, body_groups: np.ndarray) -> np.ndarray:
+        """
+        Whether each body is in contact with a body of the same group (see body_groups), same shape as body_ids.
+        """
+        group1 = body_groups[self._contact_body1]
+        in_group = (group1 >= 0) & (group1 == body_groups[self._contact_body2])
+        group_contact = np.zeros(self._null_body_id + 1, dtype=bool)
+        group_contact[self._contact_body1[in_group]] = True
+        return group_contact[body_ids]
+
+    def to_dict(self) -> dict[str, set[str]]:
+        """
+        The contact dict {body_name: set(contact_body_names)} used by LeggedRobot.get_obs.
+        """
+        contact_dict: dict[str, set[str]] = defaultdict(set)
+        for body1, body2 in zip(self._contact_body1.tolist(), self._contact_body2.tolist()):
+            contact_dict[self._body_names[body1]].add(self._body_names[body2])
+        return contact_dict
@@ -3,9 +3,11 @@ from orca_gym.environment.async_env import OrcaGymAsyncEnv
 from typing import SupportsFloat
 import gymnasium as gym
 import time
-from collections import defaultdict
 import requests
 from .legged_robot import LeggedRobot
+from .legged_obs_batch import LeggedObsBatch
+from .legged_reward_batch import LeggedRewardBatch
+from .legged_contact_map import LeggedContactMap
 import os
 import shutil
 
@@ -43,6 +45,13 @@ class LeggedGymEnv(OrcaGymAsyncEnv):
 
         self._run_mode = run_mode      
         self._height_map = np.zeros((2000, 2000))  # Set default height map before load from file, 200m x 200m 
+        # get_obs 在父类初始化时就会被调用，批量观测的开关需要在此之前设置
+        self._batch_obs = legged_env_config.get("batch_obs", False)
+        self._obs_batch : LeggedObsBatch = None
+        # 批量奖励依赖批量观测的状态
+        self._batch_reward = self._batch_obs and legged_env_config.get("batch_reward", False)
+        self._reward_batch : LeggedRewardBatch = None
+        self._contact_map : LeggedContactMap = None
         
         super().__init__(
             frame_skip = frame_skip,
@@ -122,7 +131,7 @@ class LeggedGymEnv(OrcaGymAsyncEnv):
 
         sensor_data = self._query_sensor_data()
         # get_obs_sensor = (datetime.datetime.now() - get_obs_start).total_seconds() * 1000
-        contact_dict = self._generate_contact_dict()
+        contact_map = self._update_contact_map()
         # get_obs_contact = (datetime.datetime.now() - get_obs_start).total_seconds() * 1000
         site_pos_quat = self._query_site_pos_and_quat()
         # get_obs_site = (datetime.datetime.now() - get_obs_start).total_seconds() * 1000
@@ -135,12 +144,20 @@ class LeggedGymEnv(OrcaGymAsyncEnv):
         agent_obs : list[dict[str, np.ndarray]] = []
         achieved_goals = []
         desired_goals = []
-        for agent in self.agents:
-            obs = agent.get_obs(sensor_data, self.data.qpos, self.data.qvel, self.data.qacc, contact_dict, site_pos_quat, self._height_map)
-            achieved_goals.append(obs["achieved_goal"])
-            desired_goals.append(obs["desired_goal"])
-            env_obs_list.append(obs["observation"])
-            agent_obs.append(obs)
+        if self._batch_obs:
+            obs_batch = self._get_obs_batch()
+            env_obs_list, achieved_goals, desired_goals = obs_batch.get_obs(sensor_data, self.data.qpos, self.data.qvel, self.data.qacc, contact_map, site_pos_quat, self._height_map)
+            agent_obs = [{"observation": env_obs_list[i], "achieved_goal": achieved_goals[i], "desired_goal": desired_goals[i]} for i in range(len(self.agents))]
+            if self._reward_batch is not None:
+                self._reward_batch.compute()
+        else:
+            contact_dict = contact_map.to_dict()
+            for agent in self.agents:
+                obs = agent.get_obs(sensor_data, self.data.qpos, self.data.qvel, self.data.qacc, contact_dict, site_pos_quat, self._height_map)
+                achieved_goals.append(obs["achieved_goal"])
+                desired_goals.append(obs["desired_goal"])
+                env_obs_list.append(obs["observation"])
+                agent_obs.append(obs)
 
         if self._run_mode == "nav":
             infofeedback = self.gym.query_body_xpos_xmat_xquat([self.body("base")])
@@ -216,15 +233,36 @@ class LeggedGymEnv(OrcaGymAsyncEnv):
         self._reset_agent_joint_qpos(agents)
         self._reset_command_indicators(agents)
 
-    def _generate_contact_dict(self) -> dict[str, set[str]]:
-        contacts = self.query_contact_simple()
+        if self._obs_batch is not None and self._obs_batch.agents is self.agents:
+            self._obs_batch.on_agents_reset(agents)
+            if self._reward_batch is not None:
+                self._reward_batch.on_agents_reset(agents)
+
+    def get_reward_terms(self) -> dict[str, np.ndarray]:
+        """
+        Per-term reward of the last step, {term_name: np.ndarray(agent_num)}. Only available with batch_reward.
+        """
+        if self._reward_batch is None:
+            return {}
+        return self._reward_batch.get_reward_terms()
+
+    def _get_obs_batch(self) -> LeggedObsBatch:
+        # agents 在父类初始化的最后会重新排序，列表变化时重建批量观测的索引
+        if self._obs_batch is None or self._obs_batch.agents is not self.agents:
+            self._obs_batch = LeggedObsBatch(self.agents, self._contact_map)
+            if self._batch_reward:
+                self._reward_batch = LeggedRewardBatch(self._obs_batch)
+        return self._obs_batch
+
+    def _update_contact_map(self) -> LeggedContactMap:
+        # geom -> body 的映射只在第一次查询时建立
+        if self._contact_map is None:
+            self._contact_map = LeggedContactMap.from_model(self.model)
+        self._contact_map.update(self.query_contact_simple())
+        return self._contact_map
 
-        contact_dict: dict[str, set[str]] = defaultdict(set)
-        for contact in contacts:
-            body_name1 = self.model.get_geom_body_name(contact["Geom1"])
-            body_name2 = self.model.get_geom_body_name(contact["Geom2"])
-            contact_dict[body_name1].add(body_name2)
-            contact_dict[body_name2].add(body_name1)
+    def _generate_contact_dict(self) -> dict[str, set[str]]:
+        contact_dict = self._update_contact_map().to_dict()
 
         # print("Contact dict: ", contact_dict)
 
@@ -357,9 +395,9 @@ class LeggedGymEnv(OrcaGymAsyncEnv):
                         except:
                             pass
                 
-                # 加载高度图文件
+                # 加载高度图文件，只读内存映射，同一节点上的所有子环境共享操作系统页缓存中的同一份数据
                 self._height_map = None
-                self._height_map = np.load(height_map_file_local_path)
+                self._height_map = self._load_height_map(height_map_file_local_path)
                 
             except Exception as e:
                 _logger.error(f"Load height map file failed:  {e}")
@@ -368,11 +406,21 @@ class LeggedGymEnv(OrcaGymAsyncEnv):
         else:
             raise ValueError("Height map file is not provided")
     
+    @staticmethod
+    def _load_height_map(file_path: str) -> np.ndarray:
+        """
+        Map the height map file read-only instead of reading it into a private copy.
+        Only the pages that are sampled are read from the disk.
+        """
+        height_map = np.load(file_path, mmap_mode="r")
+        # 去掉 np.memmap 子类，避免每次索引都经过 memmap 的封装，底层仍然是同一块映射内存
+        return height_map.view(np.ndarray)
+
     def _verify_file_integrity(self, file_path: str) -> bool:
         """验证文件完整性"""
         try:
-            # 尝试加载文件，如果损坏会抛出异常
-            test_data = np.load(file_path)
+            # 尝试映射文件，头部损坏或数据长度不足时会抛出异常，不需要读取全部数据
+            test_data = np.load(file_path, mmap_mode="r")
             # 检查数据是否为空或异常
             if test_data is None or test_data.size == 0:
                 return False
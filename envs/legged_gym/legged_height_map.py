@@ -0,0 +1,124 @@
+import numpy as np
+
+
+class HeightMapSampler:
+    """
+    Batched height map queries for the legged robots.
+
+    The height map is a 2D grid (x, y) of terrain heights with the given resolution (meter per cell),
+    the world position `origin` is at the center of the map.
+    All query points are given as one array (..., 2) / (..., 3), so the body and foot heights of all agents
+    are a few gather ops.
+
+    The body height is sampled at a fixed grid of offsets around the base,
+    and the terrain plane z = ax + by + c is fitted in closed form with the pseudo-inverse of the offset grid.
+    """
+    # 默认 16 个采样点的相对偏移（以机器人中心为原点，单位 m）
+    DEFAULT_BODY_HEIGHT_OFFSETS = (np.array([(-0.9, -0.9), (-0.3, -0.9), (0.3, -0.9), (0.9, -0.9),
+                                             (-0.9, -0.3), (-0.3, -0.3), (0.3, -0.3), (0.9, -0.3),
+                                             (-0.9, 0.3), (-0.3, 0.3), (0.3, 0.3), (0.9, 0.3),
+                                             (-0.9, 0.9), (-0.3, 0.9), (0.3, 0.9), (0.9, 0.9)]) * 0.1).tolist()
+
+    def __init__(self, sampler_config: dict = None):
+        sampler_config = {} if sampler_config is None else sampler_config
+        self._resolution = float(sampler_config.get("resolution", 0.1))
+        self._inv_resolution = 1.0 / self._resolution
+        self._origin = np.array(sampler_config.get("origin", [0.0, 0.0]), dtype=np.float64)
+        interpolation = sampler_config.get("interpolation", "nearest")
+        if interpolation not in ("nearest", "bilinear"):
+            raise ValueError(f"Unsupported height map interpolation: {interpolation}")
+        self._bilinear = interpolation == "bilinear"
+
+        self._body_height_offsets = np.array(sampler_config.get("body_height_offsets", self.DEFAULT_BODY_HEIGHT_OFFSETS), dtype=np.float64).reshape(-1, 2)
+
+        # 平面拟合的设计矩阵只与采样偏移有关，最小二乘解 [c, a, b] = pinv(X) @ h 预先求一次伪逆
+        plane_fit_X = np.column_stack([np.ones(len(self._body_height_offsets)), self._body_height_offsets])
+        self._plane_fit_pinv = np.linalg.pinv(plane_fit_X)
+
+    @property
+    def body_height_point_num(self) -> int:
+        return len(self._body_height_offsets)
+
+    @property
+    def body_height_offsets(self) -> np.ndarray:
+        return self._body_height_offsets
+
+    def sample(self, height_map: np.ndarray, points_xy: np.ndarray) -> np.ndarray:
+        """
+        Terrain height at the world points (..., 2), returns shape (...).
+        Points out of the map are clamped to the border.
+        """
+        shape = np.array(height_map.shape[:2])
+        grid = (np.asarray(points_xy)[..., :2] - self._origin) * self._inv_resolution + shape / 2
+        if not self._bilinear:
+            idx = np.clip(grid.astype(int), 0, shape - 1)
+            return height_map[idx[..., 0], idx[..., 1]]
+
+        # 每个格子的高度对应格子中心
+        grid = grid - 0.5
+        base = np.floor(grid)
+        t = grid - base
+        idx0 = np.clip(base.astype(int), 0, shape - 1)
+        idx1 = np.clip(idx0 + 1, 0, shape - 1)
+        h00 = height_map[idx0[..., 0], idx0[..., 1]]
+        h10 = height_map[idx1[..., 0], idx0[..., 1]]
+        h01 = height_map[idx0[..., 0], idx1[..., 1]]
+        h11 = height_map[idx1[..., 0], idx1[..., 1]]
+        tx = t[..., 0]
+        ty = t[..., 1]
+        return (h00 * (1 - tx) + h10 * tx) * (1 - ty) + (h01 * (1 - tx) + h11 * tx) * ty
+
+    def max_height_around(self, height_map: np.ndarray, point_xy: np.ndarray, radius: float = 0.5) -> float:
+        """
+        Highest terrain cell in the square of half size `radius` (m) around the world point (2,),
+        on the same grid as sample(). Used to lift the spawn height above obstacles.
+        """
+        shape = np.array(height_map.shape[:2])
+        center = np.clip(((np.asarray(point_xy)[:2] - self._origin) * self._inv_resolution + shape / 2).astype(int), 0, shape - 1)
+        half_cells = max(1, int(round(radius * self._inv_resolution)))
+        start = np.maximum(center - half_cells, 0)
+        end = np.minimum(center + half_cells, shape)
+        return float(height_map[start[0]:end[0], start[1]:end[1]].max())
+
+    def sample_height_above(self, height_map: np.ndarray, points: np.ndarray) -> np.ndarray:
+        """
+        Height of the world points (..., 3) above the terrain, returns shape (...).
+        """
+        points = np.asarray(points)
+        return points[..., 2] - self.sample(height_map, points[..., :2])
+
+    def sample_body_height(self, height_map: np.ndarray, body_pos: np.ndarray) -> np.ndarray:
+        """
+        Height of the bases (agent_num, 3) above the terrain at each sampling offset, returns (agent_num, point_num).
+        """
+        body_pos = np.atleast_2d(body_pos)
+        points_xy = body_pos[:, None, :2] + self._body_height_offsets
+        return body_pos[:, 2:3] - self.sample(height_map, points_xy)
+
+    def fit_plane(self, body_height: np.ndarray) -> np.ndarray:
+        """
+        Least squares plane z = ax + by + c over the sampling offsets, returns [c, a, b] of shape (agent_num, 3).
+        """
+        return np.atleast_2d(body_height) @ self._plane_fit_pinv.T
+
+    def fit_orientation(self, body_height: np.ndarray) -> np.ndarray:
+        """
+        Rotation quaternion (agent_num, 4) from the Z axis to the normal of the fitted plane.
+        """
+        c_a_b = self.fit_plane(body_height)
+        agent_num = len(c_a_b)
+        normal = np.stack([-c_a_b[:, 1], -c_a_b[:, 2], np.ones(agent_num)], axis=1)
+        normal_unit = normal / np.linalg.norm(normal, axis=1, keepdims=True)
+
+        # 平面法向量与Z轴的夹角，转换为绕水平轴的旋转四元数
+        cos_theta = np.clip(normal_unit[:, 2], -1, 1)
+        axis = np.stack([-normal_unit[:, 1], normal_unit[:, 0], np.zeros(agent_num)], axis=1)
+        axis_norm = np.linalg.norm(axis, axis=1, keepdims=True)
+        angle = np.arccos(cos_theta)
+        sin_half = np.sin(angle / 2)
+        quaternion = np.concatenate([np.cos(angle / 2)[:, None], axis / np.maximum(axis_norm, 1e-6) * sin_half[:, None]], axis=1)
+
+        identity_quat = np.array([1.0, 0.0, 0.0, 0.0])
+        no_rotation = (np.abs(cos_theta - 1) < 1e-6) | (axis_norm[:, 0] < 1e-6)
+        quaternion[no_rotation] = identity_quat
+        return quaternion
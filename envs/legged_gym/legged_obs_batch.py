@@ -0,0 +1,299 @@
+import numpy as np
+from orca_gym.utils import rotations
+
+from .legged_robot import LeggedRobot
+from .legged_contact_map import LeggedContactMap
+from .legged_utils import quat_to_euler
+
+
+class LeggedObsBatch:
+    """
+    Batched observation engine for LeggedGymEnv.
+
+    All agents' index sets (base / leg qpos, qvel, qacc), foot sites, sensors and
+    obs / noise scale vectors are stacked once, so one set of NumPy gather / compute
+    ops produces the (agent_num, obs_len) observation for every agent.
+    The results are the same as calling LeggedRobot.get_obs for each agent.
+
+    The per-agent state buffers that are updated in place (leg qpos / qvel / qacc, action,
+    foot air time, command values) are rebound as row views of the stacked buffers here,
+    so the agents and the batch share the same memory.
+    The derived per-step values are written back to the agents as row views,
+    the per-agent reward functions keep working unchanged.
+    """
+    def __init__(self, agents: list[LeggedRobot], contact_map: LeggedContactMap):
+        self._agents = agents
+        self._agent_num = len(agents)
+        self._agent_index = {id(agent): i for i, agent in enumerate(agents)}
+
+        agent_0 = agents[0]
+        for agent in agents:
+            assert len(agent._obs_scale_vec) == len(agent_0._obs_scale_vec), "All agents should have the same observation size"
+            assert len(agent._contact_site_names) == len(agent_0._contact_site_names), "All agents should have the same foot number"
+
+        self._dt = agent_0.dt
+        self._compute_body_height = agent_0._compute_body_height
+        self._compute_body_orientation = agent_0._compute_body_orientation
+        self._observe_body_height = agent_0._observe_body_height
+        self._compute_foot_height = agent_0._compute_foot_height
+        self._foot_touch_force_air_threshold = agent_0._foot_touch_force_air_threshold
+        self._foot_touch_force_step_threshold = agent_0._foot_touch_force_step_threshold
+
+        # Index arrays, shape (agent_num, len)
+        self._base_qpos_index = np.array([self._joint_range(agent._qpos_index[agent.base_joint_name]) for agent in agents])
+        self._base_qvel_index = np.array([self._joint_range(agent._qvel_index[agent.base_joint_name]) for agent in agents])
+        self._base_qacc_index = np.array([self._joint_range(agent._qacc_index[agent.base_joint_name]) for agent in agents])
+        self._leg_qacc_index = np.array([np.arange(agent._qacc_index["leg_start"], agent._qacc_index["leg_start"] + agent._qacc_index["leg_length"]) for agent in agents])
+
+        # Flattened name lists for the dict based queries (sensor / site)
+        self._foot_num = len(agent_0._contact_site_names)
+        self._contact_site_names = [name for agent in agents for name in agent._contact_site_names]
+        self._foot_touch_sensor_names = [name for agent in agents for name in agent._foot_touch_sensor_names]
+
+        # Contact body ids, base | leg | foot of each agent in one row, shape (agent_num, base_num + leg_num + foot_num)
+        self._contact_map = contact_map
+        self._base_contact_num = len(agent_0._base_contact_body_names)
+        self._leg_contact_num = len(agent_0._leg_contact_body_names)
+        self._contact_body_ids = np.array([contact_map.body_ids(agent._base_contact_body_names + agent._leg_contact_body_names + agent._foot_body_names)
+                                           for agent in agents])
+        self._foot_body_ids = self._contact_body_ids[:, self._base_contact_num + self._leg_contact_num:]
+        # 每个 agent 的脚属于同一组，用于判断脚与脚之间的接触
+        self._foot_body_groups = contact_map.body_groups(self._foot_body_ids)
+
+        # Scale vectors, shape (agent_num, obs_len)
+        self._obs_scale_vec = np.stack([agent._obs_scale_vec for agent in agents])
+        self._noise_scale_vec = np.stack([agent._noise_scale_vec for agent in agents])
+        self._neutral_joint_values = np.stack([agent._neutral_joint_values for agent in agents])
+
+        # Shared state buffers, the agents' arrays become row views of them
+        self._leg_joint_qpos = self._bind_buffer("_leg_joint_qpos")
+        self._leg_joint_qvel = self._bind_buffer("_leg_joint_qvel")
+        self._leg_joint_qacc = self._bind_buffer("_leg_joint_qacc")
+        self._last_leg_joint_qpos = self._bind_buffer("_last_leg_joint_qpos")
+        self._action = self._bind_buffer("_action")
+        self._last_action = self._bind_buffer("_last_action")
+        self._foot_touch_air_time = self._bind_buffer("_foot_touch_air_time")
+        self._foot_in_air_time = self._bind_buffer("_foot_in_air_time")
+        self._command_values = self._bind_buffer("_command_values")
+
+        # Last foot site pose for the slip / wringing velocity, invalid after reset
+        self._last_contact_site_xpos = np.zeros((self._agent_num, self._foot_num, 3))
+        self._last_contact_site_xquat = np.zeros((self._agent_num, self._foot_num, 4))
+        self._last_contact_site_valid = np.zeros(self._agent_num, dtype=bool)
+
+        # 高度图采样网格对所有 agent 相同
+        self._height_map_sampler = agent_0._height_map_sampler
+
+        self._desired_goal = np.zeros((self._agent_num, 1), dtype=np.float32)
+        self._state : dict[str, np.ndarray] = {}
+
+    @property
+    def agents(self) -> list[LeggedRobot]:
+        return self._agents
+
+    @property
+    def agent_num(self) -> int:
+        return self._agent_num
+
+    @property
+    def state(self) -> dict[str, np.ndarray]:
+        """
+        The stacked per-step values of the last get_obs call and the shared state buffers, shape (agent_num, ...).
+        """
+        return {
+            **self._state,
+            "leg_joint_qpos": self._leg_joint_qpos,
+            "leg_joint_qvel": self._leg_joint_qvel,
+            "leg_joint_qacc": self._leg_joint_qacc,
+            "action": self._action,
+            "last_action": self._last_action,
+            "foot_touch_air_time": self._foot_touch_air_time,
+            "command_values": self._command_values,
+        }
+
+    @staticmethod
+    def _joint_range(joint_index: dict) -> np.ndarray:
+        return np.arange(joint_index["offset"], joint_index["offset"] + joint_index["len"])
+
+    def _bind_buffer(self, attr_name: str) -> np.ndarray:
+        buffer = np.stack([np.asarray(getattr(agent, attr_name), dtype=np.float64) for agent in self._agents])
+        for i, agent in enumerate(self._agents):
+            setattr(agent, attr_name, buffer[i])
+        return buffer
+
+    def on_agents_reset(self, agents: list[LeggedRobot]) -> None:
+        """
+        LeggedRobot.on_reset rebuilds the command values and drops the last foot site pose,
+        rebind the command values and invalidate the foot site history for the reset agents.
+        """
+        for agent in agents:
+            i = self._agent_index[id(agent)]
+            self._command_values[i] = agent._command_values
+            agent._command_values = self._command_values[i]
+            self._last_contact_site_valid[i] = False
+
+    def get_obs(self,
+                sensor_data: dict,
+                qpos_buffer: np.ndarray,
+                qvel_buffer: np.ndarray,
+                qacc_buffer: np.ndarray,
+                contact_map: LeggedContactMap,
+                site_pos_quat: dict,
+                height_map: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the observation (agent_num, obs_len), achieved_goal (agent_num, 1) and desired_goal (agent_num, 1).
+        """
+        agent_num = self._agent_num
+        foot_num = self._foot_num
+
+        # NOTE qpos, qvel 在 compute_torques 中已经更新，且在 get_obs 前已经被调用过
+        self._leg_joint_qacc[:] = qacc_buffer[self._leg_qacc_index]
+        self._last_leg_joint_qpos[:] = self._leg_joint_qpos
+
+        body_lin_vel, body_lin_acc, body_ang_vel, body_orientation, body_pos = self._get_body_local(qpos_buffer, qvel_buffer, qacc_buffer)
+        body_height, orientation_quat = self._get_body_height_orientation(body_pos, height_map)
+        target_orientation = rotations.quat2euler(orientation_quat)
+
+        foot_site_xpos = np.array([site_pos_quat[name]["xpos"] for name in self._contact_site_names]).reshape(agent_num, foot_num, 3)
+        foot_site_xquat = np.array([site_pos_quat[name]["xquat"] for name in self._contact_site_names]).reshape(agent_num, foot_num, 4)
+        foot_height = self._get_foot_height(foot_site_xpos, height_map)
+
+        foot_touch_force = np.array([sensor_data[name] for name in self._foot_touch_sensor_names], dtype=np.float64).reshape(agent_num, foot_num)
+        self._update_foot_touch_air_time(foot_touch_force)
+
+        body_contact, leg_contact, feet_contact, feet_self_contact = self._get_contact(contact_map, foot_touch_force)
+        feet_velp_norm, feet_velr_norm = self._calc_feet_vel_norm(foot_site_xpos, foot_site_xquat)
+
+        achieved_goal = np.any(body_contact, axis=1, keepdims=True).astype(np.float32)
+        desired_goal = self._desired_goal.copy()
+
+        obs = np.concatenate(
+                [
+                    body_lin_acc,
+                    body_ang_vel,
+                    body_orientation,
+                    self._command_values,
+                    (self._leg_joint_qpos - self._neutral_joint_values),
+                    self._leg_joint_qvel,
+                    self._action,
+                    body_height if self._observe_body_height else np.zeros_like(body_height),
+                ], axis=1).astype(np.float32)
+
+        obs *= self._obs_scale_vec
+
+        # Keep each agent's own random generator, the noise sequence is the same as the per-agent path
+        noise_len = self._noise_scale_vec.shape[1]
+        noise_rand = np.stack([agent._np_random.random(noise_len) for agent in self._agents])
+        obs += ((noise_rand * 2) - 1) * self._noise_scale_vec
+
+        self._state = {
+            "body_lin_vel": body_lin_vel,
+            "body_lin_acc": body_lin_acc,
+            "body_ang_vel": body_ang_vel,
+            "body_orientation": body_orientation,
+            "body_pos": body_pos,
+            "body_height": body_height,
+            "target_orientation": target_orientation,
+            "foot_height": foot_height,
+            "foot_touch_force": foot_touch_force,
+            "leg_contact": leg_contact,
+            "feet_contact": feet_contact,
+            "feet_self_contact": feet_self_contact,
+            "feet_velp_norm": feet_velp_norm,
+            "feet_velr_norm": feet_velr_norm,
+            "body_contact": body_contact,
+            "achieved_goal": achieved_goal,
+            "desired_goal": desired_goal,
+        }
+
+        # Write the per-step values back to the agents, used by the per-agent reward functions
+        for i, agent in enumerate(self._agents):
+            for key, value in self._state.items():
+                setattr(agent, "_" + key, value[i])
+            agent._is_obs_updated = True
+
+        return obs, achieved_goal, desired_goal
+
+    def _get_body_local(self, qpos_buffer: np.ndarray, qvel_buffer: np.ndarray, qacc_buffer: np.ndarray) -> tuple:
+        """
+        Batched LeggedRobot._get_body_local, the velocity is rotated into the base local frame by Vl = Q*VgQ.
+        """
+        body_joint_qpos = qpos_buffer[self._base_qpos_index]
+        body_joint_qvel = qvel_buffer[self._base_qvel_index]
+        body_joint_qacc = qacc_buffer[self._base_qacc_index]
+
+        body_orientation_quat = body_joint_qpos[:, 3:7]
+        body_orientation_quat_conj = rotations.quat_conjugate(body_orientation_quat)
+
+        q_v_global = np.zeros((self._agent_num, 4))
+        q_v_global[:, 1:] = body_joint_qvel[:, :3]
+        body_lin_vel = rotations.quat_mul(body_orientation_quat_conj, rotations.quat_mul(q_v_global, body_orientation_quat))[:, 1:]
+
+        q_acc_global = np.zeros((self._agent_num, 4))
+        q_acc_global[:, 1:] = body_joint_qacc[:, :3]
+        body_lin_acc = rotations.quat_mul(body_orientation_quat_conj, rotations.quat_mul(q_acc_global, body_orientation_quat))[:, 1:]
+
+        body_ang_vel = body_joint_qvel[:, 3:6]
+
+        body_yaw, body_pitch, body_roll = quat_to_euler(body_orientation_quat.T)
+        # NOTE: 这里取与qvel的正负方向一致：身体向左倾斜，roll为负；抬头，pitch为负，向左转，yaw为正
+        body_orientation = np.stack([body_roll, -body_pitch, np.zeros_like(body_yaw)], axis=1)
+
+        return body_lin_vel, body_lin_acc, body_ang_vel, body_orientation, body_joint_qpos
+
+    def _get_body_height_orientation(self, body_pos: np.ndarray, height_map: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Batched LeggedRobot._get_body_height_orientation.
+        """
+        identity_quat = np.tile(np.array([1.0, 0.0, 0.0, 0.0]), (self._agent_num, 1))
+        if not self._compute_body_height and not self._compute_body_orientation:
+            return np.zeros((self._agent_num, self._height_map_sampler.body_height_point_num)), identity_quat
+
+        body_height = self._height_map_sampler.sample_body_height(height_map, body_pos[:, :3])
+        if not self._compute_body_orientation:
+            return body_height, identity_quat
+
+        return body_height, self._height_map_sampler.fit_orientation(body_height)
+
+    def _get_foot_height(self, foot_site_xpos: np.ndarray, height_map: np.ndarray) -> np.ndarray:
+        if not self._compute_foot_height:
+            return np.zeros((self._agent_num, self._foot_num))
+
+        return self._height_map_sampler.sample_height_above(height_map, foot_site_xpos)
+
+    def _update_foot_touch_air_time(self, foot_touch_force: np.ndarray) -> None:
+        touched = foot_touch_force > self._foot_touch_force_air_threshold
+        self._foot_touch_air_time[:] = np.where(touched, self._foot_in_air_time, 0)
+        self._foot_in_air_time[:] = np.where(touched, 0, self._foot_in_air_time + self._dt)
+
+    def _get_contact(self, contact_map: LeggedContactMap, foot_touch_force: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the base, leg, feet and feet self contact of all agents.
+        """
+        contact = contact_map.get_contact(self._contact_body_ids)
+        leg_end = self._base_contact_num + self._leg_contact_num
+        body_contact = contact[:, :self._base_contact_num].astype(np.float32)
+        leg_contact = contact[:, self._base_contact_num:leg_end].astype(np.float64)
+
+        feet_contact = (foot_touch_force > self._foot_touch_force_step_threshold) & contact[:, leg_end:]
+        feet_self_contact = feet_contact & contact_map.get_group_contact(self._foot_body_ids, self._foot_body_groups)
+        return body_contact, leg_contact, feet_contact.astype(np.float64), feet_self_contact.astype(np.float64)
+
+    def _calc_feet_vel_norm(self, foot_site_xpos: np.ndarray, foot_site_xquat: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        invalid = ~self._last_contact_site_valid
+        self._last_contact_site_xpos[invalid] = foot_site_xpos[invalid]
+        self._last_contact_site_xquat[invalid] = foot_site_xquat[invalid]
+        self._last_contact_site_valid[:] = True
+
+        feet_velp_norm = np.linalg.norm((foot_site_xpos - self._last_contact_site_xpos)[..., :2], axis=-1) / self._dt
+
+        xquat = foot_site_xquat.reshape(-1, 4)
+        last_xquat = self._last_contact_site_xquat.reshape(-1, 4)
+        q_diff_w = rotations.quat_mul(xquat, rotations.quat_conjugate(last_xquat))[:, 0]
+        angle = np.where(q_diff_w > 1.0, 0.0, 2 * np.arccos(np.clip(q_diff_w, -1.0, 1.0)))
+        angle = np.where(angle > np.pi, 2 * np.pi - angle, angle)
+        feet_velr_norm = np.abs(angle / self._dt).reshape(self._agent_num, self._foot_num)
+
+        self._last_contact_site_xpos[:] = foot_site_xpos
+        self._last_contact_site_xquat[:] = foot_site_xquat
+        return feet_velp_norm, feet_velr_norm
@@ -0,0 +1,233 @@
+import numpy as np
+
+from .legged_robot import LeggedRobot
+from .legged_obs_batch import LeggedObsBatch
+
+
+class LeggedRewardBatch:
+    """
+    Batched reward computation for LeggedGymEnv.
+
+    Each reward term is evaluated once over the stacked (agent_num, ...) state of LeggedObsBatch,
+    producing an (agent_num, n_terms) matrix that is reduced by the coefficient vector (coeff * dt).
+    The weighted matrix is kept as the per-term breakdown for logging.
+
+    Terms that change the agent's state (success / failure call is_terminated) or have no batched
+    implementation are still evaluated per agent by the original reward function,
+    at the time the agent's compute_reward is called, so their semantics are unchanged.
+    """
+    TRACKING_SIGMA = 0.25  # 奖励的衰减因子
+
+    def __init__(self, obs_batch: LeggedObsBatch):
+        self._obs_batch = obs_batch
+        self._agents = obs_batch.agents
+        self._agent_num = obs_batch.agent_num
+        self._agent_index = {id(agent): i for i, agent in enumerate(self._agents)}
+
+        agent_0 = self._agents[0]
+        self._dt = agent_0.dt
+        self._term_names = [reward_function["name"] for reward_function in agent_0._reward_functions]
+        coeff = np.array([[reward_function["coeff"] for reward_function in agent._reward_functions] for agent in self._agents], dtype=np.float64)
+        self._coeff_vec = coeff * self._dt
+
+        # 系数为 0 的项不计算，与 LeggedRobot.compute_reward 一致
+        active = np.any(coeff != 0, axis=0)
+        self._batch_terms = [(j, getattr(self, "_batch_reward_" + name)) for j, name in enumerate(self._term_names)
+                             if active[j] and hasattr(self, "_batch_reward_" + name)]
+        self._agent_terms = [j for j, name in enumerate(self._term_names)
+                             if active[j] and not hasattr(self, "_batch_reward_" + name)]
+        self._linvel_term = self._term_names.index("follow_command_linvel")
+        self._angvel_term = self._term_names.index("follow_command_angvel")
+
+        self._neutral_joint_values = np.stack([agent._neutral_joint_values for agent in self._agents])
+        if agent_0._neutral_joint_angles_coeff_value is None:
+            self._neutral_joint_angles_coeff = np.ones_like(self._neutral_joint_values)
+        else:
+            self._neutral_joint_angles_coeff = np.stack([agent._neutral_joint_angles_coeff_value for agent in self._agents])
+        self._foot_fitted_ground_pairs = np.array(agent_0._foot_fitted_ground_pairs, dtype=int).reshape(-1, 2)
+        self._base_height_target = np.zeros(self._agent_num)
+        self.on_agents_reset(self._agents)
+
+        self._term_rewards = np.zeros((self._agent_num, len(self._term_names)))
+
+        for i, agent in enumerate(self._agents):
+            agent.bind_reward_batch(self, i)
+
+    @property
+    def agents(self) -> list[LeggedRobot]:
+        return self._agents
+
+    @property
+    def term_names(self) -> list[str]:
+        return self._term_names
+
+    @property
+    def term_rewards(self) -> np.ndarray:
+        """
+        The weighted reward of each term, shape (agent_num, n_terms). Inactive terms are zero.
+        """
+        return self._term_rewards
+
+    def get_reward_terms(self) -> dict[str, np.ndarray]:
+        """
+        Per-term reward breakdown of the last step for logging, {term_name: (agent_num,)}.
+        The arrays are copies, so they stay valid after the next compute().
+        """
+        return {name: self._term_rewards[:, j].copy() for j, name in enumerate(self._term_names)}
+
+    def on_agents_reset(self, agents: list[LeggedRobot]) -> None:
+        """
+        The base height target is updated by LeggedRobot.on_reset.
+        """
+        for agent in agents:
+            self._base_height_target[self._agent_index[id(agent)]] = agent._base_height_target
+
+    def compute(self) -> None:
+        """
+        Evaluate all batched reward terms over the state of the last LeggedObsBatch.get_obs call.
+        """
+        state = self._obs_batch.state
+        self._term_rewards[:] = 0.0
+        for j, term_function in self._batch_terms:
+            self._term_rewards[:, j] = term_function(state) * self._coeff_vec[:, j]
+
+    def reduce_agent_reward(self, agent_index: int) -> float:
+        """
+        Fill the per-agent terms of the agent's row and sum the row.
+        Called from LeggedRobot.compute_reward.
+        """
+        agent = self._agents[agent_index]
+        agent_coeff = agent._reward_functions
+        term_rewards = self._term_rewards[agent_index]
+        for j in self._agent_terms:
+            if agent_coeff[j]["coeff"] != 0:
+                term_rewards[j] = agent_coeff[j]["function"](agent_coeff[j]["coeff"])
+
+        # Curiiculum learning
+        if agent._curriculum_learning:
+            for buffer_name, j in (("lin_vel", self._linvel_term), ("ang_vel", self._angvel_term)):
+                if agent_coeff[j]["coeff"] == 0:
+                    continue
+                buffer = agent._curriculum_reward_buffer[buffer_name]
+                if buffer["index"] < buffer["buffer_size"]:
+                    buffer["buffer"][buffer["index"]] = term_rewards[j]
+                    buffer["index"] += 1
+
+        if agent._reward_printer is not None:
+            for j, name in enumerate(self._term_names):
+                if agent_coeff[j]["coeff"] != 0 and j not in self._agent_terms:
+                    agent._print_reward(f"{name} reward: ", term_rewards[j], self._coeff_vec[agent_index, j])
+
+        return float(np.sum(term_rewards))
+
+    def _is_moving(self, state: dict) -> np.ndarray:
+        lin_vel = state["command_values"][:, :2]
+        return (lin_vel[:, 0] != 0.0) | (lin_vel[:, 1] != 0.0)
+
+    def _batch_reward_alive(self, state: dict) -> np.ndarray:
+        return np.ones(self._agent_num)
+
+    def _batch_reward_leg_contact(self, state: dict) -> np.ndarray:
+        return -np.sum(state["leg_contact"], axis=1)
+
+    def _batch_reward_body_contact(self, state: dict) -> np.ndarray:
+        return -np.sum(state["body_contact"], axis=1)
+
+    def _batch_reward_foot_touch(self, state: dict) -> np.ndarray:
+        threshold = self._agents[0]._foot_touch_force_threshold
+        return -np.sum(np.maximum(state["foot_touch_force"] - threshold, 0), axis=1)
+
+    def _batch_reward_joint_angles(self, state: dict) -> np.ndarray:
+        joint_angles_diff = np.abs(state["leg_joint_qpos"] - self._neutral_joint_values) * self._neutral_joint_angles_coeff
+        return -np.sum(joint_angles_diff, axis=1)
+
+    def _batch_reward_joint_accelerations(self, state: dict) -> np.ndarray:
+        return -np.sum(np.abs(state["leg_joint_qacc"]), axis=1)
+
+    def _batch_reward_limit(self, state: dict) -> np.ndarray:
+        action = state["action"]
+        return -np.square(np.sum(action < -1.0, axis=1) + np.sum(action > 1.0, axis=1))
+
+    def _batch_reward_action_rate(self, state: dict) -> np.ndarray:
+        return -np.sum(np.square(state["last_action"] - state["action"]), axis=1)
+
+    def _batch_reward_follow_command_linvel(self, state: dict) -> np.ndarray:
+        lin_vel_error = np.sum(np.square(state["command_values"][:, :2] - state["body_lin_vel"][:, :2]), axis=1)
+        return np.exp(-lin_vel_error / self.TRACKING_SIGMA)
+
+    def _batch_reward_follow_command_angvel(self, state: dict) -> np.ndarray:
+        ang_vel_error = np.square(state["command_values"][:, 3] - state["body_ang_vel"][:, 2])  # 只考虑 Z 轴的角速度
+        return np.exp(-ang_vel_error / self.TRACKING_SIGMA)
+
+    def _batch_reward_height(self, state: dict) -> np.ndarray:
+        return -np.abs(np.mean(state["body_height"], axis=1) - self._base_height_target)
+
+    def _batch_reward_body_lin_vel(self, state: dict) -> np.ndarray:
+        return -np.square(state["body_lin_vel"][:, 2])
+
+    def _batch_reward_body_ang_vel(self, state: dict) -> np.ndarray:
+        return -np.sum(np.square(state["body_ang_vel"][:, :2]), axis=1)
+
+    def _batch_reward_body_orientation(self, state: dict) -> np.ndarray:
+        return -np.sum(np.square(state["body_orientation"][:, :2] - state["target_orientation"][:, :2]), axis=1)
+
+    def _batch_reward_feet_air_time(self, state: dict) -> np.ndarray:
+        air_time = state["foot_touch_air_time"]
+        ideal = self._agents[0]._foot_touch_air_time_ideal
+        reward = np.sum(np.where(air_time > 0, np.minimum(air_time - ideal, 0), 0), axis=1)
+        has_command = np.linalg.norm(state["command_values"], axis=1) != 0.0
+        return np.where(has_command, reward, 0.0)
+
+    def _batch_reward_feet_self_contact(self, state: dict) -> np.ndarray:
+        return -np.sum(state["feet_self_contact"], axis=1)
+
+    def _batch_reward_feet_slip(self, state: dict) -> np.ndarray:
+        return -np.sum(state["feet_velp_norm"] * state["feet_contact"], axis=1)
+
+    def _batch_reward_feet_wringing(self, state: dict) -> np.ndarray:
+        return -np.sum(state["feet_velr_norm"] * state["feet_contact"], axis=1)
+
+    def _batch_reward_feet_fitted_ground(self, state: dict) -> np.ndarray:
+        contact = state["feet_contact"] != 0
+        pairs = self._foot_fitted_ground_pairs
+        reward = -np.sum(contact[:, pairs[:, 0]] ^ contact[:, pairs[:, 1]], axis=1).astype(np.float64)
+        return np.where(self._is_moving(state), reward, 0.0)
+
+    def _batch_reward_fly(self, state: dict) -> np.ndarray:
+        return -1.0 * (np.sum(state["feet_contact"], axis=1) == 0)
+
+    def _batch_reward_stepping(self, state: dict) -> np.ndarray:
+        reward = np.sum(state["feet_contact"] - 1.0, axis=1)
+        return np.where(self._is_moving(state), 0.0, reward)
+
+    def _batch_reward_feet_swing_height(self, state: dict) -> np.ndarray:
+        swing_height = self._agents[0]._foot_leg_period["swing_height"]
+        contact = state["feet_contact"] > 0
+        pos_error = np.square(state["foot_height"] - swing_height) * ~contact
+        return np.where(self._is_moving(state), -np.sum(pos_error, axis=1), 0.0)
+
+    def _batch_reward_contact_no_vel(self, state: dict) -> np.ndarray:
+        contact_feet_vel = state["feet_velp_norm"] * (state["feet_contact"] > 0)
+        return -np.sum(np.square(contact_feet_vel), axis=1)
+
+    def _row_torques(self) -> np.ndarray:
+        # compute_torques 每次都生成新的数组，这里按 agent 收集
+        return np.stack([agent._row_torques for agent in self._agents])
+
+    def _batch_reward_torques(self, state: dict) -> np.ndarray:
+        return -np.sum(np.square(self._row_torques()), axis=1)
+
+    def _batch_reward_joint_qpos_limits(self, state: dict) -> np.ndarray:
+        joint_qpos_limit = np.stack([agent._joint_qpos_limit for agent in self._agents])
+        leg_joint_qpos = state["leg_joint_qpos"]
+        out_of_limits = -(leg_joint_qpos - joint_qpos_limit[..., 0]).clip(max=0.)  # lower limit
+        out_of_limits += (leg_joint_qpos - joint_qpos_limit[..., 1]).clip(min=0.)
+        return -np.sum(out_of_limits, axis=1)
+
+    def _batch_reward_joint_qvel_limits(self, state: dict) -> np.ndarray:
+        joint_qvel_limit = np.stack([agent._joint_qvel_limit for agent in self._agents])
+        return -np.sum((np.abs(state["leg_joint_qvel"]) - joint_qvel_limit).clip(min=0., max=1.), axis=1)
+
+    def _batch_reward_torque_limits(self, state: dict) -> np.ndarray:
+        torques_limit = np.stack([agent._torques_limit for agent in self._agents])
+        return -np.sum((np.abs(self._row_torques()) - torques_limit).clip(min=0.), axis=1)
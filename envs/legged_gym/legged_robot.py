@@ -12,9 +12,10 @@ import sys
 import numpy as np
 
 from .legged_utils import local2global, global2local, quat_angular_velocity, smooth_sqr_wave_np, quat_to_euler
+from .legged_height_map import HeightMapSampler
 
 from orca_gym.utils.joint_controller import pd_control
-from numpy.linalg import norm, lstsq
+from numpy.linalg import norm
 
 class LeggedRobot(OrcaGymAsyncAgent):
     def __init__(self, 
@@ -107,6 +108,9 @@ class LeggedRobot(OrcaGymAsyncAgent):
         self._nq = len(self._leg_joint_names) + (7 * len(self._base_joint_name))
         self._nv = len(self._leg_joint_names) + (6 * len(self._base_joint_name))
 
+        # 高度图采样网格（偏移、分辨率、原点）可以在 robot config 中配置
+        self._height_map_sampler = HeightMapSampler(robot_config.get("height_map_sampler", None))
+
         # Scale the observation and noise
         self._gravity_quat = rotations.euler2quat([0.0, 0.0, -9.81000042])
         self._obs_scale_vec = self._get_obs_scale_vec()
@@ -160,6 +164,8 @@ class LeggedRobot(OrcaGymAsyncAgent):
         self._compute_foot_height = robot_config["compute_foot_height"]
 
         self._is_obs_updated = False
+        self._reward_batch = None
+        self._reward_batch_index = None
         self._setup_reward_functions(robot_config)
         self._setup_curriculum_functions()
 
@@ -330,6 +336,8 @@ class LeggedRobot(OrcaGymAsyncAgent):
         assert "leg_start" not in self._qvel_index and "leg_length" not in self._qvel_index, "qvel_index: joint_name 'leg_start' or 'leg_length' already exists"
         self._qvel_index["leg_start"], self._qvel_index["leg_length"] = self._calc_agent_leg_buffer_index(self._qvel_index)
         self._leg_joint_qvel = np.zeros(self._qvel_index["leg_length"])
+        # 第一次 compute_torques 之前（reset 后的 get_obs）力矩奖励项也会读取
+        self._row_torques = np.zeros(self._qvel_index["leg_length"])
 
         self._qacc_index = {joint_name: {"offset": qacc_offset[i], "len": qacc_length[i]} for i, joint_name in enumerate(self.joint_names)}
         assert "leg_start" not in self._qacc_index and "leg_length" not in self._qacc_index, "qacc_index: joint_name 'leg_start' or 'leg_length' already exists"
@@ -454,19 +462,9 @@ class LeggedRobot(OrcaGymAsyncAgent):
         return joint_neutral_qpos, joint_zero_qvel
 
     def _compute_base_height(self, height_map : np.ndarray) -> float:
-        height_map_x = int(self._base_neutral_qpos[self._base_joint_name][0] * 10 + height_map.shape[0] / 2)
-        height_map_y = int(self._base_neutral_qpos[self._base_joint_name][1] * 10 + height_map.shape[1] / 2)
-        
-        height_map_x_start = max(0, int(height_map_x - 5))
-        height_map_x_end = min(height_map.shape[0], int(height_map_x + 5))
-        height_map_y_start = max(0, int(height_map_y - 5))
-        height_map_y_end = min(height_map.shape[1], int(height_map_y + 5))
-        
-        height_map_cliped = height_map[height_map_x_start:height_map_x_end, height_map_y_start:height_map_y_end]
-        height = height_map_cliped.max()
-        # print("Move up : ", height, "Height map: ", height_map_x, height_map_y)
-        return height
-        
+        # 与观测使用同一网格（resolution / origin 来自 height_map_sampler 配置）
+        return self._height_map_sampler.max_height_around(height_map, self._base_neutral_qpos[self._base_joint_name][:2])
+
     def reset_command_indicator(self, qpos_buffer : np.ndarray) -> dict[str, np.ndarray]:
         if not hasattr(self, "_cmd_mocap_pos_quat"):
             self._cmd_mocap_pos_quat = {
@@ -873,12 +871,25 @@ class LeggedRobot(OrcaGymAsyncAgent):
     #     self._print_reward("Symmetry reward: ", reward, coeff * self.dt)
     #     return reward
     
+    def bind_reward_batch(self, reward_batch, agent_index : int) -> None:
+        """
+        Compute the reward by the batched reward terms (LeggedRewardBatch) instead of calling every reward function.
+        """
+        self._reward_batch = reward_batch
+        self._reward_batch_index = agent_index
+
     def compute_reward(self, achieved_goal, desired_goal) -> SupportsFloat:
         if self._is_obs_updated:
             total_reward = 0.0
             self._achieved_goal = achieved_goal
             self._desired_goal = desired_goal
 
+            if self._reward_batch is not None:
+                total_reward = self._reward_batch.reduce_agent_reward(self._reward_batch_index)
+                self._print_reward("Total reward: ", total_reward)
+                self._is_obs_updated = False
+                return total_reward
+
             for reward_function in self._reward_functions:
                 if reward_function["coeff"] == 0:
                     continue
@@ -962,14 +973,8 @@ class LeggedRobot(OrcaGymAsyncAgent):
         if not self._compute_foot_height:
             return np.zeros(len(self._contact_site_names))
         
-        foot_site_pos = [site_pos_quat[foot_site_name]["xpos"] for foot_site_name in self._contact_site_names]
-        foot_height = np.zeros(len(foot_site_pos))
-        for i in range(len(foot_site_pos)):
-            x_idx = int(foot_site_pos[i][0] * 10 + height_map.shape[0] / 2)
-            y_idx = int(foot_site_pos[i][1] * 10 + height_map.shape[1] / 2)
-            x_idx = np.clip(x_idx, 0, height_map.shape[0] - 1)
-            y_idx = np.clip(y_idx, 0, height_map.shape[1] - 1)
-            foot_height[i] = foot_site_pos[i][2] - height_map[x_idx, y_idx]
+        foot_site_pos = np.array([site_pos_quat[foot_site_name]["xpos"] for foot_site_name in self._contact_site_names])
+        foot_height = self._height_map_sampler.sample_height_above(height_map, foot_site_pos)
 
         # print("Foot site pos: ", foot_site_pos, "Foot height: ", foot_height)
         return foot_height
@@ -977,86 +982,21 @@ class LeggedRobot(OrcaGymAsyncAgent):
 
     def _get_body_height_orientation(self, qpos_buffer: np.ndarray, height_map: np.ndarray) -> tuple:
         if not self._compute_body_height and not self._compute_body_orientation:
-            return np.zeros(16), np.array([1.0, 0.0, 0.0, 0.0])  # 返回单位四元数
+            return np.zeros(self._height_map_sampler.body_height_point_num), np.array([1.0, 0.0, 0.0, 0.0])  # 返回单位四元数
 
         # 获取机器人本体位置（x, y, z）
         body_joint_qpos = qpos_buffer[self._qpos_index[self._base_joint_name]["offset"]: 
                                     self._qpos_index[self._base_joint_name]["offset"] + 
                                     self._qpos_index[self._base_joint_name]["len"]]
         
-        # 定义16个点的相对偏移（以机器人中心为原点）
-        offsets = [(-0.9, -0.9), (-0.3, -0.9), (0.3, -0.9), (0.9, -0.9),
-                (-0.9, -0.3), (-0.3, -0.3), (0.3, -0.3), (0.9, -0.3),
-                (-0.9, 0.3), (-0.3, 0.3), (0.3, 0.3), (0.9, 0.3),
-                (-0.9, 0.9), (-0.3, 0.9), (0.3, 0.9), (0.9, 0.9)]
-        
-        body_height = np.zeros(16)
-        
-        # 计算各点高度（机器人高度减去地面高度）
-        for i, (dx, dy) in enumerate(offsets):
-            # 计算高度图索引
-            x_idx = int((body_joint_qpos[0] + dx * 0.1) * 10 + height_map.shape[0] / 2)
-            y_idx = int((body_joint_qpos[1] + dy * 0.1) * 10 + height_map.shape[1] / 2)
-            # 边界检查
-            x_idx = np.clip(x_idx, 0, height_map.shape[0] - 1)
-            y_idx = np.clip(y_idx, 0, height_map.shape[1] - 1)
-            # 高度差：机器人高度 - 地面高度
-            body_height[i] = body_joint_qpos[2] - height_map[x_idx, y_idx]
+        # 各采样点高度差：机器人高度 - 地面高度
+        body_height = self._height_map_sampler.sample_body_height(height_map, body_joint_qpos[:3])[0]
 
         if not self._compute_body_orientation:
             return body_height, np.array([1.0, 0.0, 0.0, 0.0])
         
-        # ====================== 修正平面法向量计算 ====================== 
-        # 使用最小二乘法拟合平面 z = ax + by + c
-        X = np.column_stack([np.ones(16), 
-                            [dx * 0.1 for dx, _ in offsets],
-                            [dy * 0.1 for dy, _ in offsets]])
-        A = X[:, 1:]  # 仅取[x, y]部分
-        b = body_height
-        
-        # 解平面方程系数: [a, b, c] 满足 z ≈ ax + by + c
-        coeffs, _, _, _ = lstsq(X, b, rcond=None)
-        c, a, b = coeffs  # [常数项, x系数, y系数]
-        
-        # 平面法向量 (归一化的法向量指向上方)
-        normal = np.array([-a, -b, 1])  # 取负确保方向正确
-        normal_norm = norm(normal)
-        if normal_norm < 1e-6:
-            normal_unit = np.array([0, 0, 1])
-        else:
-            normal_unit = normal / normal_norm
-
-        # ====================== 计算四元数 ====================== 
-        # 参考法向量（理想Z轴向上）
-        ref_normal = np.array([0, 0, 1])
-        cos_theta = np.dot(normal_unit, ref_normal)
-        
-        # 避免数值不稳定性
-        cos_theta = np.clip(cos_theta, -1, 1)
-        
-        # 当法向量与Z轴几乎平行时
-        if abs(cos_theta - 1) < 1e-6:
-            return body_height, np.array([1.0, 0.0, 0.0, 0.0])  # 无旋转
-        elif abs(cos_theta + 1) < 1e-6:
-            return body_height, np.array([0.0, 0.0, 1.0, 0.0])  # 180°绕Z轴旋转
-            
-        # 计算旋转轴和角度
-        axis = np.cross(ref_normal, normal_unit)
-        axis_norm = norm(axis)
-        if axis_norm < 1e-6:
-            quaternion = np.array([1.0, 0.0, 0.0, 0.0])
-        else:
-            axis = axis / axis_norm
-            angle = np.arccos(cos_theta)
-            sin_half = np.sin(angle / 2)
-            quaternion = np.array([
-                np.cos(angle / 2),          # w
-                axis[0] * sin_half,         # x
-                axis[1] * sin_half,         # y
-                axis[2] * sin_half           # z
-            ])
-
-        
+        # 最小二乘拟合平面 z = ax + by + c，由平面法向量得到旋转四元数
+        quaternion = self._height_map_sampler.fit_orientation(body_height)[0]
         return body_height, quaternion
 
     def _get_foot_touch_force(self, sensor_data: dict) -> np.ndarray:
@@ -1201,7 +1141,7 @@ class LeggedRobot(OrcaGymAsyncAgent):
         scale_leg_joint_qpos = np.array([1] * len(self._leg_joint_names)) * self._legged_obs_config["scale"]["qpos"]
         scale_leg_joint_qvel = np.array([1] * len(self._leg_joint_names)) * self._legged_obs_config["scale"]["qvel"]
         scale_action = np.array([1] * len(self._actuator_names)) # No scaling on the action
-        scale_height = np.ones(16) * self._legged_obs_config["scale"]["height"]
+        scale_height = np.ones(self._height_map_sampler.body_height_point_num) * self._legged_obs_config["scale"]["height"]
 
         scale_vec = np.concatenate([
             scale_lin_vel, 
@@ -1238,7 +1178,7 @@ class LeggedRobot(OrcaGymAsyncAgent):
         noise_leg_joint_qpos = np.array([1] * len(self._leg_joint_names)) * noise_level * self._legged_obs_config["noise"]["qpos"] * self._legged_obs_config["scale"]["qpos"]
         noise_leg_joint_qvel = np.array([1] * len(self._leg_joint_names)) * noise_level * self._legged_obs_config["noise"]["qvel"] * self._legged_obs_config["scale"]["qvel"]
         noise_action = np.zeros(len(self._actuator_names))  # No noise on the action
-        noise_height = np.ones(16) * noise_level * self._legged_obs_config["noise"]["height"] * self._legged_obs_config["scale"]["height"]
+        noise_height = np.ones(self._height_map_sampler.body_height_point_num) * noise_level * self._legged_obs_config["noise"]["height"] * self._legged_obs_config["scale"]["height"]
 
         noise_vec = np.concatenate([
             noise_lin_vel, 
@@ -1286,39 +1226,39 @@ class LeggedRobot(OrcaGymAsyncAgent):
         reward_coeff = robot_config["reward_coeff"][self._task]
         # print("Reward coeff: ", reward_coeff)
         self._reward_functions = [
-            {"function": self._compute_reward_alive, "coeff": reward_coeff["alive"] if "alive" in reward_coeff else 0},
-            {"function": self._compute_reward_success, "coeff": reward_coeff["success"] if "success" in reward_coeff else 0},
-            {"function": self._compute_reward_failure, "coeff": reward_coeff["failure"] if "failure" in reward_coeff else 0},
-            {"function": self._compute_reward_leg_contact, "coeff": reward_coeff["leg_contact"] if "leg_contact" in reward_coeff else 0},
-            {"function": self._compute_reward_body_contact, "coeff": reward_coeff["body_contact"] if "body_contact" in reward_coeff else 0},
-            {"function": self._compute_reward_foot_touch, "coeff": reward_coeff["foot_touch"] if "foot_touch" in reward_coeff else 0},
-            {"function": self._compute_reward_joint_angles, "coeff": reward_coeff["joint_angles"] if "joint_angles" in reward_coeff else 0},
-            {"function": self._compute_reward_joint_accelerations, "coeff": reward_coeff["joint_accelerations"] if "joint_accelerations" in reward_coeff else 0},
-            {"function": self._compute_reward_limit, "coeff": reward_coeff["limit"] if "limit" in reward_coeff else 0},
-            {"function": self._compute_reward_action_rate, "coeff": reward_coeff["action_rate"] if "action_rate" in reward_coeff else 0},
-            {"function": self._compute_reward_base_gyro, "coeff": reward_coeff["base_gyro"] if "base_gyro" in reward_coeff else 0},
-            {"function": self._compute_reward_base_accelerometer, "coeff": reward_coeff["base_accelerometer"] if "base_accelerometer" in reward_coeff else 0},
-            {"function": self._compute_reward_follow_command_linvel, "coeff": reward_coeff["follow_command_linvel"] if "follow_command_linvel" in reward_coeff else 0},
-            {"function": self._compute_reward_follow_command_angvel, "coeff": reward_coeff["follow_command_angvel"] if "follow_command_angvel" in reward_coeff else 0},
-            {"function": self._compute_reward_height, "coeff": reward_coeff["height"] if "height" in reward_coeff else 0},
-            {"function": self._compute_reward_body_lin_vel, "coeff": reward_coeff["body_lin_vel"] if "body_lin_vel" in reward_coeff else 0},
-            {"function": self._compute_reward_body_ang_vel, "coeff": reward_coeff["body_ang_vel"] if "body_ang_vel" in reward_coeff else 0},
-            {"function": self._compute_reward_body_orientation, "coeff": reward_coeff["body_orientation"] if "body_orientation" in reward_coeff else 0},
-            {"function": self._compute_feet_air_time, "coeff": reward_coeff["feet_air_time"] if "feet_air_time" in reward_coeff else 0},
-            {"function": self._compute_reward_feet_self_contact, "coeff": reward_coeff["feet_self_contact"] if "feet_self_contact" in reward_coeff else 0},
-            {"function": self._compute_reward_feet_slip, "coeff": reward_coeff["feet_slip"] if "feet_slip" in reward_coeff else 0},
-            {"function": self._compute_reward_feet_wringing, "coeff": reward_coeff["feet_wringing"] if "feet_wringing" in reward_coeff else 0},
-            {"function": self._compute_reward_feet_fitted_ground, "coeff": reward_coeff["feet_fitted_ground"] if "feet_fitted_ground" in reward_coeff else 0},
-            {"function": self._compute_reward_fly, "coeff": reward_coeff["fly"] if "fly" in reward_coeff else 0},
-            {"function": self._compute_reward_stepping, "coeff": reward_coeff["stepping"] if "stepping" in reward_coeff else 0},
-            {"function": self._compute_reward_feet_contact, "coeff": reward_coeff["feet_contact"] if "feet_contact" in reward_coeff else 0},
-            {"function": self._compute_reward_feet_swing_height, "coeff": reward_coeff["feet_swing_height"] if "feet_swing_height" in reward_coeff else 0},
-            {"function": self._compute_reward_contact_no_vel, "coeff": reward_coeff["contact_no_vel"] if "contact_no_vel" in reward_coeff else 0},
-            {"function": self._compute_reward_feet_contact, "coeff": reward_coeff["phase_contact"] if "phase_contact" in reward_coeff else 0},  
-            {"function": self._compute_reward_joint_qpos_limits, "coeff": reward_coeff["joint_qpos_limits"] if "joint_qpos_limits" in reward_coeff else 0},
-            {"function": self._compute_reward_torques, "coeff": reward_coeff["torques"] if "torques" in reward_coeff else 0},
-            {"function": self._compute_reward_joint_qvel_limits, "coeff": reward_coeff["joint_qvel_limits"] if "joint_qvel_limits" in reward_coeff else 0},
-            {"function": self._compute_reward_torque_limits, "coeff": reward_coeff["torque_limits"] if "torque_limits" in reward_coeff else 0},
+            {"name": "alive", "function": self._compute_reward_alive, "coeff": reward_coeff["alive"] if "alive" in reward_coeff else 0},
+            {"name": "success", "function": self._compute_reward_success, "coeff": reward_coeff["success"] if "success" in reward_coeff else 0},
+            {"name": "failure", "function": self._compute_reward_failure, "coeff": reward_coeff["failure"] if "failure" in reward_coeff else 0},
+            {"name": "leg_contact", "function": self._compute_reward_leg_contact, "coeff": reward_coeff["leg_contact"] if "leg_contact" in reward_coeff else 0},
+            {"name": "body_contact", "function": self._compute_reward_body_contact, "coeff": reward_coeff["body_contact"] if "body_contact" in reward_coeff else 0},
+            {"name": "foot_touch", "function": self._compute_reward_foot_touch, "coeff": reward_coeff["foot_touch"] if "foot_touch" in reward_coeff else 0},
+            {"name": "joint_angles", "function": self._compute_reward_joint_angles, "coeff": reward_coeff["joint_angles"] if "joint_angles" in reward_coeff else 0},
+            {"name": "joint_accelerations", "function": self._compute_reward_joint_accelerations, "coeff": reward_coeff["joint_accelerations"] if "joint_accelerations" in reward_coeff else 0},
+            {"name": "limit", "function": self._compute_reward_limit, "coeff": reward_coeff["limit"] if "limit" in reward_coeff else 0},
+            {"name": "action_rate", "function": self._compute_reward_action_rate, "coeff": reward_coeff["action_rate"] if "action_rate" in reward_coeff else 0},
+            {"name": "base_gyro", "function": self._compute_reward_base_gyro, "coeff": reward_coeff["base_gyro"] if "base_gyro" in reward_coeff else 0},
+            {"name": "base_accelerometer", "function": self._compute_reward_base_accelerometer, "coeff": reward_coeff["base_accelerometer"] if "base_accelerometer" in reward_coeff else 0},
+            {"name": "follow_command_linvel", "function": self._compute_reward_follow_command_linvel, "coeff": reward_coeff["follow_command_linvel"] if "follow_command_linvel" in reward_coeff else 0},
+            {"name": "follow_command_angvel", "function": self._compute_reward_follow_command_angvel, "coeff": reward_coeff["follow_command_angvel"] if "follow_command_angvel" in reward_coeff else 0},
+            {"name": "height", "function": self._compute_reward_height, "coeff": reward_coeff["height"] if "height" in reward_coeff else 0},
+            {"name": "body_lin_vel", "function": self._compute_reward_body_lin_vel, "coeff": reward_coeff["body_lin_vel"] if "body_lin_vel" in reward_coeff else 0},
+            {"name": "body_ang_vel", "function": self._compute_reward_body_ang_vel, "coeff": reward_coeff["body_ang_vel"] if "body_ang_vel" in reward_coeff else 0},
+            {"name": "body_orientation", "function": self._compute_reward_body_orientation, "coeff": reward_coeff["body_orientation"] if "body_orientation" in reward_coeff else 0},
+            {"name": "feet_air_time", "function": self._compute_feet_air_time, "coeff": reward_coeff["feet_air_time"] if "feet_air_time" in reward_coeff else 0},
+            {"name": "feet_self_contact", "function": self._compute_reward_feet_self_contact, "coeff": reward_coeff["feet_self_contact"] if "feet_self_contact" in reward_coeff else 0},
+            {"name": "feet_slip", "function": self._compute_reward_feet_slip, "coeff": reward_coeff["feet_slip"] if "feet_slip" in reward_coeff else 0},
+            {"name": "feet_wringing", "function": self._compute_reward_feet_wringing, "coeff": reward_coeff["feet_wringing"] if "feet_wringing" in reward_coeff else 0},
+            {"name": "feet_fitted_ground", "function": self._compute_reward_feet_fitted_ground, "coeff": reward_coeff["feet_fitted_ground"] if "feet_fitted_ground" in reward_coeff else 0},
+            {"name": "fly", "function": self._compute_reward_fly, "coeff": reward_coeff["fly"] if "fly" in reward_coeff else 0},
+            {"name": "stepping", "function": self._compute_reward_stepping, "coeff": reward_coeff["stepping"] if "stepping" in reward_coeff else 0},
+            {"name": "feet_contact", "function": self._compute_reward_feet_contact, "coeff": reward_coeff["feet_contact"] if "feet_contact" in reward_coeff else 0},
+            {"name": "feet_swing_height", "function": self._compute_reward_feet_swing_height, "coeff": reward_coeff["feet_swing_height"] if "feet_swing_height" in reward_coeff else 0},
+            {"name": "contact_no_vel", "function": self._compute_reward_contact_no_vel, "coeff": reward_coeff["contact_no_vel"] if "contact_no_vel" in reward_coeff else 0},
+            {"name": "phase_contact", "function": self._compute_reward_feet_contact, "coeff": reward_coeff["phase_contact"] if "phase_contact" in reward_coeff else 0},  
+            {"name": "joint_qpos_limits", "function": self._compute_reward_joint_qpos_limits, "coeff": reward_coeff["joint_qpos_limits"] if "joint_qpos_limits" in reward_coeff else 0},
+            {"name": "torques", "function": self._compute_reward_torques, "coeff": reward_coeff["torques"] if "torques" in reward_coeff else 0},
+            {"name": "joint_qvel_limits", "function": self._compute_reward_joint_qvel_limits, "coeff": reward_coeff["joint_qvel_limits"] if "joint_qvel_limits" in reward_coeff else 0},
+            {"name": "torque_limits", "function": self._compute_reward_torque_limits, "coeff": reward_coeff["torque_limits"] if "torque_limits" in reward_coeff else 0},
         ]
         
     def _setup_curriculum_functions(self):
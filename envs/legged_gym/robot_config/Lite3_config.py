@@ -142,6 +142,12 @@ Lite3Config = {
         "observe_body_height" : False,       # 真机没有激光雷达，无法计算body高度，因此这里高度只用来做奖励，不用来观测
         "compute_body_orientation" : False,  # TODO:目前只支持水平方向的orientation奖励
         "compute_foot_height" : True,        # Foot 高度只用来做奖励，不用来观测
+        "height_map_sampler" : {
+            "resolution" : 0.1,              # 高度图分辨率 (m)
+            "origin" : [0.0, 0.0],           # 高度图中心对应的世界坐标 (x, y)
+            "interpolation" : "nearest",     # nearest / bilinear
+            # "body_height_offsets" : [...], # body 高度采样点相对机器人中心的偏移 (m)，默认 4x4 网格
+        },
 
         "base_contact_body_names" : ["torso", "FL_HIP", "FR_HIP", "HL_HIP", "HR_HIP"],
         "leg_contact_body_names" : ["FL_THIGH", "FL_SHANK", 
@@ -28,6 +28,7 @@ from envs.legged_gym.legged_config import LeggedRobotConfig, LeggedObsConfig, Cu
 from envs.legged_gym.robot_locator import locate_scene_robot
 
 from examples.legged_gym.scripts.grpc_client import GrpcInferenceClient, create_grpc_client
+from examples.legged_gym.scripts.telemetry_writer import TelemetryWriter
 
 from orca_gym.log.orca_log import get_orca_logger
 _logger = get_orca_logger(
@@ -713,91 +714,84 @@ def main(
         if env is not None:
             env.close()
 
-def segment_obs(obs: dict[str, np.ndarray], agent_name_list: list[str]) -> dict[str, dict[str, np.ndarray]]:
+def build_obs_index(obs_keys, agent_name_list: list[str]) -> dict[str, list[str]]:
+    """
+    Precompute the agent obs key -> env obs key of each agent (in agent order) map from the first observation,
+    so the per-step segmentation and stacking are plain dict lookups.
+    """
+    obs_keys = list(obs_keys)
     if len(agent_name_list) == 1:
-        return {agent_name_list[0]: obs}
-    
-    segmented_obs = {}
-    for agent_name in agent_name_list:
-        segmented_obs[agent_name] = {}
-        for key in obs.keys():
-            if key.startswith(agent_name):
-                new_key = key.replace(f"{agent_name}_", "")
-                segmented_obs[agent_name][new_key] = obs[key]
-    return segmented_obs
-    
+        return {key: [key] for key in obs_keys}
+
+    # 名称更长的 agent 优先匹配，避免 robot_1 误匹配 robot_10_xxx
+    prefixes = sorted(((f"{agent_name}_", agent_index) for agent_index, agent_name in enumerate(agent_name_list)),
+                      key=lambda prefix: len(prefix[0]), reverse=True)
+    agent_keys = [{} for _ in agent_name_list]
+    for key in obs_keys:
+        for prefix, agent_index in prefixes:
+            if key.startswith(prefix):
+                agent_keys[agent_index][key[len(prefix):]] = key
+                break
+
+    obs_index = {}
+    for agent_key in agent_keys[0]:
+        if any(agent_key not in keys for keys in agent_keys):
+            raise ValueError(f"Observation key '{agent_key}' is missing for some agents")
+        obs_index[agent_key] = [keys[agent_key] for keys in agent_keys]
+    return obs_index
+
+
+def stack_obs(obs: dict[str, np.ndarray], obs_index: dict[str, list[str]]) -> dict[str, np.ndarray]:
+    """
+    Stack the observations of all agents into {agent_obs_key: (agent_num, dim)}, in agent order.
+    """
+    return {agent_key: np.stack([obs[env_key] for env_key in env_keys]) for agent_key, env_keys in obs_index.items()}
+
+
+def _onnx_batchable(model) -> bool:
+    # 导出时 batch 维度固定为 1 的模型只能逐行推理
+    batch_dim = model.get_inputs()[0].shape[0]
+    return not isinstance(batch_dim, int) or batch_dim != 1
 
-def log_observation(obs: dict, action: np.ndarray, filename: str, physics_step: int, control_step: int, sim_time: float):
+
+def predict_actions(model, model_type: str, batch_obs: dict[str, np.ndarray], terrain_type: str, action_dim: int) -> np.ndarray:
     """
-    Log observations and actions to CSV files in the format matching the reference files.
-    
-    Args:
-        obs (dict): Observation dictionary containing IMU and joint data
-        action (np.ndarray): Action array
-        filename (str): Base path for the CSV files (without extension)
-        physics_step (int): Current physics simulation step count
-        control_step (int): Current control/policy step count
-        sim_time (float): Current simulation time in seconds
+    Run one inference call over the stacked observations of all agents sharing the model,
+    returns the actions of shape (agent_num, action_dim) in agent order.
     """
-    import os
-    import csv
-    from datetime import datetime
-    
-    # Create base directory if it doesn't exist
-    base_dir = os.path.dirname(filename)
-    if base_dir and not os.path.exists(base_dir):
-        os.makedirs(base_dir)
-    
-    # Generate timestamp for this step (using physics_step as timestamp)
-    timestamp = sim_time
-    
-    # Extract base filename without extension
-    base_filename = os.path.splitext(filename)[0]
-    
-    # 1. Log observation data
-    obs_filename = f"{base_filename}_observation.csv"
-    obs_file_exists = os.path.exists(obs_filename)
-    
-    with open(obs_filename, 'a', newline='') as f:
-        writer = csv.writer(f)
-        if not obs_file_exists:
-            # Write header: timestamp, obs_0, obs_1, ..., obs_64
-            obs_headers = ["timestamp"] + [f"obs_{i}" for i in range(len(obs["observation"]))]
-            writer.writerow(obs_headers)
-        
-        # Write observation data
-        obs_data = [timestamp] + list(obs["observation"])
-        writer.writerow(obs_data)
-    
-    # 2. Log action data (processed actions)
-    action_filename = f"{base_filename}_action.csv"
-    action_file_exists = os.path.exists(action_filename)
-    
-    with open(action_filename, 'a', newline='') as f:
-        writer = csv.writer(f)
-        if not action_file_exists:
-            # Write header: timestamp, action_0, action_1, ..., action_11
-            action_headers = ["timestamp"] + [f"action_{i}" for i in range(len(action))]
-            writer.writerow(action_headers)
-        
-        # Write action data
-        action_data = [timestamp] + list(action)
-        writer.writerow(action_data)
-    
-    # 3. Log raw action data (same as action for now, but could be different if needed)
-    raw_action_filename = f"{base_filename}_raw_action.csv"
-    raw_action_file_exists = os.path.exists(raw_action_filename)
+    agent_num = len(batch_obs["observation"])
+    if model_type == "sb3":
+        sb3_action, _states = model.predict(batch_obs, deterministic=True)
+        return np.asarray(sb3_action).reshape(agent_num, -1)
+
+    elif model_type == "onnx":
+        onnx_obs = {
+            "observation_achieved_goal": batch_obs["achieved_goal"].astype(np.float32),
+            "observation_desired_goal": batch_obs["desired_goal"].astype(np.float32),
+            "observation_observation": batch_obs["observation"].astype(np.float32)
+        }
+        if agent_num == 1 or _onnx_batchable(model):
+            onnx_actions = model.run(None, onnx_obs)[0]
+        else:
+            onnx_actions = np.concatenate([model.run(None, {key: value[i:i + 1] for key, value in onnx_obs.items()})[0]
+                                           for i in range(agent_num)])
+        return np.clip(onnx_actions, -100, 100)
+
+    elif model_type == "grpc":
+        # 准备gRPC请求的观察数据，所有 agent 的观测堆叠后复用同一条长连接的推理流
+        grpc_obs = {
+            "observation": batch_obs["observation"].astype(np.float32),
+            "desired_goal": batch_obs["desired_goal"].astype(np.float32),
+            "achieved_goal": batch_obs["achieved_goal"].astype(np.float32)
+        }
+        grpc_action, _states = model.predict_stream(grpc_obs, "batch", model_type=terrain_type, deterministic=True)
+        if grpc_action is None:
+            return np.zeros((agent_num, action_dim))
+        return np.asarray(grpc_action).reshape(agent_num, -1)
+
+    else:
+        raise ValueError(f"Invalid model type: {model_type}")
     
-    with open(raw_action_filename, 'a', newline='') as f:
-        writer = csv.writer(f)
-        if not raw_action_file_exists:
-            # Write header: timestamp, raw_action_0, raw_action_1, ..., raw_action_11
-            raw_action_headers = ["timestamp"] + [f"raw_action_{i}" for i in range(len(action))]
-            writer.writerow(raw_action_headers)
-        
-        # Write raw action data (currently same as processed action)
-        raw_action_data = [timestamp] + list(action)
-        writer.writerow(raw_action_data)
 
 def run_simulation(env: gym.Env, 
                  agent_name_list: list[str],
@@ -809,6 +803,8 @@ def run_simulation(env: gym.Env,
                  keyboard_control: KeyboardControl,
                  command_model: dict[str, str]):
     obs, info = env.reset()
+    obs_index = build_obs_index(obs.keys(), agent_name_list)
+    agent_action_dim = env.action_space.shape[0] // len(agent_name_list)
     _logger.info(
         f"run_legged_sim loop started. agent_names={agent_name_list}, "
         f"available_models={list(models.keys())}"
@@ -820,6 +816,10 @@ def run_simulation(env: gym.Env,
     # Generate base filename for robot data files
     timestamp_str = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
     log_file = f"./log/robot_data_{timestamp_str}"
+    telemetry = TelemetryWriter(
+        log_file,
+        streams={"observation": "obs", "action": "action", "raw_action": "raw_action"},
+    )
     
     # Add step counting
     physics_step = 0
@@ -864,54 +864,15 @@ def run_simulation(env: gym.Env,
             else:
                 env.unwrapped.setup_command(command_dict)
 
-            segmented_obs = segment_obs(obs, agent_name_list)
-            action_list = []
-            for agent_obs in segmented_obs.values():
-                if model_type == "sb3":
-                    # print("sb3 obs: ", agent_obs)
-                    sb3_action, _states = model.predict(agent_obs, deterministic=True)
-                    # print("sb3 action: ", sb3_action)
-                    # print("--------------------------------")
-                    action = sb3_action
-
-                elif model_type == "onnx":
-                    agent_obs = {
-                        "observation_achieved_goal": np.array([agent_obs["achieved_goal"]], dtype=np.float32),
-                        "observation_desired_goal": np.array([agent_obs["desired_goal"]], dtype=np.float32),
-                        "observation_observation": np.array([agent_obs["observation"]], dtype=np.float32)
-                    }
-                    # print("onnx obs: ", agent_obs)
-                    onnx_actions = model.run(None, agent_obs)[0]
-                    onnx_action = onnx_actions[0]
-                    onnx_action = np.clip(onnx_action, -100, 100)
-                    # print("onnx action: ", onnx_action)
-                    # print("--------------------------------")
-                    action = onnx_action
-
-                elif model_type == "grpc":
-                    # 准备gRPC请求的观察数据
-                    grpc_obs = {
-                        "observation": agent_obs["observation"].astype(np.float32),
-                        "desired_goal": agent_obs["desired_goal"].astype(np.float32),
-                        "achieved_goal": agent_obs["achieved_goal"].astype(np.float32)
-                    }
-                    # print("grpc obs: ", grpc_obs)
-                    grpc_action, _states = model.predict(grpc_obs, model_type=terrain_type, deterministic=True)
-                    if grpc_action is None:
-                        grpc_action = np.zeros(env.action_space.shape[0])
-                    # print("grpc action: ", grpc_action)
-                    # print("--------------------------------")
-                    action = grpc_action
-
-                else:
-                    raise ValueError(f"Invalid model type: {model_type}")
-
-                action_list.append(action)
-
-            action = np.concatenate(action_list).flatten()
+            # 同一个地形模型下的所有 agent 堆叠观测，一次推理后按 agent 顺序拼接动作
+            batch_obs = stack_obs(obs, obs_index)
+            actions = predict_actions(model, model_type, batch_obs, terrain_type, agent_action_dim)
+            action = actions.flatten()
             
-            # Log with step information
-            log_observation(obs, action, log_file, physics_step, control_step, sim_time)
+            # Log with step information，只拷贝到缓冲块，由后台线程批量写文件
+            telemetry.write("observation", sim_time, batch_obs["observation"])
+            telemetry.write("action", sim_time, action)
+            telemetry.write("raw_action", sim_time, action)
             if control_step % 50 == 0:
                 _logger.info(
                     f"Sim heartbeat: control_step={control_step}, terrain={terrain_type}, "
@@ -940,7 +901,10 @@ def run_simulation(env: gym.Env,
             
     finally:
         _logger.info("退出仿真环境")
-        env.close()
+        try:
+            telemetry.close()
+        finally:
+            env.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Run multiple instances of the script with different gRPC addresses.')
@@ -1,6 +1,8 @@
 import grpc
 import numpy as np
 import time
+import queue
+import threading
 from typing import Dict, Any, Optional, Tuple
 import logging
 
@@ -16,6 +18,104 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+def _encode_tensor(tensor) -> Tuple[bytes, list]:
+    """数组转换为 little-endian float32 原始字节和形状"""
+    tensor = np.ascontiguousarray(tensor if tensor is not None else [], dtype='<f4')
+    return tensor.tobytes(), list(tensor.shape)
+
+
+def _decode_tensor(data: bytes, shape) -> np.ndarray:
+    """little-endian float32 原始字节转换为数组"""
+    tensor = np.frombuffer(data, dtype='<f4')
+    return tensor.reshape(tuple(shape)) if len(shape) > 0 else tensor
+
+
+class StreamSequenceError(Exception):
+    """流式推理的响应与请求序号不一致，这条流的响应已经错位"""
+
+
+class GrpcInferenceStream:
+    """
+    一条长连接的双向流式推理通道
+    
+    每次 predict 发送一条请求并等待对应的响应，连接在多个控制步之间复用。
+    """
+    
+    def __init__(self, stub, timeout: float = 5.0):
+        self._stub = stub
+        self._timeout = timeout
+        self._sequence = 0
+        self._requests = None
+        self._responses = None
+        self._response_queue = None
+        self._open()
+    
+    def _open(self):
+        self._requests = queue.Queue()
+        self._response_queue = queue.Queue()
+        # 请求迭代器在收到 None 时结束，服务端随之关闭流
+        self._responses = self._stub.PredictStream(iter(self._requests.get, None))
+        threading.Thread(target=self._receive_loop, args=(self._responses, self._response_queue), daemon=True).start()
+    
+    @staticmethod
+    def _receive_loop(responses, response_queue: queue.Queue):
+        try:
+            for response in responses:
+                response_queue.put(response)
+        except grpc.RpcError as e:
+            response_queue.put(e)
+            return
+        # 服务端正常结束了流，让等待中的 predict 立即失败而不是等到超时
+        response_queue.put(EOFError("Inference stream closed by server"))
+    
+    def predict(self, obs: Dict[str, np.ndarray],
+                model_type: str = "default",
+                deterministic: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        执行推理，observation 可以是 (obs_dim,) 或多个 agent 的 (batch, obs_dim)
+        """
+        self._sequence += 1
+        observation, observation_shape = _encode_tensor(obs.get('observation'))
+        desired_goal, desired_goal_shape = _encode_tensor(obs.get('desired_goal'))
+        achieved_goal, achieved_goal_shape = _encode_tensor(obs.get('achieved_goal'))
+        self._requests.put(inference_pb2.TensorInferenceRequest(
+            observation=observation,
+            observation_shape=observation_shape,
+            desired_goal=desired_goal,
+            desired_goal_shape=desired_goal_shape,
+            achieved_goal=achieved_goal,
+            achieved_goal_shape=achieved_goal_shape,
+            model_type=model_type,
+            deterministic=deterministic,
+            sequence=self._sequence
+        ))
+        
+        try:
+            response = self._response_queue.get(timeout=self._timeout)
+        except queue.Empty:
+            # 超时后响应顺序无法保证，这条流不能再使用
+            raise TimeoutError(f"Stream inference timed out after {self._timeout}s")
+        
+        if isinstance(response, (grpc.RpcError, EOFError)):
+            raise response
+        if response.sequence != self._sequence:
+            # 收到的是其他请求的响应，之后的响应也都会错位
+            raise StreamSequenceError(f"Stream response sequence {response.sequence} does not match request {self._sequence}")
+        if not response.success:
+            raise RuntimeError(f"Inference failed: {response.error_message}")
+        
+        action = _decode_tensor(response.action, response.action_shape)
+        states = _decode_tensor(response.states, response.states_shape) if response.states else None
+        return action, states
+    
+    def close(self):
+        """关闭流"""
+        if self._requests is not None:
+            self._requests.put(None)
+            self._responses.cancel()
+            self._requests = None
+
+
 class GrpcInferenceClient:
     """gRPC推理客户端"""
     
@@ -35,6 +135,9 @@ class GrpcInferenceClient:
         self.max_retries = max_retries
         self.channel = None
         self.stub = None
+        # 每个 agent 一条长连接的推理流
+        self._streams: Dict[str, GrpcInferenceStream] = {}
+        self._stream_supported = True
         self._connect()
     
     def _connect(self):
@@ -99,6 +202,79 @@ class GrpcInferenceClient:
                 logger.error(f"gRPC request failed after {self.max_retries} attempts: {e}")
                 return None, None
     
+    def predict_stream(self, obs: Dict[str, np.ndarray],
+                       agent_name: str,
+                       model_type: str = "default",
+                       deterministic: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        通过 agent 对应的长连接流执行推理，服务端不支持 PredictStream 时回退到 predict
+        
+        Args:
+            obs: 观察数据字典，包含 'observation', 'desired_goal', 'achieved_goal' 等键
+            agent_name: agent 名称，每个 agent 复用同一条流；多个 agent 的观测也可以堆叠成 (batch, obs_dim) 走同一条流
+            model_type: 模型类型标识
+            deterministic: 是否确定性推理
+            
+        Returns:
+            Tuple[action, states]: 动作数组和状态数组（可选）
+        """
+        if self.stub is None:
+            logger.error("gRPC client not connected")
+            return None, None
+        if not self._stream_supported:
+            return self._predict_unary(obs, model_type=model_type, deterministic=deterministic)
+        
+        stream = self._streams.get(agent_name)
+        if stream is None:
+            stream = GrpcInferenceStream(self.stub, self.timeout)
+            self._streams[agent_name] = stream
+        
+        try:
+            return stream.predict(obs, model_type=model_type, deterministic=deterministic)
+        except RuntimeError as e:
+            # 推理失败，流本身仍然可用
+            logger.error(f"gRPC stream request failed: {e}")
+            return None, None
+        except (grpc.RpcError, EOFError, TimeoutError, StreamSequenceError) as e:
+            # 流已断开或响应错位，下次调用时重新建立
+            self._streams.pop(agent_name).close()
+            if isinstance(e, grpc.RpcError) and e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                logger.warning("Server does not support PredictStream, fall back to unary Predict")
+                self._stream_supported = False
+                self._close_streams()
+                return self._predict_unary(obs, model_type=model_type, deterministic=deterministic)
+            if isinstance(e, grpc.RpcError) and e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+                # 服务端的流数量已满（max_streams），这一步走一元 Predict，下次再尝试建立流
+                logger.warning(f"Server rejected the inference stream, fall back to unary Predict: {e.details()}")
+                return self._predict_unary(obs, model_type=model_type, deterministic=deterministic)
+            logger.error(f"gRPC stream request failed: {e}")
+            return None, None
+    
+    def _predict_unary(self, obs: Dict[str, np.ndarray],
+                       model_type: str,
+                       deterministic: bool) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """流式推理不可用时的回退，(batch, obs_dim) 的观测拆成多条请求走 BatchPredict"""
+        if np.ndim(obs.get('observation')) == 1:
+            try:
+                return self.predict(obs, model_type=model_type, deterministic=deterministic)
+            except (grpc.RpcError, RuntimeError) as e:
+                logger.error(f"gRPC request failed: {e}")
+                return None, None
+        
+        batch_size = len(obs['observation'])
+        obs_list = [{key: value[i] for key, value in obs.items()} for i in range(batch_size)]
+        try:
+            results = self.batch_predict(obs_list, model_type=model_type, deterministic=deterministic)
+        except (grpc.RpcError, RuntimeError) as e:
+            logger.error(f"gRPC batch request failed: {e}")
+            return None, None
+        
+        action = np.stack([action for action, _ in results])
+        states = None
+        if all(agent_states is not None for _, agent_states in results):
+            states = np.stack([agent_states for _, agent_states in results])
+        return action, states
+    
     def batch_predict(self, obs_list: list, 
                      model_type: str = "default",
                      deterministic: bool = True) -> list:
@@ -156,8 +332,14 @@ class GrpcInferenceClient:
                     logger.error(f"gRPC batch request failed after {self.max_retries} attempts: {e}")
                     raise
     
+    def _close_streams(self):
+        for stream in self._streams.values():
+            stream.close()
+        self._streams.clear()
+    
     def close(self):
         """关闭连接"""
+        self._close_streams()
         if self.channel:
             self.channel.close()
             self.channel = None
@@ -10,9 +10,11 @@ import yaml
 import argparse
 import logging
 import time
+import threading
 import numpy as np
 import grpc
 from concurrent import futures
+from collections import defaultdict, deque
 from pathlib import Path
 from typing import Dict, Any, Optional
 
@@ -38,21 +40,184 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+class DynamicBatcher:
+    """
+    动态批处理队列
+    
+    并发的 Predict 请求按模型（以及观测长度）收集，最多等待 max_wait_ms 或凑满 max_batch_size 后
+    合并为一次批量推理，再分别完成各自的响应。
+    同时统计队列深度、batch 大小分布和请求延迟（入队到完成）的 p50 / p99，用于调整等待窗口。
+    """
+    
+    def __init__(self, run_model, max_wait_ms: float = 1.0, max_batch_size: int = 64,
+                 stats_interval: float = 10.0, latency_window: int = 10000):
+        """
+        Args:
+            run_model: 批量推理函数 run_model(model_type, obs) -> (action, states)
+            max_wait_ms: 最早的请求最多等待的时间（毫秒）
+            max_batch_size: 单次推理的最大 batch
+            stats_interval: 输出统计日志的间隔（秒），0 表示不输出
+            latency_window: 用于计算延迟分位数的最近请求数
+        """
+        self._run_model = run_model
+        self._max_wait = max_wait_ms / 1000.0
+        self._max_batch_size = max(1, int(max_batch_size))
+        self._stats_interval = stats_interval
+        
+        # key -> [(obs, future, enqueue_time)]
+        self._pending: Dict[tuple, list] = defaultdict(list)
+        self._pending_count = 0
+        self._cond = threading.Condition()
+        self._running = True
+        
+        self._stats_lock = threading.Lock()
+        self._max_queue_depth = 0
+        self._batch_size_hist: Dict[int, int] = defaultdict(int)
+        self._latencies = deque(maxlen=latency_window)
+        self._served_count = 0
+        self._last_stats_time = time.perf_counter()
+        self._last_stats_count = 0
+        
+        self._thread = threading.Thread(target=self._dispatch_loop, name="DynamicBatcher", daemon=True)
+        self._thread.start()
+    
+    def submit(self, model_type: str, obs: Dict[str, np.ndarray]) -> futures.Future:
+        """
+        提交一条请求，obs 中的每一项为一维数组
+        
+        Returns:
+            Future，结果为 (action, states)
+        """
+        future = futures.Future()
+        key = (model_type, len(obs["observation"]), len(obs["desired_goal"]), len(obs["achieved_goal"]))
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Dynamic batcher is stopped")
+            self._pending[key].append((obs, future, time.perf_counter()))
+            self._pending_count += 1
+            if self._pending_count > self._max_queue_depth:
+                self._max_queue_depth = self._pending_count
+            self._cond.notify()
+        return future
+    
+    def stop(self) -> None:
+        """停止分发线程，未完成的请求会先处理完"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._cond:
+            queue_depth = self._pending_count
+        with self._stats_lock:
+            latencies = np.array(self._latencies)
+            batch_size_hist = dict(sorted(self._batch_size_hist.items()))
+            served_count = self._served_count
+            max_queue_depth = self._max_queue_depth
+        
+        return {
+            "queue_depth": queue_depth,
+            "max_queue_depth": max_queue_depth,
+            "served_requests": served_count,
+            "batch_size_histogram": batch_size_hist,
+            "latency_p50_ms": float(np.percentile(latencies, 50) * 1000) if len(latencies) > 0 else 0.0,
+            "latency_p99_ms": float(np.percentile(latencies, 99) * 1000) if len(latencies) > 0 else 0.0,
+        }
+    
+    def _take_ready_batches(self) -> list:
+        """取出已到期或已满的请求组，需要持有 self._cond"""
+        now = time.perf_counter()
+        batches = []
+        for key in list(self._pending.keys()):
+            group = self._pending[key]
+            if len(group) < self._max_batch_size and now - group[0][2] < self._max_wait and self._running:
+                continue
+            batch = group[:self._max_batch_size]
+            if len(group) > self._max_batch_size:
+                self._pending[key] = group[self._max_batch_size:]
+            else:
+                del self._pending[key]
+            self._pending_count -= len(batch)
+            batches.append((key[0], batch))
+        return batches
+    
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                batches = self._take_ready_batches()
+                while not batches:
+                    if not self._running and not self._pending:
+                        return
+                    if self._pending:
+                        # 等到最早的请求到期
+                        oldest = min(group[0][2] for group in self._pending.values())
+                        timeout = max(oldest + self._max_wait - time.perf_counter(), 0.0)
+                    else:
+                        timeout = self._stats_interval if self._stats_interval > 0 else None
+                    self._cond.wait(timeout=timeout)
+                    batches = self._take_ready_batches()
+                    if not batches and not self._pending:
+                        break
+            
+            for model_type, batch in batches:
+                self._run_batch(model_type, batch)
+            self._log_stats()
+    
+    def _run_batch(self, model_type: str, batch: list) -> None:
+        try:
+            obs = {key: np.stack([item[0][key] for item in batch]) for key in batch[0][0]}
+            action, states = self._run_model(model_type, obs)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        
+        done_time = time.perf_counter()
+        for row, (_, future, _) in enumerate(batch):
+            future.set_result((action[row], states[row] if states is not None else None))
+        
+        with self._stats_lock:
+            self._batch_size_hist[len(batch)] += 1
+            self._served_count += len(batch)
+            self._latencies.extend(done_time - enqueue_time for _, _, enqueue_time in batch)
+    
+    def _log_stats(self) -> None:
+        if self._stats_interval <= 0:
+            return
+        now = time.perf_counter()
+        if now - self._last_stats_time < self._stats_interval or self._served_count == self._last_stats_count:
+            return
+        self._last_stats_time = now
+        self._last_stats_count = self._served_count
+        logger.info(f"Dynamic batching stats: {self.get_stats()}")
+
+
 class ONNXInferenceService(inference_pb2_grpc.InferenceServiceServicer):
     """ONNX推理服务"""
     
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, batch_wait_ms: float = 0.0, max_batch_size: int = 64, max_streams: int = 64):
         """
         初始化推理服务
         
         Args:
             config_path: 配置文件路径
+            batch_wait_ms: 动态批处理的最大等待时间（毫秒），0 表示关闭，Predict 请求逐条推理
+            max_batch_size: 动态批处理的最大 batch
+            max_streams: 同时打开的 PredictStream 数量上限，超出的流直接以 RESOURCE_EXHAUSTED 拒绝
         """
         self.config_path = config_path
         self.config = self._load_config(config_path)
         self.models = self._load_onnx_models()
+        # 导出时未声明动态 batch 维度的模型只能逐条推理
+        self.model_batchable = {model_name: self._is_batchable(model) for model_name, model in self.models.items()}
         self.request_count = 0
         self.model_cache = {}
+        self.batcher = DynamicBatcher(self._run_model, batch_wait_ms, max_batch_size) if batch_wait_ms > 0 else None
+        self.max_streams = max_streams
+        self._active_streams = 0
+        self._stream_lock = threading.Lock()
         
         logger.info(f"Loaded {len(self.models)} ONNX models")
         for model_name, model in self.models.items():
@@ -108,8 +273,16 @@ class ONNXInferenceService(inference_pb2_grpc.InferenceServiceServicer):
         
         return models
     
-    def _prepare_onnx_input(self, obs: Dict[str, np.ndarray], model: ort.InferenceSession) -> Dict[str, np.ndarray]:
-        """准备ONNX模型输入"""
+    @staticmethod
+    def _is_batchable(model: ort.InferenceSession) -> bool:
+        """模型输入的第一维是否为动态 batch 维度"""
+        for model_input in model.get_inputs():
+            if len(model_input.shape) == 0 or isinstance(model_input.shape[0], int):
+                return False
+        return True
+
+    def _prepare_onnx_input(self, obs: Dict[str, np.ndarray], model: ort.InferenceSession, batch_size: int) -> Dict[str, np.ndarray]:
+        """准备ONNX模型输入，obs 中的每一项形状为 (batch_size, dim)"""
         # 获取模型的输入信息
         input_names = [input.name for input in model.get_inputs()]
         onnx_input = {}
@@ -117,30 +290,76 @@ class ONNXInferenceService(inference_pb2_grpc.InferenceServiceServicer):
         # 根据模型输入名称准备数据
         for input_name in input_names:
             if input_name == "observation_achieved_goal":
-                onnx_input[input_name] = np.array([obs["achieved_goal"]], dtype=np.float32)
+                onnx_input[input_name] = np.asarray(obs["achieved_goal"], dtype=np.float32)
             elif input_name == "observation_desired_goal":
-                onnx_input[input_name] = np.array([obs["desired_goal"]], dtype=np.float32)
+                onnx_input[input_name] = np.asarray(obs["desired_goal"], dtype=np.float32)
             elif input_name == "observation_observation":
-                onnx_input[input_name] = np.array([obs["observation"]], dtype=np.float32)
+                onnx_input[input_name] = np.asarray(obs["observation"], dtype=np.float32)
             else:
                 # 对于其他输入，尝试从obs中获取
                 if input_name in obs:
-                    onnx_input[input_name] = np.array([obs[input_name]], dtype=np.float32)
+                    onnx_input[input_name] = np.asarray(obs[input_name], dtype=np.float32)
                 else:
                     # 如果找不到对应的输入，使用默认值
                     logger.warning(f"Input '{input_name}' not found in observation, using zeros")
                     input_shape = model.get_inputs()[0].shape
                     if len(input_shape) > 1:
-                        onnx_input[input_name] = np.zeros((1,) + tuple(input_shape[1:]), dtype=np.float32)
+                        onnx_input[input_name] = np.zeros((batch_size,) + tuple(input_shape[1:]), dtype=np.float32)
                     else:
-                        onnx_input[input_name] = np.zeros((1,), dtype=np.float32)
+                        onnx_input[input_name] = np.zeros((batch_size,), dtype=np.float32)
         
         return onnx_input
+
+    def _run_model(self, model_type: str, obs: Dict[str, np.ndarray]) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        对一组观测执行推理，obs 中的每一项形状为 (batch_size, dim)
+        
+        Returns:
+            (action, states)，形状为 (batch_size, action_dim)，states 可能为 None
+        """
+        model = self.models[model_type]
+        batch_size = len(obs["observation"])
+
+        start_time = time.time()
+        if batch_size == 1 or self.model_batchable[model_type]:
+            onnx_outputs = model.run(None, self._prepare_onnx_input(obs, model, batch_size))
+        else:
+            # 固定 batch=1 的模型，逐条推理后拼接
+            row_outputs = [model.run(None, self._prepare_onnx_input({key: value[i:i + 1] for key, value in obs.items()}, model, 1))
+                           for i in range(batch_size)]
+            onnx_outputs = [np.concatenate(outputs, axis=0) for outputs in zip(*row_outputs)]
+        inference_time = time.time() - start_time
+        logger.debug(f"Inference of {batch_size} requests completed in {inference_time:.4f}s")
+
+        # 假设第一个输出是动作，并确保动作在合理范围内
+        action = np.clip(onnx_outputs[0], -100, 100)
+
+        # 生成状态信息（如果有的话），假设第二个输出是状态
+        states = onnx_outputs[1] if len(onnx_outputs) > 1 else None
+        return action, states
+
+    @staticmethod
+    def _error_response(error_msg: str):
+        return inference_pb2.InferenceResponse(
+            action=[],
+            states=[],
+            success=False,
+            error_message=error_msg
+        )
+
+    def _model_not_found_message(self, model_type: str) -> str:
+        available_models = list(self.models.keys())
+        error_msg = f"Model type '{model_type}' not found. Available models: {available_models}"
+        logger.error(error_msg)
+        return error_msg
+
+    def _model_not_found_response(self, model_type: str):
+        return self._error_response(self._model_not_found_message(model_type))
     
     def Predict(self, request, context):
         """处理单次推理请求"""
         self.request_count += 1
-        logger.info(f"Received inference request #{self.request_count}")
+        logger.debug(f"Received inference request #{self.request_count}")
         
         try:
             # 解析请求数据
@@ -148,94 +367,179 @@ class ONNXInferenceService(inference_pb2_grpc.InferenceServiceServicer):
             desired_goal = np.array(request.desired_goal, dtype=np.float32)
             achieved_goal = np.array(request.achieved_goal, dtype=np.float32)
             model_type = request.model_type
-            deterministic = request.deterministic
             
-            logger.debug(f"Model type: {model_type}, Deterministic: {deterministic}")
+            logger.debug(f"Model type: {model_type}, Deterministic: {request.deterministic}")
             logger.debug(f"Observation shape: {observation.shape}")
-            logger.debug(f"Desired goal shape: {desired_goal.shape}")
-            logger.debug(f"Achieved goal shape: {achieved_goal.shape}")
             
-            # 准备观察数据
+            # 选择模型
+            if model_type not in self.models:
+                return self._model_not_found_response(model_type)
+            
             obs = {
                 "observation": observation,
                 "desired_goal": desired_goal,
                 "achieved_goal": achieved_goal
             }
-            
-            # 选择模型
-            if model_type not in self.models:
-                available_models = list(self.models.keys())
-                error_msg = f"Model type '{model_type}' not found. Available models: {available_models}"
-                logger.error(error_msg)
-                return inference_pb2.InferenceResponse(
-                    action=[],
-                    states=[],
-                    success=False,
-                    error_message=error_msg
-                )
-            
-            model = self.models[model_type]
-            
-            # 准备ONNX输入
-            onnx_input = self._prepare_onnx_input(obs, model)
-            
-            # 执行推理
-            start_time = time.time()
-            onnx_outputs = model.run(None, onnx_input)
-            inference_time = time.time() - start_time
-            
-            # 获取动作输出
-            action = onnx_outputs[0][0]  # 假设第一个输出是动作
-            
-            # 确保动作在合理范围内
-            action = np.clip(action, -100, 100)
-            
-            # 生成状态信息（如果有的话）
-            states = None
-            if len(onnx_outputs) > 1:
-                states = onnx_outputs[1][0]  # 假设第二个输出是状态
-            
-            logger.debug(f"Inference completed in {inference_time:.4f}s")
-            logger.debug(f"Action shape: {action.shape}")
+            if self.batcher is not None:
+                # 与其他并发请求合并推理
+                action, states = self.batcher.submit(model_type, obs).result()
+            else:
+                action, states = self._run_model(model_type, {key: value[None] for key, value in obs.items()})
+                action, states = action[0], (states[0] if states is not None else None)
             
             # 返回响应
-            response = inference_pb2.InferenceResponse(
+            return inference_pb2.InferenceResponse(
                 action=action.tolist(),
                 states=states.tolist() if states is not None else [],
                 success=True,
                 error_message=""
             )
             
-            return response
-            
         except Exception as e:
             logger.error(f"Inference error: {e}")
-            return inference_pb2.InferenceResponse(
-                action=[],
-                states=[],
-                success=False,
-                error_message=str(e)
-            )
+            return self._error_response(str(e))
     
     def BatchPredict(self, request, context):
-        """处理批量推理请求"""
-        logger.info(f"Received batch inference request with {len(request.requests)} items")
+        """
+        处理批量推理请求
         
-        responses = []
-        for req in request.requests:
-            # 复用单次推理逻辑
-            single_response = self.Predict(req, context)
-            responses.append(single_response)
+        按 model_type（以及观测长度）分组，每组堆叠为 (N, obs_dim) 只执行一次推理，再按请求顺序返回结果
+        """
+        requests = request.requests
+        self.request_count += len(requests)
+        logger.debug(f"Received batch inference request with {len(requests)} items")
+        
+        groups = defaultdict(list)
+        for i, req in enumerate(requests):
+            groups[(req.model_type, len(req.observation), len(req.desired_goal), len(req.achieved_goal))].append(i)
+
+        responses = [None] * len(requests)
+        for (model_type, _, _, _), indices in groups.items():
+            if model_type not in self.models:
+                error_response = self._model_not_found_response(model_type)
+                for i in indices:
+                    responses[i] = error_response
+                continue
+
+            try:
+                obs = {
+                    "observation": np.array([requests[i].observation for i in indices], dtype=np.float32),
+                    "desired_goal": np.array([requests[i].desired_goal for i in indices], dtype=np.float32),
+                    "achieved_goal": np.array([requests[i].achieved_goal for i in indices], dtype=np.float32),
+                }
+                action, states = self._run_model(model_type, obs)
+                for row, i in enumerate(indices):
+                    responses[i] = inference_pb2.InferenceResponse(
+                        action=action[row].tolist(),
+                        states=states[row].tolist() if states is not None else [],
+                        success=True,
+                        error_message=""
+                    )
+            except Exception as e:
+                logger.error(f"Batch inference error: {e}")
+                error_response = self._error_response(str(e))
+                for i in indices:
+                    responses[i] = error_response
         
         return inference_pb2.BatchInferenceResponse(responses=responses)
     
+    @staticmethod
+    def _decode_tensor(data: bytes, shape) -> np.ndarray:
+        """little-endian float32 原始字节转换为数组，不拷贝数据"""
+        tensor = np.frombuffer(data, dtype='<f4')
+        return tensor.reshape(tuple(shape)) if len(shape) > 0 else tensor
+
+    @staticmethod
+    def _encode_tensor(tensor: np.ndarray) -> tuple[bytes, list]:
+        """数组转换为 little-endian float32 原始字节和形状"""
+        tensor = np.ascontiguousarray(tensor, dtype='<f4')
+        return tensor.tobytes(), list(tensor.shape)
+
+    def _tensor_error_response(self, error_msg: str, sequence: int):
+        return inference_pb2.TensorInferenceResponse(success=False, error_message=error_msg, sequence=sequence)
+
+    def _predict_tensor(self, request):
+        """处理一条流式推理请求"""
+        model_type = request.model_type
+        if model_type not in self.models:
+            return self._tensor_error_response(self._model_not_found_message(model_type), request.sequence)
+
+        try:
+            observation = self._decode_tensor(request.observation, request.observation_shape)
+            desired_goal = self._decode_tensor(request.desired_goal, request.desired_goal_shape)
+            achieved_goal = self._decode_tensor(request.achieved_goal, request.achieved_goal_shape)
+
+            if observation.ndim == 1:
+                obs = {
+                    "observation": observation,
+                    "desired_goal": desired_goal.reshape(-1),
+                    "achieved_goal": achieved_goal.reshape(-1)
+                }
+                if self.batcher is not None:
+                    action, states = self.batcher.submit(model_type, obs).result()
+                else:
+                    action, states = self._run_model(model_type, {key: value[None] for key, value in obs.items()})
+                    action, states = action[0], (states[0] if states is not None else None)
+            else:
+                # 一条请求中包含多个 agent 的观测 (batch, obs_dim)
+                batch_size = len(observation)
+                obs = {
+                    "observation": observation,
+                    "desired_goal": desired_goal.reshape(batch_size, -1),
+                    "achieved_goal": achieved_goal.reshape(batch_size, -1)
+                }
+                action, states = self._run_model(model_type, obs)
+
+            action_bytes, action_shape = self._encode_tensor(action)
+            states_bytes, states_shape = self._encode_tensor(states) if states is not None else (b"", [])
+            return inference_pb2.TensorInferenceResponse(
+                action=action_bytes,
+                action_shape=action_shape,
+                states=states_bytes,
+                states_shape=states_shape,
+                success=True,
+                error_message="",
+                sequence=request.sequence
+            )
+        except Exception as e:
+            logger.error(f"Stream inference error: {e}")
+            return self._tensor_error_response(str(e), request.sequence)
+
+    def PredictStream(self, request_iterator, context):
+        """
+        处理双向流式推理请求
+        
+        客户端为每个 agent 保持一条长连接，每个请求按顺序返回一个响应，
+        省去每个控制步建立调用的开销，观测和动作以原始字节传输，省去逐元素的编解码。
+        每条流在整个生命周期内占用一个服务端线程，超过 max_streams 的流直接拒绝，
+        而不是排队等待空闲线程（排队的流在其他流关闭前永远得不到响应）。
+        """
+        with self._stream_lock:
+            if self._active_streams >= self.max_streams:
+                logger.warning(f"Reject inference stream: {self._active_streams} streams already open (max_streams={self.max_streams})")
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"Too many inference streams (max_streams={self.max_streams})")
+            self._active_streams += 1
+        
+        logger.debug("Inference stream opened")
+        try:
+            for request in request_iterator:
+                self.request_count += 1
+                yield self._predict_tensor(request)
+        finally:
+            with self._stream_lock:
+                self._active_streams -= 1
+        logger.debug("Inference stream closed")
+
     def get_model_info(self) -> Dict[str, Any]:
         """获取模型信息"""
         info = {
             "loaded_models": list(self.models.keys()),
             "request_count": self.request_count,
+            "max_streams": self.max_streams,
             "config_path": getattr(self, 'config_path', 'unknown')
         }
+        if self.batcher is not None:
+            info["dynamic_batching"] = self.batcher.get_stats()
         
         for model_name, model in self.models.items():
             try:
@@ -249,14 +553,29 @@ class ONNXInferenceService(inference_pb2_grpc.InferenceServiceServicer):
         return info
 
 
-def serve(config_path: str, port: int = 50051, max_workers: int = 10):
-    """启动gRPC服务器"""
+def serve(config_path: str, port: int = 50051, max_workers: int = 10, batch_wait_ms: float = 0.0, max_batch_size: int = 64,
+          max_streams: int = 64):
+    """
+    启动gRPC服务器
+    
+    同步 gRPC 服务器中每条 PredictStream 会一直占用一个线程，线程池按 max_workers（一元调用）
+    + max_streams（流）分配，流再多也不会占满处理 Predict / BatchPredict 的线程。
+    max_streams 应不小于同时连接的 agent（客户端流）数量，超出的流会被拒绝，客户端回退到一元 Predict。
+    """
+    if max_workers < 1 or max_streams < 0:
+        raise ValueError(f"max_workers must be >= 1 and max_streams >= 0, got {max_workers} and {max_streams}")
     
     # 创建推理服务
-    inference_service = ONNXInferenceService(config_path)
+    inference_service = ONNXInferenceService(config_path, batch_wait_ms, max_batch_size, max_streams)
+    if batch_wait_ms > 0:
+        logger.info(f"Dynamic batching enabled: max wait {batch_wait_ms} ms, max batch size {max_batch_size}")
+        if max_workers < max_batch_size:
+            # 每个等待中的 Predict 占用一个工作线程，batch 不会超过 max_workers
+            logger.warning(f"max_workers ({max_workers}) < max_batch_size ({max_batch_size}), batches are limited to {max_workers}")
     
     # 创建gRPC服务器
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers + max_streams))
+    logger.info(f"Worker threads: {max_workers} for unary calls + {max_streams} for inference streams")
     inference_pb2_grpc.add_InferenceServiceServicer_to_server(
         inference_service, server
     )
@@ -278,6 +597,9 @@ def serve(config_path: str, port: int = 50051, max_workers: int = 10):
     except KeyboardInterrupt:
         logger.info("Shutting down server...")
         server.stop(0)
+        if inference_service.batcher is not None:
+            inference_service.batcher.stop()
+            logger.info(f"Dynamic batching stats: {inference_service.batcher.get_stats()}")
 
 
 def test_server(config_path: str, port: int = 50051):
@@ -323,7 +645,13 @@ def main():
     parser.add_argument("--port", type=int, default=50151, 
                        help="Server port")
     parser.add_argument("--max-workers", type=int, default=10, 
-                       help="Max worker threads")
+                       help="Worker threads for unary Predict / BatchPredict calls")
+    parser.add_argument("--max-streams", type=int, default=64, 
+                       help="Max concurrent PredictStream clients, each holds its own thread (should be >= number of streaming agents)")
+    parser.add_argument("--batch-wait-ms", type=float, default=0.0, 
+                       help="Enable dynamic batching of concurrent Predict calls with this max wait (ms), 0 to disable")
+    parser.add_argument("--max-batch-size", type=int, default=64, 
+                       help="Max batch size of dynamic batching")
     parser.add_argument("--test", action="store_true", 
                        help="Test server connection")
     parser.add_argument("--verbose", "-v", action="store_true", 
@@ -346,7 +674,7 @@ def main():
     if args.test:
         test_server(args.config, args.port)
     else:
-        serve(args.config, args.port, args.max_workers)
+        serve(args.config, args.port, args.max_workers, args.batch_wait_ms, args.max_batch_size, args.max_streams)
 
 
 if __name__ == "__main__":
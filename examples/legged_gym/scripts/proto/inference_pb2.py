@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0finference.proto\x12\tinference\"\x7f\n\x10InferenceRequest\x12\x13\n\x0bobservation\x18\x01 \x03(\x02\x12\x14\n\x0c\x64\x65sired_goal\x18\x02 \x03(\x02\x12\x15\n\rachieved_goal\x18\x03 \x03(\x02\x12\x12\n\nmodel_type\x18\x04 \x01(\t\x12\x15\n\rdeterministic\x18\x05 \x01(\x08\"[\n\x11InferenceResponse\x12\x0e\n\x06\x61\x63tion\x18\x01 \x03(\x02\x12\x0e\n\x06states\x18\x02 \x03(\x02\x12\x0f\n\x07success\x18\x03 \x01(\x08\x12\x15\n\rerror_message\x18\x04 \x01(\t\"F\n\x15\x42\x61tchInferenceRequest\x12-\n\x08requests\x18\x01 \x03(\x0b\x32\x1b.inference.InferenceRequest\"I\n\x16\x42\x61tchInferenceResponse\x12/\n\tresponses\x18\x01 \x03(\x0b\x32\x1c.inference.InferenceResponse2\xad\x01\n\x10InferenceService\x12\x44\n\x07Predict\x12\x1b.inference.InferenceRequest\x1a\x1c.inference.InferenceResponse\x12S\n\x0c\x42\x61tchPredict\x12 .inference.BatchInferenceRequest\x1a!.inference.BatchInferenceResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0finference.proto\x12\tinference\"\x7f\n\x10InferenceRequest\x12\x13\n\x0bobservation\x18\x01 \x03(\x02\x12\x14\n\x0c\x64\x65sired_goal\x18\x02 \x03(\x02\x12\x15\n\rachieved_goal\x18\x03 \x03(\x02\x12\x12\n\nmodel_type\x18\x04 \x01(\t\x12\x15\n\rdeterministic\x18\x05 \x01(\x08\"[\n\x11InferenceResponse\x12\x0e\n\x06\x61\x63tion\x18\x01 \x03(\x02\x12\x0e\n\x06states\x18\x02 \x03(\x02\x12\x0f\n\x07success\x18\x03 \x01(\x08\x12\x15\n\rerror_message\x18\x04 \x01(\t\"F\n\x15\x42\x61tchInferenceRequest\x12-\n\x08requests\x18\x01 \x03(\x0b\x32\x1b.inference.InferenceRequest\"I\n\x16\x42\x61tchInferenceResponse\x12/\n\tresponses\x18\x01 \x03(\x0b\x32\x1c.inference.InferenceResponse\"\xeb\x01\n\x16TensorInferenceRequest\x12\x13\n\x0bobservation\x18\x01 \x01(\x0c\x12\x19\n\x11observation_shape\x18\x02 \x03(\x05\x12\x14\n\x0c\x64\x65sired_goal\x18\x03 \x01(\x0c\x12\x1a\n\x12\x64\x65sired_goal_shape\x18\x04 \x03(\x05\x12\x15\n\rachieved_goal\x18\x05 \x01(\x0c\x12\x1b\n\x13\x61\x63hieved_goal_shape\x18\x06 \x03(\x05\x12\x12\n\nmodel_type\x18\x07 \x01(\t\x12\x15\n\rdeterministic\x18\x08 \x01(\x08\x12\x10\n\x08sequence\x18\t \x01(\x04\"\x9f\x01\n\x17TensorInferenceResponse\x12\x0e\n\x06\x61\x63tion\x18\x01 \x01(\x0c\x12\x14\n\x0c\x61\x63tion_shape\x18\x02 \x03(\x05\x12\x0e\n\x06states\x18\x03 \x01(\x0c\x12\x14\n\x0cstates_shape\x18\x04 \x03(\x05\x12\x0f\n\x07success\x18\x05 \x01(\x08\x12\x15\n\rerror_message\x18\x06 \x01(\t\x12\x10\n\x08sequence\x18\x07 \x01(\x04\x32\x89\x02\n\x10InferenceService\x12\x44\n\x07Predict\x12\x1b.inference.InferenceRequest\x1a\x1c.inference.InferenceResponse\x12S\n\x0c\x42\x61tchPredict\x12 .inference.BatchInferenceRequest\x1a!.inference.BatchInferenceResponse\x12Z\n\rPredictStream\x12!.inference.TensorInferenceRequest\x1a\".inference.TensorInferenceResponse(\x01\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -39,6 +39,10 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_BATCHINFERENCEREQUEST']._serialized_end=322
   _globals['_BATCHINFERENCERESPONSE']._serialized_start=324
   _globals['_BATCHINFERENCERESPONSE']._serialized_end=397
-  _globals['_INFERENCESERVICE']._serialized_start=400
-  _globals['_INFERENCESERVICE']._serialized_end=573
+  _globals['_TENSORINFERENCEREQUEST']._serialized_start=400
+  _globals['_TENSORINFERENCEREQUEST']._serialized_end=635
+  _globals['_TENSORINFERENCERESPONSE']._serialized_start=638
+  _globals['_TENSORINFERENCERESPONSE']._serialized_end=797
+  _globals['_INFERENCESERVICE']._serialized_start=800
+  _globals['_INFERENCESERVICE']._serialized_end=1065
 # @@protoc_insertion_point(module_scope)
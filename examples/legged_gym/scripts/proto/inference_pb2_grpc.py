@@ -45,6 +45,11 @@ class InferenceServiceStub(object):
                 request_serializer=inference__pb2.BatchInferenceRequest.SerializeToString,
                 response_deserializer=inference__pb2.BatchInferenceResponse.FromString,
                 _registered_method=True)
+        self.PredictStream = channel.stream_stream(
+                '/inference.InferenceService/PredictStream',
+                request_serializer=inference__pb2.TensorInferenceRequest.SerializeToString,
+                response_deserializer=inference__pb2.TensorInferenceResponse.FromString,
+                _registered_method=True)
 
 
 class InferenceServiceServicer(object):
@@ -65,6 +70,13 @@ class InferenceServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def PredictStream(self, request_iterator, context):
+        """流式推理：每个 agent 保持一条长连接，每个控制步发送一次请求，按顺序返回响应
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_InferenceServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -78,6 +90,11 @@ def add_InferenceServiceServicer_to_server(servicer, server):
                     request_deserializer=inference__pb2.BatchInferenceRequest.FromString,
                     response_serializer=inference__pb2.BatchInferenceResponse.SerializeToString,
             ),
+            'PredictStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.PredictStream,
+                    request_deserializer=inference__pb2.TensorInferenceRequest.FromString,
+                    response_serializer=inference__pb2.TensorInferenceResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'inference.InferenceService', rpc_method_handlers)
@@ -143,3 +160,30 @@ class InferenceService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def PredictStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/inference.InferenceService/PredictStream',
+            inference__pb2.TensorInferenceRequest.SerializeToString,
+            inference__pb2.TensorInferenceResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
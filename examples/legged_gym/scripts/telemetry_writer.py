@@ -0,0 +1,198 @@
+import os
+import glob
+import queue
+import threading
+import time
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+SUPPORTED_TELEMETRY_FORMATS = {"csv", "npy"}
+
+
+class _TelemetryStream:
+    """
+    一路遥测数据（timestamp + values）的预分配缓冲块
+    """
+
+    def __init__(self, name: str, column_prefix: str, dim: int, block_rows: int):
+        self.name = name
+        self.column_prefix = column_prefix
+        self.dim = dim
+        self.block_rows = block_rows
+        self.block = np.empty((block_rows, dim + 1), dtype=np.float64)
+        self.rows = 0
+        self.chunk_index = 0
+        # 后台线程写完的缓冲块放回这里复用
+        self.free_blocks: "queue.SimpleQueue[np.ndarray]" = queue.SimpleQueue()
+
+    def header(self) -> str:
+        return ",".join(["timestamp"] + [f"{self.column_prefix}_{i}" for i in range(self.dim)])
+
+    def take_block(self) -> Tuple[np.ndarray, int]:
+        """
+        取走当前缓冲块交给后台线程，换上一块空闲块
+        """
+        block, rows = self.block, self.rows
+        try:
+            self.block = self.free_blocks.get_nowait()
+        except queue.Empty:
+            self.block = np.empty_like(block)
+        self.rows = 0
+        return block, rows
+
+
+class TelemetryWriter:
+    """
+    Buffered telemetry sink for the real-time control loop.
+
+    Each stream's rows (timestamp, values...) are copied into a preallocated NumPy block,
+    full blocks (or partial ones every flush_interval seconds) are handed to a background thread
+    that appends them to files kept open for the whole run:
+    - csv (default): {base}_{stream}.csv, same header and columns as the former log_observation output
+    - npy: {base}_{stream}_npy/{chunk:06d}.npy, one float64 (rows, 1 + dim) array per block, see read_telemetry
+    A write failure in the background thread is raised from the next write() / close().
+    """
+
+    def __init__(self, base_filename: str,
+                 streams: Dict[str, str],
+                 formats=("csv",),
+                 block_rows: int = 512,
+                 flush_interval: float = 5.0):
+        """
+        Args:
+            base_filename: 文件名前缀（不含扩展名）
+            streams: 数据流名称 -> CSV 列名前缀，例如 {"observation": "obs"}
+            formats: 输出格式，csv 和/或 npy，每种格式各写一份完整数据
+            block_rows: 每个缓冲块的行数
+            flush_interval: 未写满的缓冲块最长滞留时间（秒）
+        """
+        unsupported = set(formats) - SUPPORTED_TELEMETRY_FORMATS
+        if unsupported:
+            raise ValueError(f"Unsupported telemetry formats: {unsupported}, supported: {SUPPORTED_TELEMETRY_FORMATS}")
+
+        self._base_filename = os.path.splitext(base_filename)[0]
+        base_dir = os.path.dirname(self._base_filename)
+        if base_dir:
+            os.makedirs(base_dir, exist_ok=True)
+
+        self._column_prefixes = dict(streams)
+        self._formats = tuple(formats)
+        self._block_rows = block_rows
+        self._flush_interval = flush_interval
+        self._streams: Dict[str, _TelemetryStream] = {}
+        self._last_flush_time = time.monotonic()
+
+        self._csv_files = {}
+        self._writer_error: Optional[BaseException] = None
+        self._queue: "queue.Queue[Optional[Tuple[_TelemetryStream, np.ndarray, int]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._writer_loop, name="TelemetryWriter", daemon=True)
+        self._thread.start()
+        self._closed = False
+
+    def write(self, stream_name: str, timestamp: float, values: np.ndarray) -> None:
+        """
+        Append one row to the stream. Only copies into the current block on the caller's thread.
+        """
+        if self._writer_error is not None:
+            self._raise_writer_error()
+        stream = self._streams.get(stream_name)
+        if stream is None:
+            values = np.asarray(values).reshape(-1)
+            stream = _TelemetryStream(stream_name, self._column_prefixes[stream_name], len(values), self._block_rows)
+            self._streams[stream_name] = stream
+
+        row = stream.block[stream.rows]
+        row[0] = timestamp
+        row[1:] = np.ravel(values)
+        stream.rows += 1
+        if stream.rows == stream.block_rows:
+            self._submit(stream)
+
+        if time.monotonic() - self._last_flush_time > self._flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Hand the partial blocks of all streams to the writer thread.
+        """
+        for stream in self._streams.values():
+            if stream.rows > 0:
+                self._submit(stream)
+        self._last_flush_time = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Flush the remaining rows, wait for the writer thread and close the files.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        if self._writer_error is not None:
+            self._raise_writer_error()
+
+    def _raise_writer_error(self) -> None:
+        raise RuntimeError(f"Telemetry writer failed: {self._writer_error}") from self._writer_error
+
+    def _submit(self, stream: _TelemetryStream) -> None:
+        block, rows = stream.take_block()
+        self._queue.put((stream, block, rows))
+
+    def _writer_loop(self) -> None:
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                stream, block, rows = item
+                # 出错后不再写入，只回收缓冲块，错误在调用线程的 write / close 中抛出
+                if self._writer_error is None:
+                    try:
+                        self._write_block(stream, block[:rows])
+                    except Exception as e:
+                        logger.error(f"Failed to write telemetry stream {stream.name}: {e}")
+                        self._writer_error = e
+                stream.free_blocks.put(block)
+        finally:
+            for f in self._csv_files.values():
+                f.close()
+            self._csv_files.clear()
+
+    def _write_block(self, stream: _TelemetryStream, data: np.ndarray) -> None:
+        if "csv" in self._formats:
+            f = self._csv_files.get(stream.name)
+            if f is None:
+                csv_filename = f"{self._base_filename}_{stream.name}.csv"
+                write_header = not os.path.exists(csv_filename)
+                f = open(csv_filename, "a", newline="")
+                if write_header:
+                    f.write(stream.header() + "\n")
+                self._csv_files[stream.name] = f
+            # %.17g 可以无损还原 float64
+            np.savetxt(f, data, fmt="%.17g", delimiter=",")
+            f.flush()
+
+        if "npy" in self._formats:
+            chunk_dir = f"{self._base_filename}_{stream.name}_npy"
+            os.makedirs(chunk_dir, exist_ok=True)
+            np.save(os.path.join(chunk_dir, f"{stream.chunk_index:06d}.npy"), data)
+            stream.chunk_index += 1
+
+
+def read_telemetry(base_filename: str, stream_name: str) -> np.ndarray:
+    """
+    Concatenate the npy chunks of a stream written by TelemetryWriter, returns (rows, 1 + dim).
+    Column 0 is the timestamp.
+    """
+    chunk_dir = f"{os.path.splitext(base_filename)[0]}_{stream_name}_npy"
+    chunk_files = sorted(glob.glob(os.path.join(chunk_dir, "*.npy")))
+    if not chunk_files:
+        raise FileNotFoundError(f"No telemetry chunks found in {chunk_dir}")
+    return np.concatenate([np.load(chunk_file) for chunk_file in chunk_files])
@@ -0,0 +1,114 @@
+"""
+LeggedRewardBatch with batch_obs / batch_reward enabled.
+
+The agents are built the way OrcaGymAsyncEnv.__init__ does it (init_ctrl_info -> set_init_state
+-> init_joint_index -> reset -> get_obs), with the model info that the OrcaStudio server would
+return replaced by a flat layout, so the batched path runs without a server.
+"""
+import copy
+
+import numpy as np
+import pytest
+
+from envs.legged_gym.legged_config import LeggedRobotConfig, LeggedObsConfig, CurriculumConfig
+from envs.legged_gym.legged_robot import LeggedRobot
+from envs.legged_gym.legged_contact_map import LeggedContactMap
+from envs.legged_gym.legged_obs_batch import LeggedObsBatch
+from envs.legged_gym.legged_reward_batch import LeggedRewardBatch
+
+
+AGENT_NUM = 2
+BASE_HEIGHT = 0.3
+
+
+def _build_agents(robot_config: dict, height_map: np.ndarray) -> tuple[list[LeggedRobot], int, int]:
+    agents = [LeggedRobot("test_env", f"Lite3_{i:03d}", "flat_terrain", 1000, 0.02,
+                          robot_config, LeggedObsConfig, CurriculumConfig, is_subenv=True)
+              for i in range(AGENT_NUM)]
+
+    actuator_dict = {}
+    joint_dict = {}
+    for agent in agents:
+        for actuator_name in agent.actuator_names:
+            actuator_dict[actuator_name] = {"CtrlRange": [-30.0, 30.0], "ActuatorId": len(actuator_dict)}
+        for joint_name in agent.joint_names:
+            joint_dict[joint_name] = {"Range": [-1.0, 1.0]}
+
+    # 每个 agent: 一个 free joint (qpos 7 / qvel 6) + 若干 hinge joint，依次排列
+    qpos_start = qvel_start = 0
+    for agent in agents:
+        agent.init_ctrl_info(actuator_dict, joint_dict)
+        agent.set_init_state({agent.base_joint_name: np.array([0.0, 0.0, BASE_HEIGHT, 1.0, 0.0, 0.0, 0.0])}, {})
+
+        hinge_num = len(agent.joint_names) - 1
+        qpos_length = [7] + [1] * hinge_num
+        qvel_length = [6] + [1] * hinge_num
+        qpos_offset = (qpos_start + np.cumsum([0] + qpos_length[:-1])).tolist()
+        qvel_offset = (qvel_start + np.cumsum([0] + qvel_length[:-1])).tolist()
+        agent.init_joint_index(qpos_offset, qvel_offset, qvel_offset, qpos_length, qvel_length, qvel_length)
+        qpos_start += sum(qpos_length)
+        qvel_start += sum(qvel_length)
+
+        agent.reset(np.random.default_rng(0), height_map=height_map)
+
+    return agents, qpos_start, qvel_start
+
+
+@pytest.fixture
+def batched_env():
+    robot_config = copy.deepcopy(LeggedRobotConfig["Lite3"])
+    # 两个力矩项都打开，确保批量实现被调用
+    robot_config["reward_coeff"]["flat_terrain"]["torques"] = 1e-5
+    robot_config["reward_coeff"]["flat_terrain"]["torque_limits"] = 1.0
+
+    height_map = np.zeros((2000, 2000))
+    agents, nq, nv = _build_agents(robot_config, height_map)
+
+    body_names = [body_name for agent in agents
+                  for body_name in agent._base_contact_body_names + agent._leg_contact_body_names + agent._foot_body_names]
+    contact_map = LeggedContactMap(body_names)
+    contact_map.update([])
+
+    obs_batch = LeggedObsBatch(agents, contact_map)
+    reward_batch = LeggedRewardBatch(obs_batch)
+
+    qpos = np.zeros(nq)
+    for agent in agents:
+        base_offset = agent._qpos_index[agent.base_joint_name]["offset"]
+        qpos[base_offset + 2] = BASE_HEIGHT
+        qpos[base_offset + 3] = 1.0
+    sensor_data = {name: 0.0 for agent in agents for name in agent._foot_touch_sensor_names}
+    site_pos_quat = {name: {"xpos": np.zeros(3), "xquat": np.array([1.0, 0.0, 0.0, 0.0])}
+                     for agent in agents for name in agent._contact_site_names}
+
+    def get_obs():
+        return obs_batch.get_obs(sensor_data, qpos, np.zeros(nv), np.zeros(nv), contact_map, site_pos_quat, height_map)
+
+    return agents, reward_batch, get_obs, qpos, nv
+
+
+def test_reward_batch_before_first_step(batched_env):
+    # reset 之后、第一次 compute_torques 之前的 get_obs 也会计算奖励
+    agents, reward_batch, get_obs, _, _ = batched_env
+    obs, _, _ = get_obs()
+    reward_batch.compute()
+
+    assert obs.shape[0] == AGENT_NUM
+    reward_terms = reward_batch.get_reward_terms()
+    np.testing.assert_array_equal(reward_terms["torques"], np.zeros(AGENT_NUM))
+    np.testing.assert_array_equal(reward_terms["torque_limits"], np.zeros(AGENT_NUM))
+
+
+def test_reward_batch_torque_terms_after_step(batched_env):
+    agents, reward_batch, get_obs, qpos, nv = batched_env
+    for agent in agents:
+        agent._position_ctrl = np.full(len(agent.actuator_names), 1.0)
+        agent.compute_torques(qpos, np.zeros(nv))
+    get_obs()
+    reward_batch.compute()
+
+    reward_terms = reward_batch.get_reward_terms()
+    for i, agent in enumerate(agents):
+        coeff = {f["name"]: f["coeff"] for f in agent._reward_functions}
+        assert reward_terms["torques"][i] == pytest.approx(agent._compute_reward_torques(coeff["torques"]))
+        assert reward_terms["torque_limits"][i] == pytest.approx(agent._compute_reward_torque_limits(coeff["torque_limits"]))